@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Claude Sync Bench - Benchmarks con homes sintéticos
+Genera un ~/.claude realista en un directorio temporal y mide los caminos
+calientes de install.py y claude_sync.py en frío y en caliente
+- N proyectos con transcripts JSONL grandes, commands/ y agents/
+- .claude.json de varios MB con historiales largos por proyecto
+- rsync contra un directorio local (sin VPS) o un sshd local
+- Resultados en JSON para comparar contra un baseline y cazar regresiones
+
+Cada escenario corre en un proceso aparte con HOME apuntando al home
+sintético y una copia de los scripts: nada toca el ~/.claude real ni el
+claude_config/ del repo.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+SCRIPT_DIR = Path(__file__).parent.absolute()
+DEFAULT_REPEAT = 5
+REGRESSION_THRESHOLD = 0.20  # +20% sobre el p50 del baseline
+SCENARIOS = ["sync_files", "process_claude_json", "restore_configuration", "sync_to_vps"]
+
+WORDS = ("refactor the parser so that errors carry line numbers and the test suite "
+         "covers the new branch while keeping the public api stable across modules").split()
+
+#=============================================================================
+# HOME SINTÉTICO
+#=============================================================================
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def write_transcript(path: Path, rng: random.Random, size: int, session: str):
+    """Transcript JSONL con entradas user/assistant hasta ~size bytes"""
+    written = 0
+    ts = time.time() - 86400
+    with open(path, 'w') as f:
+        i = 0
+        while written < size:
+            ts += rng.uniform(1, 30)
+            entry = {
+                'type': 'assistant' if i % 2 else 'user',
+                'sessionId': session,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(ts)),
+                'requestId': f"req_{i}",
+                'message': {'id': f"msg_{session}_{i}", 'model': 'claude-sonnet-4',
+                            'content': random_text(rng, rng.randint(20, 400)),
+                            'usage': {'input_tokens': rng.randint(10, 5000),
+                                      'output_tokens': rng.randint(10, 2000),
+                                      'cache_read_input_tokens': rng.randint(0, 50000)}},
+            }
+            line = json.dumps(entry) + "\n"
+            f.write(line)
+            written += len(line)
+            i += 1
+
+def build_home(home: Path, repo: Path, args):
+    """Crear ~/.claude, ~/.claude.json y el claude_config/ del repo copiado"""
+    rng = random.Random(args.seed)
+    claude = home / ".claude"
+    for name in ("commands", "agents"):
+        count = args.commands if name == "commands" else args.agents
+        for i in range(count):
+            path = claude / name / f"group{i % 5}" / f"{name[:-1]}_{i}.md"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# {name} {i}\n\n{random_text(rng, 300)}\n")
+    (claude / "settings.json").write_text(json.dumps({'model': 'sonnet', 'statusLine': {
+        'type': 'command', 'command': 'python3 ~/.claude/statusline.py'}}, indent=2))
+    (claude / "CLAUDE.md").write_text(random_text(rng, 2000) + "\n")
+
+    projects = {}
+    for p in range(args.projects):
+        project_dir = claude / "projects" / f"-home-user-project{p}"
+        project_dir.mkdir(parents=True, exist_ok=True)
+        for t in range(args.transcripts):
+            session = f"{p:04d}-{t:04d}"
+            write_transcript(project_dir / f"{session}.jsonl", rng,
+                             int(args.transcript_mb * 1024 * 1024), session)
+        projects[f"/home/user/project{p}"] = {
+            'allowedTools': [],
+            'history': [{'display': random_text(rng, rng.randint(5, 60)), 'pastedContents': {}}
+                        for _ in range(args.history)],
+            'mcpServers': {},
+        }
+    claude_json = {'numStartups': 42, 'projects': projects,
+                   'mcpServers': {f"server{i}": {'command': 'npx', 'args': [f"mcp-{i}"]}
+                                  for i in range(5)}}
+    (home / ".claude.json").write_text(json.dumps(claude_json, indent=2))
+
+    # El repo trae su propia copia de la config (fuente de restore_configuration)
+    config_dir = repo / "claude_config"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("settings.json", "CLAUDE.md"):
+        shutil.copy2(claude / name, config_dir / name)
+    for name in ("commands", "agents"):
+        shutil.copytree(claude / name, config_dir / name, dirs_exist_ok=True)
+    shutil.copy2(home / ".claude.json", config_dir / ".claude.json")
+
+def prepare_workdir(workdir: Path, args):
+    """Home sintético + copia de los scripts (el repo bajo prueba)"""
+    home = workdir / "home"
+    repo = workdir / "repo"
+    home.mkdir(parents=True)
+    repo.mkdir(parents=True)
+    for script in SCRIPT_DIR.glob("*.py"):
+        shutil.copy2(script, repo / script.name)
+    build_home(home, repo, args)
+    return home, repo
+
+def tree_size(root: Path) -> int:
+    return sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
+
+#=============================================================================
+# WORKER (proceso aislado con HOME sintético)
+#=============================================================================
+def timed(func, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def quiet(func):
+    """Silenciar los print() de los pasos de instalación"""
+    def wrapper():
+        with redirect_stdout(StringIO()):
+            return func()
+    return wrapper
+
+def run_worker(scenario: str, workdir: Path, repeat: int) -> Dict[str, List[float]]:
+    """Medir un escenario: fase 'cold' (sin estado) y 'warm' (repetido)"""
+    import install
+    import claude_sync
+
+    home = Path(os.environ['HOME'])
+    state_dir = home / ".claude_sync_state"
+    claude_json = home / ".claude.json"
+    results = {}
+
+    if scenario == "sync_files":
+        shutil.rmtree(state_dir, ignore_errors=True)
+        results['cold'] = timed(install.sync_files, 1)
+        results['warm'] = timed(install.sync_files, repeat)
+
+        def touch_and_sync():
+            with open(claude_json, 'a') as f:
+                f.write(" ")
+            install.sync_files()
+        results['one_change'] = timed(touch_and_sync, repeat)
+
+    elif scenario == "process_claude_json":
+        results['cold'] = timed(quiet(install.process_claude_json), 1)
+        results['warm'] = timed(quiet(install.process_claude_json), repeat)
+
+    elif scenario == "restore_configuration":
+        results['cold'] = timed(quiet(install.restore_configuration), 1)
+        results['warm'] = timed(quiet(install.restore_configuration), repeat)
+
+    elif scenario == "sync_to_vps":
+        target = os.environ.get('BENCH_RSYNC_TARGET') or str(workdir / "remote")
+        spec = target if target == 'rsync' else f"rsync:{target}"
+        shutil.rmtree(state_dir, ignore_errors=True)
+        if spec != 'rsync':
+            shutil.rmtree(target, ignore_errors=True)  # destino vacío = frío real
+
+        def sync(force=False):
+            if not claude_sync.sync_to_vps(force=force, backends=spec):
+                raise RuntimeError("sync_to_vps falló (¿rsync instalado?)")
+        results['cold'] = timed(sync, 1)
+        results['warm'] = timed(sync, repeat)                       # sin cambios: no hay rsync
+        results['warm_forced'] = timed(lambda: sync(True), repeat)  # rsync sin diff
+
+    else:
+        raise ValueError(f"Escenario desconocido: {scenario}")
+    return results
+
+#=============================================================================
+# ORQUESTACIÓN
+#=============================================================================
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {'n': len(ordered), 'min': ordered[0], 'p50': ordered[len(ordered) // 2],
+            'max': ordered[-1]}
+
+def run_scenario(scenario: str, home: Path, repo: Path, workdir: Path, args) -> Dict:
+    env = dict(os.environ, HOME=str(home), PYTHONDONTWRITEBYTECODE='1')
+    env.pop('SUDO_USER', None)
+    if args.rsync_target:
+        env['BENCH_RSYNC_TARGET'] = args.rsync_target
+    cmd = [sys.executable, str(repo / "bench_sync.py"), '--worker', scenario,
+           '--workdir', str(workdir), '--repeat', str(args.repeat)]
+    result = subprocess.run(cmd, cwd=repo, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ['?'])[-1]
+        return {'error': error}
+    samples = json.loads(result.stdout.strip().splitlines()[-1])
+    return {phase: summarize(values) for phase, values in samples.items()}
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Fases cuyo p50 empeoró más que `threshold` respecto al baseline"""
+    regressions = []
+    for scenario, phases in results['scenarios'].items():
+        base_phases = baseline.get('scenarios', {}).get(scenario, {})
+        for phase, stats in phases.items():
+            base = base_phases.get(phase)
+            if not isinstance(stats, dict) or not isinstance(base, dict) or 'p50' not in base:
+                continue
+            if base['p50'] > 0 and stats['p50'] > base['p50'] * (1 + threshold):
+                regressions.append(f"{scenario}.{phase}: {base['p50'] * 1000:.1f}ms → "
+                                   f"{stats['p50'] * 1000:.1f}ms")
+    return regressions
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def print_results(results: Dict):
+    print(f"📦 Home sintético: {results['home_bytes'] / 1024 / 1024:.1f}MB")
+    for scenario, phases in results['scenarios'].items():
+        if 'error' in phases:
+            print(f"❌ {scenario}: {phases['error']}")
+            continue
+        for phase, stats in phases.items():
+            print(f"⏱️  {scenario + '.' + phase:<36} p50 {stats['p50'] * 1000:9.1f}ms  "
+                  f"min {stats['min'] * 1000:9.1f}ms  max {stats['max'] * 1000:9.1f}ms  "
+                  f"(n={stats['n']})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de sync con homes sintéticos")
+    parser.add_argument('--projects', type=int, default=20, help='Proyectos (default 20)')
+    parser.add_argument('--transcripts', type=int, default=3, help='Transcripts por proyecto (default 3)')
+    parser.add_argument('--transcript-mb', type=float, default=2.0, help='Tamaño de cada transcript en MB')
+    parser.add_argument('--history', type=int, default=500, help='Entradas de history por proyecto')
+    parser.add_argument('--commands', type=int, default=50)
+    parser.add_argument('--agents', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Repeticiones en caliente')
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS),
+                        help=f"Lista separada por comas (default {','.join(SCENARIOS)})")
+    parser.add_argument('--rsync-target',
+                        help="Destino de sync_to_vps: ruta local (default) o 'rsync' para usar "
+                             "el VPS/sshd configurado en claude_sync.py")
+    parser.add_argument('--output', help='Guardar resultados en este JSON')
+    parser.add_argument('--baseline', help='Comparar contra un JSON previo (exit 1 si hay regresión)')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--keep', action='store_true', help='No borrar el directorio de trabajo')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        samples = run_worker(args.worker, Path(args.workdir), args.repeat)
+        print(json.dumps(samples))
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="claude-bench-"))
+    try:
+        print(f"🏗️  Generando home sintético en {workdir}...")
+        home, repo = prepare_workdir(workdir, args)
+        results = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'params': {k: getattr(args, k) for k in ('projects', 'transcripts', 'transcript_mb',
+                                                     'history', 'commands', 'agents', 'seed',
+                                                     'repeat')},
+            'home_bytes': tree_size(home),
+            'scenarios': {},
+        }
+        for scenario in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+            print(f"▶️  {scenario}...")
+            results['scenarios'][scenario] = run_scenario(scenario, home, repo, workdir, args)
+        print()
+        print_results(results)
+    finally:
+        if args.keep:
+            print(f"📁 Directorio de trabajo conservado: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('params') != results['params']:
+            print("⚠️ El baseline se generó con otros parámetros: comparación orientativa")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ Regresiones (> +{args.threshold:.0%} en p50):")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("✅ Sin regresiones respecto al baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Claude Append - Transferencia de solo la cola para transcripts que crecen
+Los .jsonl activos solo crecen por el final; rsync igual los checksumea enteros
+- Por archivo se recuerda la longitud ya enviada y el sha256 del prefijo completo
+  (tras un envío se extiende con la cola, sin releer el prefijo)
+- Si el prefijo no cambió, se envía solo la cola nueva en UN comando ssh
+  para todos los archivos (guard remoto: el tamaño remoto debe coincidir)
+- Prefijo cambiado, tamaño remoto distinto o error: el archivo vuelve al
+  camino normal de rsync en ese mismo ciclo
+- El resto de archivos no cambia de camino
+"""
+
+import os
+import json
+import shlex
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+from claude_manifest import atomic_write_json
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+APPEND_VERSION = 2              # 2: sha256 del prefijo completo (antes muestreado)
+APPEND_MIN_SIZE = 64 * 1024    # por debajo rsync ya es barato: no se sigue
+HASH_CHUNK = 1024 * 1024       # lectura al hashear prefijos
+APPEND_TIMEOUT = 300           # segundos para el envío de todas las colas
+
+# Guard remoto: por cada cabecera "<tamaño esperado> <bytes> <mtime> <ruta>"
+# llegan <bytes> de cola por stdin. Solo se añaden si el tamaño remoto es el
+# esperado; un archivo con varios enlaces (snapshot con cp -al) se copia antes
+# de escribir, igual que hace rsync, para no modificar el snapshot.
+REMOTE_APPEND = r'''
+cd {base} || exit 2
+while IFS=' ' read -r expect len mtime path; do
+  size=$(stat -c %s "$path" 2>/dev/null || echo -1)
+  if [ "$size" != "$expect" ]; then
+    head -c "$len" > /dev/null; echo "stale $path"; continue
+  fi
+  if [ "$(stat -c %h "$path")" -gt 1 ]; then
+    cp -p "$path" "$path.append-tmp" && mv "$path.append-tmp" "$path" || exit 1
+  fi
+  head -c "$len" >> "$path" || exit 1
+  touch -m -d "@$mtime" "$path"
+  echo "ok $path"
+done
+'''
+
+#=============================================================================
+# UTILIDADES
+#=============================================================================
+class Tail(NamedTuple):
+    rel: str          # ruta relativa a la raíz sincronizada
+    path: Path
+    offset: int       # longitud ya enviada (= tamaño remoto esperado)
+    end: int          # longitud a dejar en remoto
+    mtime_ns: int
+
+def is_append_file(rel: str) -> bool:
+    """Transcripts de sesión: solo crecen por el final"""
+    return rel.startswith('projects/') and rel.endswith('.jsonl') and '\n' not in rel
+
+def extend_hash(digest, path: Path, start: int, end: int):
+    """Añadir al hash los bytes [start, end) de `path`"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(HASH_CHUNK, remaining))
+            if not chunk:
+                raise OSError(f"{path}: más corto que {end} bytes")
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+def prefix_hash(path: Path, length: int):
+    """sha256 de los primeros `length` bytes, extensible con extend_hash"""
+    return extend_hash(hashlib.sha256(), path, 0, length)
+
+def prefix_digest(path: Path, length: int) -> str:
+    """sha256 de los primeros `length` bytes completos: cualquier reescritura cuenta"""
+    return prefix_hash(path, length).hexdigest()
+
+def read_tail(tail: Tail) -> bytes:
+    with open(tail.path, 'rb') as f:
+        f.seek(tail.offset)
+        data = f.read(tail.end - tail.offset)
+    if len(data) != tail.end - tail.offset:
+        raise OSError(f"{tail.rel}: archivo truncado durante el envío")
+    return data
+
+def _mtime_arg(mtime_ns: int) -> str:
+    return f"{mtime_ns // 10 ** 9}.{mtime_ns % 10 ** 9:09d}"
+
+#=============================================================================
+# ESTADO
+#=============================================================================
+class AppendTracker:
+    """Longitud enviada + hash del prefijo de cada archivo append-only"""
+
+    def __init__(self, state_file: Path):
+        self.state_file = Path(state_file)
+        self.files: Dict[str, List] = self._load()
+        # Hash del prefijo verificado en plan(): record() solo le añade la cola
+        self.running: Dict[str, object] = {}
+
+    def _load(self) -> Dict[str, List]:
+        try:
+            with open(self.state_file) as f:
+                data = json.load(f)
+            if data.get('version') == APPEND_VERSION:
+                return data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def save(self):
+        try:
+            atomic_write_json(self.state_file, {'version': APPEND_VERSION, 'files': self.files})
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo guardar el estado append: {e}")
+
+    def plan(self, root: Path, paths: Iterable[str], snapshot) -> List[Tail]:
+        """Archivos cambiados que pueden ir por cola (prefijo intacto)"""
+        tails = []
+        for path in paths:
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            known = self.files.get(rel)
+            if known is None or not is_append_file(rel):
+                continue
+            length, digest = known
+            size, mtime_ns = snapshot[path]
+            if size <= length:
+                continue
+            try:
+                running = prefix_hash(Path(path), length)
+            except OSError:
+                continue
+            if running.hexdigest() != digest:
+                continue  # Reescrito: rsync completo
+            self.running[rel] = running
+            tails.append(Tail(rel, Path(path), length, size, mtime_ns))
+        return tails
+
+    def record(self, root: Path, paths: Iterable[str], snapshot):
+        """Anotar lo que ya tiene el remoto tras un envío correcto"""
+        for path in paths:
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            if not is_append_file(rel):
+                continue
+            size = snapshot[path][0]
+            running = self.running.pop(rel, None)
+            if size < APPEND_MIN_SIZE:
+                continue
+            known = self.files.get(rel)
+            try:
+                if running is not None and known is not None and known[0] <= size:
+                    digest = extend_hash(running, Path(path), known[0], size).hexdigest()
+                else:
+                    digest = prefix_digest(Path(path), size)
+                self.files[rel] = [size, digest]
+            except OSError:
+                self.files.pop(rel, None)
+
+    def forget(self, root: Path, paths: Iterable[str]):
+        for path in paths:
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            self.files.pop(rel, None)
+            self.running.pop(rel, None)
+
+#=============================================================================
+# ENVÍO
+#=============================================================================
+def remote_base_command(base: str) -> str:
+    """`cd` al directorio remoto respetando ~/ (el resto va entre comillas)"""
+    if base.startswith('~/'):
+        return '~/' + shlex.quote(base[2:])
+    return shlex.quote(base)
+
+def send_tails_remote(transport, base: str, tails: List[Tail]) -> Set[str]:
+    """Enviar todas las colas en un solo ssh; devuelve las rutas aplicadas"""
+    stream = bytearray()
+    for tail in tails:
+        data = read_tail(tail)
+        stream += (f"{tail.offset} {len(data)} {_mtime_arg(tail.mtime_ns)} {tail.rel}\n").encode()
+        stream += data
+    script = REMOTE_APPEND.format(base=remote_base_command(base))
+    result = transport.run(script, input=bytes(stream), timeout=APPEND_TIMEOUT)
+    applied = set()
+    for line in result.stdout.decode(errors='replace').splitlines():
+        status, _, rel = line.partition(' ')
+        if status == 'ok':
+            applied.add(rel)
+    if result.returncode != 0:
+        logging.warning(f"⚠️ Envío de colas interrumpido (exit {result.returncode}): "
+                        f"{result.stderr.decode(errors='replace').strip()}")
+    return applied
+
+def send_tails_local(dest: Path, tails: List[Tail]) -> Set[str]:
+    """Mismo guard que el remoto, para destinos rsync locales"""
+    applied = set()
+    for tail in tails:
+        target = Path(dest) / tail.rel
+        try:
+            st = target.stat()
+        except FileNotFoundError:
+            continue
+        if st.st_size != tail.offset:
+            continue
+        if st.st_nlink > 1:
+            tmp = target.with_name(f"{target.name}.append-tmp")
+            shutil.copy2(target, tmp)
+            os.replace(tmp, target)
+        with open(target, 'ab') as f:
+            f.write(read_tail(tail))
+        os.utime(target, ns=(tail.mtime_ns, tail.mtime_ns))
+        applied.add(tail.rel)
+    return applied
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Claude Bandwidth - Qué archivos se llevan la subida al VPS
+rsync solo dejaba el total de --stats; no se sabía qué rutas lo gastaban
+- rsync corre con --out-format='%i %l %b %n': bytes reales (delta +
+  compresión) de cada archivo enviado
+- Lo que --stats cuenta y no es de ningún archivo (lista de archivos,
+  checksums) va a la categoría (protocolo); las colas de transcripts también cuentan
+- Totales por día, por categoría y por ruta en un JSON de estado
+- Resumen en --status y detalle con --bandwidth
+"""
+
+import re
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from claude_compact import ARCHIVE_NAME
+from claude_manifest import atomic_write_json
+from claude_metrics import format_bytes
+from claude_tiering import COLD_DIR
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+LEDGER_VERSION = 1
+KEEP_DAYS = 90                     # días de historial guardados
+MAX_PATHS = 500                    # rutas por día; el resto se suma en OTHERS
+OTHERS = "(otras rutas)"
+PROTOCOL = "(protocolo)"
+
+ITEMIZED_LINE = re.compile(r'^([<>ch.*][fdLDS]\S{9}) ([\d,.]+) ([\d,.]+) (.+)$')
+BYTES_SENT = re.compile(r'^Total bytes sent: ([\d,.]+)', re.M)
+
+#=============================================================================
+# PARSEO
+#=============================================================================
+def _number(text: str) -> int:
+    return int(text.replace(',', '').replace('.', ''))
+
+def parse_itemized(output: str) -> List[Tuple[str, int]]:
+    """(ruta, bytes transferidos) de cada archivo enviado en la salida de rsync"""
+    sent = []
+    for line in (output or '').splitlines():
+        match = ITEMIZED_LINE.match(line)
+        if match and match.group(1)[0] in '<>' and match.group(1)[1] == 'f':
+            sent.append((match.group(4), _number(match.group(3))))
+    return sent
+
+def protocol_overhead(output: str, files: List[Tuple[str, int]]) -> int:
+    """Bytes de --stats que no son de ningún archivo"""
+    match = BYTES_SENT.search(output or '')
+    if not match:
+        return 0
+    return max(0, _number(match.group(1)) - sum(size for _, size in files))
+
+def categorize(rel: str) -> str:
+    """Categoría de una ruta relativa a la raíz del destino"""
+    if rel == PROTOCOL:
+        return PROTOCOL
+    name = rel.rstrip('/')
+    top = name.split('/', 1)[0]
+    if name == '.claude.json':
+        return '.claude.json'
+    if top == 'projects':
+        return 'transcripts'
+    if top == 'todos':
+        return 'todos'
+    if top in ('commands', 'agents'):
+        return 'commands/agents'
+    if top == COLD_DIR:
+        return 'archivo frío'
+    if name == ARCHIVE_NAME:
+        return 'historial archivado'
+    return 'otros'
+
+def _day(now: Optional[float] = None) -> str:
+    return time.strftime('%Y-%m-%d', time.localtime(now or time.time()))
+
+#=============================================================================
+# REGISTRO
+#=============================================================================
+class BandwidthLedger:
+    """Bytes subidos por día: {'categories': {cat: [bytes, archivos]}, 'paths': {...}}"""
+
+    def __init__(self, state_file: Path):
+        self.state_file = Path(state_file)
+        self.days: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.state_file) as f:
+                data = json.load(f)
+            if data.get('version') == LEDGER_VERSION:
+                return data['days']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def save(self):
+        for day in sorted(self.days)[:-KEEP_DAYS]:
+            del self.days[day]
+        for entry in self.days.values():
+            paths = entry['paths']
+            if len(paths) > MAX_PATHS:
+                ranked = sorted(paths.items(), key=lambda item: item[1][0], reverse=True)
+                folded = [0, 0]
+                for rel, (size, count) in ranked[MAX_PATHS - 1:]:
+                    folded[0] += size
+                    folded[1] += count
+                entry['paths'] = dict(ranked[:MAX_PATHS - 1])
+                entry['paths'][OTHERS] = folded
+        try:
+            atomic_write_json(self.state_file, {'version': LEDGER_VERSION, 'days': self.days})
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo guardar el registro de ancho de banda: {e}")
+
+    def record(self, transfers: Iterable[Tuple[str, int]], now: Optional[float] = None) -> int:
+        """Sumar (ruta, bytes) al día de hoy; devuelve el total añadido"""
+        entry = self.days.setdefault(_day(now), {'categories': {}, 'paths': {}})
+        total = 0
+        for rel, size in transfers:
+            for key, table in ((categorize(rel), entry['categories']), (rel, entry['paths'])):
+                counters = table.setdefault(key, [0, 0])
+                counters[0] += size
+                counters[1] += 1
+            total += size
+        return total
+
+    def record_rsync(self, output: str, now: Optional[float] = None) -> int:
+        """Atribuir la salida de un rsync con --stats y --out-format='%i %l %b %n'"""
+        files = parse_itemized(output)
+        overhead = protocol_overhead(output, files)
+        return self.record(files + ([(PROTOCOL, overhead)] if overhead else []), now)
+
+    # -- consulta ------------------------------------------------------------------
+    def since(self, days: int, now: Optional[float] = None) -> str:
+        """Primer día de la ventana (`days` <= 0: todo lo guardado)"""
+        return _day((now or time.time()) - (days - 1) * 86400) if days > 0 else ''
+
+    def totals(self, days: int = 7, now: Optional[float] = None) -> Tuple[Dict, Dict, int]:
+        """(categorías, rutas, total) de los últimos `days` días"""
+        since = self.since(days, now)
+        categories: Dict[str, List[int]] = {}
+        paths: Dict[str, List[int]] = {}
+        for day, entry in self.days.items():
+            if day < since:
+                continue
+            for source, target in ((entry['categories'], categories), (entry['paths'], paths)):
+                for key, (size, count) in source.items():
+                    counters = target.setdefault(key, [0, 0])
+                    counters[0] += size
+                    counters[1] += count
+        return categories, paths, sum(size for size, _ in categories.values())
+
+    def describe(self, days: int = 7) -> str:
+        categories, _, total = self.totals(days)
+        if not total:
+            return "sin datos"
+        ranked = sorted(categories.items(), key=lambda item: item[1][0], reverse=True)
+        parts = ', '.join(f"{name} {size * 100 // total}%" for name, (size, _) in ranked[:4])
+        return f"{format_bytes(total)} ({parts})"
+
+    def report(self, days: int = 7, top: int = 15) -> List[str]:
+        """Informe detallado: categorías, rutas que más suben y total por día"""
+        categories, paths, total = self.totals(days)
+        window = f"últimos {days} días" if days > 0 else f"todo el historial ({KEEP_DAYS} días máx.)"
+        lines = [f"📶 Subida {window}: {format_bytes(total)}"]
+        if not total:
+            return lines
+        lines.append("📂 Por categoría:")
+        for name, (size, count) in sorted(categories.items(), key=lambda i: i[1][0], reverse=True):
+            lines.append(f"   {name:<22} {format_bytes(size):>10} {size * 100 / total:5.1f}%  "
+                         f"{count} envíos")
+        lines.append(f"📄 Top {top} rutas:")
+        ranked = sorted(((rel, c) for rel, c in paths.items() if rel != PROTOCOL),
+                        key=lambda i: i[1][0], reverse=True)
+        for rel, (size, count) in ranked[:top]:
+            lines.append(f"   {format_bytes(size):>10}  {count:>5}x  {rel}")
+        lines.append("📅 Por día:")
+        since = self.since(days)
+        for day in sorted(d for d in self.days if d >= since):
+            day_total = sum(size for size, _ in self.days[day]['categories'].values())
+            lines.append(f"   {day}  {format_bytes(day_total):>10}")
+        return lines
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Claude Bootstrap - Preparar una máquina nueva desde la copia del VPS
+install.py solo restaura desde claude_config/ (historia git completa) y
+claude_sync.py solo sube; esto baja el árbol de otra máquina o un snapshot
+- Manifest remoto en un solo ssh (tamaño + mtime de cada archivo)
+- rsync en paralelo: los archivos pendientes se reparten por tamaño entre
+  BOOTSTRAP_JOBS procesos con --files-from, todos sobre el master SSH
+- Reanudable: lo que ya está en staging con el tamaño y mtime del manifest no
+  se vuelve a pedir; los archivos grandes a medias siguen en --partial-dir
+- Verificación: tamaño + mtime siempre y sha256 (remoto vs local) salvo en
+  modo rápido; lo corrupto se borra y se vuelve a pedir una vez
+"""
+
+import json
+import hashlib
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from claude_append import remote_base_command
+from claude_copy import DEFAULT_WORKERS, tree_stats
+from claude_manifest import atomic_write_json
+from claude_metrics import format_bytes
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+BOOTSTRAP_JOBS = 4                 # procesos rsync en paralelo
+PARTIAL_DIR = ".rsync-partial"     # dentro de staging: transferencias a medias
+MANIFEST_TIMEOUT = 120
+HASH_TIMEOUT = 1800
+HASH_CHUNK = 1024 * 1024
+
+# NUL como separador: cualquier nombre de archivo es válido
+MANIFEST_SCRIPT = "cd {base} && find . -type f ! -path '*/{partial}/*' -printf '%s %T@ %P\\0'"
+HASH_SCRIPT = "cd {base} && xargs -0 -r -n 64 -P {jobs} sha256sum -z --"
+
+#=============================================================================
+# ÁRBOL DE ORIGEN
+#=============================================================================
+class SourceTree:
+    """Árbol a bajar: `base` en el VPS (con transport) o un directorio local"""
+
+    def __init__(self, base: str, transport=None):
+        self.base = base.rstrip('/')
+        self.transport = transport
+
+    def __str__(self):
+        return f"{self.transport.host}:{self.base}" if self.transport else self.base
+
+    def _run(self, script: str, input: Optional[bytes] = None,
+             timeout: float = MANIFEST_TIMEOUT) -> subprocess.CompletedProcess:
+        if not self.transport.ensure():
+            raise OSError(f"{self.transport.host} inalcanzable")
+        result = self.transport.run(script, input=input, timeout=timeout)
+        if result.returncode != 0:
+            raise OSError(result.stderr.decode(errors='replace').strip() or
+                          f"exit {result.returncode}")
+        return result
+
+    def manifest(self) -> Dict[str, Tuple[int, int]]:
+        """Ruta relativa -> (tamaño, mtime en segundos)"""
+        if self.transport is None:
+            if not Path(self.base).is_dir():
+                raise FileNotFoundError(f"{self.base} no existe")
+            return {rel: (size, mtime_ns // 10 ** 9) for rel, (size, mtime_ns)
+                    in tree_stats(Path(self.base)).items() if not is_partial(rel)}
+        output = self._run(MANIFEST_SCRIPT.format(base=remote_base_command(self.base),
+                                                  partial=PARTIAL_DIR)).stdout
+        files = {}
+        for record in output.decode(errors='surrogateescape').split('\0'):
+            size, mtime, rel = (record.split(' ', 2) + ['', ''])[:3]
+            if rel:
+                files[rel] = (int(size), int(float(mtime)))
+        return files
+
+    def hashes(self, rels: List[str], jobs: int = BOOTSTRAP_JOBS) -> Dict[str, str]:
+        """sha256 de `rels` calculado en el origen"""
+        if not rels:
+            return {}
+        if self.transport is None:
+            return dict(zip(rels, hash_files([Path(self.base) / rel for rel in rels])))
+        stdin = '\0'.join(rels).encode(errors='surrogateescape') + b'\0'
+        output = self._run(HASH_SCRIPT.format(base=remote_base_command(self.base), jobs=jobs),
+                           input=stdin, timeout=HASH_TIMEOUT).stdout
+        digests = {}
+        for record in output.decode(errors='surrogateescape').split('\0'):
+            digest, _, rel = record.partition('  ')
+            if rel:
+                digests[rel] = digest
+        return digests
+
+    def rsync_command(self, files_from: Path, dest: Path) -> List[str]:
+        cmd = ['rsync', '-a', '--from0', f'--files-from={files_from}',
+               f'--partial-dir={PARTIAL_DIR}']
+        if self.transport is None:
+            return cmd + [f"{self.base}/", f"{dest}/"]
+        return cmd + ['-e', self.transport.ssh_command(),
+                      f"{self.transport.host}:{self.base}/", f"{dest}/"]
+
+def is_partial(rel: str) -> bool:
+    """¿Resto de una transferencia a medias? (rsync crea PARTIAL_DIR junto al archivo)"""
+    return PARTIAL_DIR in Path(rel).parts
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_files(paths: List[Path]) -> List[str]:
+    with ThreadPoolExecutor(max_workers=DEFAULT_WORKERS) as pool:
+        return list(pool.map(sha256_file, paths))
+
+def split_shards(rels: List[str], sizes: Dict[str, int], jobs: int) -> List[List[str]]:
+    """Repartir por bytes: el archivo más grande al proceso menos cargado"""
+    shards: List[List] = [[0, []] for _ in range(max(1, min(jobs, len(rels))))]
+    for rel in sorted(rels, key=lambda r: sizes[r], reverse=True):
+        shard = min(shards, key=lambda s: s[0])
+        shard[0] += sizes[rel]
+        shard[1].append(rel)
+    return [sorted(files) for _, files in shards if files]
+
+#=============================================================================
+# BOOTSTRAP
+#=============================================================================
+class Bootstrap:
+    """Traer `source` a `staging` con rsync en paralelo, reanudable y verificado.
+
+    Estado (state_file): sha256 ya verificados por ruta, con el tamaño y mtime
+    con los que se verificaron, para no rehashear al reanudar.
+    """
+
+    def __init__(self, source: SourceTree, staging: Path, state_file: Path,
+                 jobs: int = BOOTSTRAP_JOBS, verify: bool = True):
+        self.source = source
+        self.staging = Path(staging)
+        self.state_file = Path(state_file)
+        self.jobs = jobs
+        self.verify_hashes = verify
+        self.verified: Dict[str, List] = self._load()
+
+    def _load(self) -> Dict[str, List]:
+        try:
+            with open(self.state_file) as f:
+                data = json.load(f)
+            if data.get('source') == str(self.source):
+                return data['verified']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _save(self):
+        atomic_write_json(self.state_file, {'source': str(self.source), 'verified': self.verified})
+
+    def _local(self, rel: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = (self.staging / rel).stat()
+        except OSError:
+            return None
+        return st.st_size, int(st.st_mtime)
+
+    def pending(self, manifest: Dict[str, Tuple[int, int]]) -> List[str]:
+        """Rutas que faltan o no coinciden en tamaño/mtime con el origen"""
+        return sorted(rel for rel, stat in manifest.items() if self._local(rel) != tuple(stat))
+
+    def transfer(self, rels: List[str], manifest: Dict[str, Tuple[int, int]]) -> bool:
+        """Un rsync --files-from por shard, todos a la vez"""
+        if not rels:
+            return True
+        self.staging.mkdir(parents=True, exist_ok=True)
+        shards = split_shards(rels, {rel: manifest[rel][0] for rel in rels}, self.jobs)
+        total = sum(manifest[rel][0] for rel in rels)
+        logging.info(f"⬇️  {len(rels)} archivos ({format_bytes(total)}) desde {self.source} "
+                     f"en {len(shards)} rsync paralelos")
+        with tempfile.TemporaryDirectory(prefix="claude-bootstrap-") as tmp:
+            procs = []
+            for n, shard in enumerate(shards):
+                files_from = Path(tmp) / f"shard-{n}"
+                files_from.write_bytes('\0'.join(shard).encode(errors='surrogateescape') + b'\0')
+                procs.append(subprocess.Popen(self.source.rsync_command(files_from, self.staging),
+                                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE))
+            ok = True
+            for n, proc in enumerate(procs):
+                _, stderr = proc.communicate()
+                if proc.returncode != 0:
+                    ok = False
+                    logging.error(f"❌ rsync shard {n} (exit {proc.returncode}): "
+                                  f"{stderr.decode(errors='replace').strip()}")
+        return ok
+
+    def verify(self, manifest: Dict[str, Tuple[int, int]]) -> List[str]:
+        """Rutas corruptas (borradas de staging para volver a pedirlas)"""
+        bad = self.pending(manifest)
+        if self.verify_hashes:
+            todo = sorted(rel for rel, stat in manifest.items() if rel not in bad
+                          and self.verified.get(rel, [None, None, None])[:2] != list(stat))
+            if todo:
+                logging.info(f"🔐 Verificando sha256 de {len(todo)} archivos")
+                remote = self.source.hashes(todo, self.jobs)
+                local = hash_files([self.staging / rel for rel in todo])
+                for rel, digest in zip(todo, local):
+                    if remote.get(rel) == digest:
+                        self.verified[rel] = list(manifest[rel]) + [digest]
+                    else:
+                        bad.append(rel)
+        for rel in manifest:
+            if rel in bad:
+                self.verified.pop(rel, None)
+        for rel in set(self.verified) - set(manifest):
+            del self.verified[rel]
+        self._save()
+        for rel in bad:
+            try:
+                (self.staging / rel).unlink()
+            except FileNotFoundError:
+                pass
+        return sorted(bad)
+
+    def run(self) -> bool:
+        """Bajar, verificar y repetir una vez lo que falló. True = staging completo"""
+        manifest = self.source.manifest()
+        for attempt in (1, 2):
+            rels = self.pending(manifest)
+            if rels and not self.transfer(rels, manifest):
+                logging.warning("⚠️ Transferencia incompleta: repetir para reanudar")
+            bad = self.verify(manifest)
+            if not bad:
+                logging.info(f"✅ {len(manifest)} archivos verificados en {self.staging}")
+                return True
+            logging.warning(f"⚠️ {len(bad)} archivos faltan o no verifican"
+                            + (", reintentando" if attempt == 1 else f": {', '.join(bad[:5])}"))
+        return False
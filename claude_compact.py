@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Claude Compact - Compactación del historial de ~/.claude.json
+El CLI parsea y reescribe ~/.claude.json en cada arranque; casi todo su
+tamaño es projects.<ruta>.history
+- Deja las HISTORY_KEEP entradas más recientes de cada proyecto
+- Las antiguas van a un archivo append-only (~/.claude/history-archive.jsonl)
+  con búsqueda por texto y proyecto
+- Opt-in (CLAUDE_SYNC_HISTORY_KEEP=N) y nunca con un proceso `claude` vivo:
+  entre la comprobación de mtime y el rename queda una ventana en la que
+  una escritura del CLI se perdería
+- Escritura atómica; si el CLI tocó el archivo mientras tanto, no se escribe
+- Corre como etapa del daemon y a mano: python3 claude_compact.py --help
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from claude_engine import Stage
+from claude_metrics import format_bytes
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+HISTORY_KEEP = int(os.environ.get('CLAUDE_SYNC_HISTORY_KEEP', 0))  # 0 = desactivado (opt-in)
+COMPACT_INTERVAL = 3600            # segundos entre pasadas de la etapa
+ARCHIVE_NAME = "history-archive.jsonl"
+
+USER_HOME = Path.home()
+CLAUDE_JSON = USER_HOME / ".claude.json"
+ARCHIVE_FILE = USER_HOME / ".claude" / ARCHIVE_NAME
+
+#=============================================================================
+# ARCHIVO DE HISTORIAL
+#=============================================================================
+def entry_hash(project: str, entry: Dict) -> str:
+    return hashlib.sha256(json.dumps([project, entry], sort_keys=True).encode()).hexdigest()[:16]
+
+def iter_archive(archive: Path) -> Iterator[Dict]:
+    try:
+        with open(archive, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # Línea a medias de una escritura interrumpida
+    except FileNotFoundError:
+        return
+
+def search_archive(archive: Path, text: str = "",
+                   project: Optional[str] = None) -> Iterator[Dict]:
+    """Entradas archivadas cuyo texto contiene `text` (sin distinguir mayúsculas)"""
+    text = text.lower()
+    for record in iter_archive(archive):
+        if project and project not in record.get('project', ''):
+            continue
+        if text in str(record.get('entry', {}).get('display', '')).lower():
+            yield record
+
+#=============================================================================
+# COMPACTACIÓN
+#=============================================================================
+def claude_running() -> bool:
+    """¿Hay un CLI `claude` vivo? (binario `claude` o el cli.js de claude-code)"""
+    proc = Path('/proc')
+    if not proc.is_dir():
+        try:
+            return subprocess.run(['pgrep', '-x', 'claude'], capture_output=True).returncode == 0
+        except OSError:
+            return True  # Sin forma de saberlo: no arriesgar
+    for pid_dir in proc.iterdir():
+        if not pid_dir.name.isdigit():
+            continue
+        try:
+            argv = (pid_dir / 'cmdline').read_bytes().split(b'\0')
+        except OSError:
+            continue
+        for arg in argv[:3]:  # node /ruta/cli.js ...: el script va en los primeros
+            name = os.path.basename(arg.decode(errors='replace'))
+            if name == 'claude' or (name == 'cli.js' and b'claude-code' in arg):
+                return True
+    return False
+
+class CompactResult:
+    def __init__(self, archived: int = 0, before: int = 0, after: int = 0,
+                 skipped: Optional[str] = None):
+        self.archived = archived
+        self.before = before
+        self.after = after
+        self.skipped = skipped
+
+    def __bool__(self):
+        return self.archived > 0 and self.skipped is None
+
+    def __str__(self):
+        if self.skipped:
+            return f"sin compactar: {self.skipped}"
+        return (f"{self.archived} entradas archivadas, "
+                f"{format_bytes(self.before)} → {format_bytes(self.after)}")
+
+def compact_claude_json(claude_json: Path = CLAUDE_JSON, archive: Path = ARCHIVE_FILE,
+                        keep: int = HISTORY_KEEP, dry_run: bool = False,
+                        force: bool = False) -> CompactResult:
+    """Recortar projects.*.history a `keep` entradas (las primeras son las más nuevas)
+
+    Sin `force` no se toca nada mientras haya un CLI `claude` abierto.
+    """
+    claude_json, archive = Path(claude_json), Path(archive)
+    if not dry_run and not force and claude_running():
+        return CompactResult(skipped="hay un CLI claude abierto")
+    try:
+        before = claude_json.stat()
+        with open(claude_json, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return CompactResult(skipped="no existe")
+    except ValueError:
+        return CompactResult(skipped="JSON inválido (¿escritura en curso?)")
+
+    old: List[Dict] = []
+    for project, settings in (data.get('projects') or {}).items():
+        history = settings.get('history') if isinstance(settings, dict) else None
+        if not isinstance(history, list) or len(history) <= keep:
+            continue
+        old.extend({'project': project, 'entry': entry} for entry in history[keep:])
+        settings['history'] = history[:keep]
+    if not old:
+        return CompactResult(before=before.st_size, after=before.st_size)
+
+    payload = json.dumps(data, indent=2, ensure_ascii=False)
+    result = CompactResult(len(old), before.st_size, len(payload.encode()))
+    if dry_run:
+        return result
+
+    # 1) Archivo append-only. Sin deduplicar: un prompt repetido con el mismo
+    # texto es otra entrada. Lo que no llega a salir de ~/.claude.json se
+    # quita del archivo en (2), así un reintento no lo duplica
+    lines = []
+    for record in old:
+        record['h'] = entry_hash(record['project'], record['entry'])
+        lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    # 0600 como ~/.claude.json: el historial puede contener secretos pegados
+    fd = os.open(archive, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    with open(fd, 'a', encoding='utf-8') as f:
+        archived_size = os.fstat(f.fileno()).st_size
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+    # 2) Reescritura atómica solo si nadie tocó el archivo mientras tanto
+    tmp = claude_json.with_name(f".{claude_json.name}.compact.{os.getpid()}")
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, before.st_mode & 0o777)
+        current = claude_json.stat()
+        if (current.st_size, current.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            tmp.unlink()
+            os.truncate(archive, archived_size)
+            return CompactResult(skipped="el CLI lo modificó durante la compactación")
+        os.replace(tmp, claude_json)
+    except BaseException:
+        # Las entradas siguen en ~/.claude.json: fuera del archivo
+        if tmp.exists():
+            tmp.unlink()
+        os.truncate(archive, archived_size)
+        raise
+    return result
+
+#=============================================================================
+# ETAPA DEL MOTOR
+#=============================================================================
+class CompactStage(Stage):
+    """Compactar ~/.claude.json antes del sync"""
+
+    name = "compact"
+    interval = COMPACT_INTERVAL
+
+    def __init__(self, claude_json: Path = CLAUDE_JSON, archive: Path = ARCHIVE_FILE,
+                 keep: int = HISTORY_KEEP):
+        self.claude_json = Path(claude_json)
+        self.archive = Path(archive)
+        self.keep = keep
+
+    def run(self) -> List[Path]:
+        result = compact_claude_json(self.claude_json, self.archive, self.keep)
+        if result.skipped:
+            logging.info(f"🗜️  {self.claude_json.name} {result}")
+        if not result:
+            return []
+        logging.info(f"🗜️  {self.claude_json.name} compactado: {result}")
+        return [self.claude_json, self.archive]
+
+#=============================================================================
+# MAIN
+#=============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Compactar el historial de ~/.claude.json")
+    parser.add_argument('--file', type=Path, default=CLAUDE_JSON,
+                        help=f'Archivo a compactar (default {CLAUDE_JSON})')
+    parser.add_argument('--archive', type=Path, default=ARCHIVE_FILE,
+                        help=f'Archivo append-only del historial (default {ARCHIVE_FILE})')
+    parser.add_argument('--keep', type=int, default=HISTORY_KEEP or 30,
+                        help='Entradas de historial por proyecto que se conservan')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Mostrar qué se archivaría sin escribir nada')
+    parser.add_argument('--force', action='store_true',
+                        help='Compactar aunque haya un CLI claude abierto')
+    parser.add_argument('--search', metavar='TEXTO',
+                        help='Buscar en el historial archivado')
+    parser.add_argument('--project', help='Filtrar la búsqueda por proyecto (subcadena de la ruta)')
+    args = parser.parse_args()
+
+    if args.search is not None:
+        found = 0
+        for record in search_archive(args.archive, args.search, args.project):
+            found += 1
+            print(f"📁 {record['project']}\n   {record['entry'].get('display', '')}")
+        print(f"🔍 {found} resultados")
+        return
+
+    result = compact_claude_json(args.file, args.archive, args.keep, dry_run=args.dry_run,
+                                 force=args.force)
+    print(f"{'🔍 (dry-run) ' if args.dry_run else '🗜️  '}{args.file}: {result}")
+    sys.exit(1 if result.skipped and result.skipped != "no existe" else 0)
+
+if __name__ == "__main__":
+    main()
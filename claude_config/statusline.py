@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Claude Code Statusline - Renderer nativo en Python
+Equivalente a statusline.sh (mismas 3 líneas y mismos umbrales de color)
+- El JSON de entrada se parsea una sola vez (sin forks de jq)
+- Branch, ahead/behind y cambios salen de un único
+  `git status --porcelain=v2 --branch`
+- Caché por repo y por sesión con stale-while-revalidate: se sirve el
+  último valor al instante y se refresca en background
+- Deadline duro de render: lo que no llega a tiempo se muestra como "?"
+- Costos de sesión/día/bloque desde usage_aggregator.py (transcripts
+  leídos de forma incremental), sin arrancar Node en cada render
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import getpass
+import hashlib
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+from usage_aggregator import statusline_usage
+
+#=============================================================================
+# COLORES PROFESIONALES - Paleta coherente
+#=============================================================================
+C_RESET = '\033[0m'
+
+# Sistema y tiempo
+C_TIME = '\033[38;5;245m'          # Gris medio
+C_DIR = '\033[38;5;75m'            # Azul cielo
+C_TERMINAL = '\033[38;5;240m'      # Gris oscuro
+
+# Git - Verde/Amarillo/Rojo
+C_BRANCH = '\033[38;5;180m'        # Beige branch
+C_GIT_OK = '\033[38;5;65m'         # Verde apagado
+C_GIT_WARN = '\033[38;5;172m'      # Amarillo apagado
+C_GIT_DANGER = '\033[38;5;124m'    # Rojo apagado
+C_GIT_NEUTRAL = '\033[38;5;240m'   # Gris neutro
+
+# Contexto - Gradiente verde a rojo
+C_CTX_LOW = '\033[38;5;65m'        # Verde bosque
+C_CTX_MED = '\033[38;5;172m'       # Amarillo dorado
+C_CTX_HIGH = '\033[38;5;166m'      # Naranja apagado
+C_CTX_CRITICAL = '\033[38;5;124m'  # Rojo ladrillo
+
+# Métricas y costos
+C_MODEL = '\033[38;5;141m'         # Púrpura suave
+C_COST = '\033[38;5;178m'          # Dorado suave
+C_COUNT = '\033[38;5;73m'          # Cyan apagado
+C_SESSION = '\033[38;5;96m'        # Magenta apagado
+
+MAX_CONTEXT = 200000  # Límite de contexto asumido (Sonnet)
+
+# Caché de segmentos
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'claude-statusline'
+RENDER_DEADLINE = float(os.environ.get('CLAUDE_STATUSLINE_DEADLINE', '0.3'))  # segundos
+GIT_TTL = 10          # segundos que un git status cacheado se considera fresco
+USAGE_TTL = 30        # segundos que las métricas de uso se consideran frescas
+REFRESH_LOCK_TTL = 60 # un refresco colgado más tiempo se considera muerto
+
+FRESH, STALE, UNKNOWN = 'fresh', 'stale', 'unknown'
+
+#=============================================================================
+# ENTRADA Y DATOS BÁSICOS
+#=============================================================================
+def read_input() -> Dict:
+    """Parsear el JSON de Claude Code una sola vez"""
+    try:
+        return json.loads(sys.stdin.read() or '{}')
+    except ValueError:
+        return {}
+
+def short_path(path: str) -> str:
+    """Acortar rutas largas a los últimos 3 directorios"""
+    if len(path) > 40:
+        parts = path.split('/')
+        if len(parts) > 3:
+            return "..." + "/".join(parts[-3:])
+    return path
+
+def dir_color(path: str) -> str:
+    """Color dinámico para el directorio"""
+    if "/repos/" in path:
+        return C_GIT_OK
+    if path == os.path.expanduser('~'):
+        return C_DIR
+    if path.startswith('/'):
+        return C_TERMINAL
+    return C_DIR
+
+#=============================================================================
+# GIT STATUS INTELIGENTE
+#=============================================================================
+def collect_git(cwd: str) -> Optional[Dict]:
+    """Branch, ahead/behind y cambios con una sola llamada a git"""
+    try:
+        result = subprocess.run(
+            ['git', 'status', '--porcelain=v2', '--branch'],
+            cwd=cwd, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+
+    info = {'branch': 'detached', 'ahead': 0, 'behind': 0,
+            'added': 0, 'modified': 0, 'deleted': 0}
+    for line in result.stdout.splitlines():
+        if line.startswith('# branch.head '):
+            head = line[len('# branch.head '):]
+            if head != '(detached)':
+                info['branch'] = head
+        elif line.startswith('# branch.ab '):
+            ahead, behind = line[len('# branch.ab '):].split()
+            info['ahead'] = int(ahead.lstrip('+'))
+            info['behind'] = int(behind.lstrip('-'))
+        elif line[:2] in ('1 ', '2 ', 'u '):
+            xy = line[2:4]
+            if xy[0] == 'A':
+                info['added'] += 1
+            if xy[1] == 'M':
+                info['modified'] += 1
+            if xy[1] == 'D':
+                info['deleted'] += 1
+    return info
+
+def find_git_dir(cwd: str) -> Optional[Path]:
+    """Localizar el directorio .git sin ejecutar git (soporta worktrees)"""
+    path = Path(cwd)
+    for candidate in [path] + list(path.parents):
+        dot_git = candidate / '.git'
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            try:
+                content = dot_git.read_text().strip()
+            except OSError:
+                return None
+            if content.startswith('gitdir:'):
+                gitdir = Path(content[len('gitdir:'):].strip())
+                return gitdir if gitdir.is_absolute() else (candidate / gitdir).resolve()
+            return None
+    return None
+
+def git_cache_key(git_dir: Path) -> str:
+    """Clave de caché: mtime de .git/index y HEAD"""
+    parts = []
+    for name in ('index', 'HEAD'):
+        try:
+            parts.append(str((git_dir / name).stat().st_mtime_ns))
+        except OSError:
+            parts.append('-')
+    return ':'.join(parts)
+
+def git_segment(info: Optional[Dict], state: str = FRESH) -> str:
+    """Bloque git de la línea 1"""
+    if state == UNKNOWN:
+        n = C_GIT_NEUTRAL
+        return (f"{n}?{C_RESET} {n}↑?{C_RESET} {n}↓?{C_RESET} "
+                f"{n}+?{C_RESET} {n}~?{C_RESET} {n}-?{C_RESET} {n}...{C_RESET}")
+    if info is None:
+        n = C_GIT_NEUTRAL
+        return (f"{C_BRANCH}no-git{C_RESET} {n}↑0{C_RESET} {n}↓0{C_RESET} "
+                f"{n}+0{C_RESET} {n}~0{C_RESET} {n}-0{C_RESET} {n}---{C_RESET}")
+
+    total = info['added'] + info['modified'] + info['deleted']
+    if total > 15:
+        status = f"{C_GIT_DANGER}HOT{C_RESET}"
+    elif total > 5:
+        status = f"{C_GIT_WARN}WIP{C_RESET}"
+    elif total > 0:
+        status = f"{C_GIT_WARN}MOD{C_RESET}"
+    else:
+        status = f"{C_GIT_OK}CLEAN{C_RESET}"
+
+    def pick(value, color):
+        return color if value > 0 else C_GIT_NEUTRAL
+
+    return (f"{C_BRANCH}{info['branch']}{C_RESET} "
+            f"{pick(info['ahead'], C_GIT_OK)}↑{info['ahead']}{C_RESET} "
+            f"{pick(info['behind'], C_GIT_DANGER)}↓{info['behind']}{C_RESET} "
+            f"{pick(info['added'], C_GIT_OK)}+{info['added']}{C_RESET} "
+            f"{pick(info['modified'], C_GIT_WARN)}~{info['modified']}{C_RESET} "
+            f"{pick(info['deleted'], C_GIT_DANGER)}-{info['deleted']}{C_RESET} "
+            f"{status}{stale_mark(state)}")
+
+def stale_mark(state: str) -> str:
+    """Marca discreta para valores servidos desde caché caducada"""
+    return f"{C_TERMINAL}·{C_RESET}" if state == STALE else ""
+
+#=============================================================================
+# MÉTRICAS DE USO (agregador incremental, sin npx ccusage)
+#=============================================================================
+def model_label(data: Dict) -> str:
+    """Nombre corto del modelo (Claude Sonnet 4 → S4)"""
+    model = data.get('model') or {}
+    if isinstance(model, dict):
+        name = model.get('display_name') or model.get('id') or 'Unknown'
+    else:
+        name = str(model)
+    return name.replace('Claude ', '').replace('Sonnet', 'S').replace('Opus', 'O').replace(' ', '')
+
+#=============================================================================
+# CACHÉ STALE-WHILE-REVALIDATE
+#=============================================================================
+class SegmentCache:
+    """Entradas {key, value, time} por segmento en CACHE_DIR"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.json"
+
+    def load(self, name: str) -> Optional[Dict]:
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, name: str, key: str, value):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(name)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump({'key': key, 'value': value, 'time': time.time()}, f)
+        os.replace(tmp, path)
+
+    def acquire_refresh(self, name: str) -> bool:
+        """Lock de refresco: como mucho un refresco en vuelo por segmento"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        lock = self.cache_dir / f"{name}.lock"
+        for _ in range(2):
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - lock.stat().st_mtime < REFRESH_LOCK_TTL:
+                        return False
+                    lock.unlink()
+                except OSError:
+                    return False
+        return False
+
+    def release_refresh(self, name: str):
+        try:
+            (self.cache_dir / f"{name}.lock").unlink()
+        except OSError:
+            pass
+
+class Segment:
+    """Un segmento cacheable: nombre de caché, clave, TTL y cómo calcularlo"""
+
+    def __init__(self, name: str, kind: str, key: str, ttl: float, payload: Dict):
+        self.name = name
+        self.kind = kind
+        self.key = key
+        self.ttl = ttl
+        self.payload = payload
+
+    def compute(self):
+        return compute_segment(self.kind, self.payload)
+
+def compute_segment(kind: str, payload: Dict):
+    """Calcular el valor de un segmento desde cero"""
+    if kind == 'git':
+        return collect_git(payload['cwd'])
+    if kind == 'usage':
+        return statusline_usage(payload['data'])
+    raise ValueError(kind)
+
+def spawn_refresh(cache: SegmentCache, segment: Segment):
+    """Refrescar un segmento en un proceso desacoplado (no bloquea el render)"""
+    if not cache.acquire_refresh(segment.name):
+        return
+    try:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--refresh'],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True)
+        proc.stdin.write(json.dumps({'name': segment.name, 'kind': segment.kind,
+                                     'key': segment.key, 'payload': segment.payload}).encode())
+        proc.stdin.close()
+    except OSError:
+        cache.release_refresh(segment.name)
+
+def refresh_main():
+    """Modo --refresh: calcular un segmento y guardarlo en caché"""
+    job = json.loads(sys.stdin.read())
+    cache = SegmentCache()
+    try:
+        cache.store(job['name'], job['key'], compute_segment(job['kind'], job['payload']))
+    finally:
+        cache.release_refresh(job['name'])
+
+def resolve_segments(segments, deadline: float, cache: SegmentCache) -> Dict:
+    """Resolver segmentos respetando el deadline: nombre -> (valor, estado)"""
+    results = {}
+    cold = []
+    now = time.time()
+    for segment in segments:
+        entry = cache.load(segment.name)
+        if entry and entry.get('key') == segment.key and now - entry.get('time', 0) < segment.ttl:
+            results[segment.name] = (entry['value'], FRESH)
+        elif entry:
+            # Stale-while-revalidate: servir ya, refrescar por detrás
+            results[segment.name] = (entry['value'], STALE)
+            spawn_refresh(cache, segment)
+        else:
+            box = {}
+            worker = threading.Thread(target=lambda s=segment, b=box: b.update(value=s.compute()),
+                                      daemon=True)
+            worker.start()
+            cold.append((segment, worker, box))
+
+    for segment, worker, box in cold:
+        worker.join(max(0.0, deadline - time.monotonic()))
+        if 'value' in box:
+            cache.store(segment.name, segment.key, box['value'])
+            results[segment.name] = (box['value'], FRESH)
+        else:
+            results[segment.name] = (None, UNKNOWN)
+            spawn_refresh(cache, segment)
+    return results
+
+def cache_name(prefix: str, ident: str) -> str:
+    return f"{prefix}-{hashlib.sha1(ident.encode()).hexdigest()[:16]}"
+
+#=============================================================================
+# EMOJIS Y COLORES INTELIGENTES
+#=============================================================================
+def burn_style(burn_rate: str):
+    match = re.search(r'\$([0-9]+)', burn_rate or '')
+    if not match:
+        return C_GIT_NEUTRAL, "📊"
+    rate = int(match.group(1))
+    if rate > 10:
+        return C_GIT_DANGER, "🔥"
+    if rate > 5:
+        return C_GIT_WARN, "⚡"
+    return C_GIT_OK, "💚"
+
+def context_style(context: str):
+    match = re.search(r'\(([0-9]+)%\)', context or '')
+    if not match:
+        return C_GIT_NEUTRAL, "⚪"
+    pct = int(match.group(1))
+    if pct > 90:
+        return C_CTX_CRITICAL, "🔴"
+    if pct > 75:
+        return C_CTX_HIGH, "🟠"
+    if pct > 50:
+        return C_CTX_MED, "🟡"
+    return C_CTX_LOW, "🟢"
+
+def block_style(block_time: str):
+    match = re.search(r'([0-9]+)h', block_time or '')
+    if not match:
+        return C_GIT_NEUTRAL, "🕐"
+    hours = int(match.group(1))
+    if hours < 1:
+        return C_GIT_DANGER, "⏰"
+    if hours < 2:
+        return C_GIT_WARN, "⏲"
+    return C_GIT_OK, "⏱"
+
+def session_color(session_cost: str) -> str:
+    match = re.search(r'\$([0-9]+)', session_cost or '')
+    if not match:
+        return C_COST
+    cost = int(match.group(1))
+    if cost > 5:
+        return C_GIT_DANGER
+    if cost > 2:
+        return C_GIT_WARN
+    return C_GIT_OK
+
+#=============================================================================
+# OUTPUT FINAL - 3 LÍNEAS LIMPIAS
+#=============================================================================
+def render(data: Dict, git_block: str, usage: Dict, usage_state: str = FRESH) -> str:
+    """Componer las 3 líneas del statusline"""
+    cwd = os.getcwd()
+    width = shutil.get_terminal_size((80, 24)).columns
+    cost = data.get('cost') or {}
+    session_cost = float(cost.get('total_cost_usd') or 0)
+    model = model_label(data)
+
+    # Línea 1: Sistema y Git con ruta completa
+    lines = [f"{C_TIME}{time.strftime('%H:%M')}{C_RESET} {C_TERMINAL}{getpass.getuser()}{C_RESET} "
+             f"{dir_color(cwd)}{short_path(cwd)}{C_RESET} {git_block} "
+             f"{C_TERMINAL}{width}cols{C_RESET}"]
+
+    if usage_state == UNKNOWN:
+        # Métricas aún no disponibles dentro del deadline
+        lines.append(f"🤖 {C_MODEL}{model}{C_RESET} │ 💰 {C_COST}${session_cost:.2f}{C_RESET} │ "
+                     f"{C_GIT_NEUTRAL}📊 ...{C_RESET}")
+        return "\n".join(lines)
+
+    if usage:
+        session_final = usage.get('session_calc') or f"${session_cost:.2f}"
+        context = usage.get('context', '')
+    else:
+        session_final = f"${session_cost:.2f}"
+        tokens = int(cost.get('input_tokens') or 0) + int(cost.get('output_tokens') or 0)
+        context = f"{tokens} ({tokens * 100 // MAX_CONTEXT}%)" if tokens > 0 else ''
+
+    ctx_color, ctx_emoji = context_style(context)
+    s_color = session_color(session_final)
+
+    # Línea 2: Métricas principales
+    if usage:
+        line2 = f"🤖 {C_MODEL}{model}{C_RESET}"
+        line2 += f" │ 💰 {s_color}{session_final}{C_RESET}"
+        if usage.get('today'):
+            line2 += f" │ 📅 {C_COST}{usage['today']}{C_RESET}"
+        if usage.get('block') and usage.get('block_time'):
+            b_color, t_emoji = block_style(usage['block_time'])
+            line2 += f" │ {t_emoji} {b_color}{usage['block']} {usage['block_time']}{C_RESET}"
+        if usage.get('burn_rate'):
+            r_color, r_emoji = burn_style(usage['burn_rate'])
+            line2 += f" │ {r_emoji} {r_color}{usage['burn_rate']}{C_RESET}"
+        if context:
+            line2 += f" │ {ctx_emoji} {ctx_color}{context}{C_RESET}"
+        lines.append(line2 + stale_mark(usage_state))
+    else:
+        # Fallback simple + Línea 3 con duración y sesión
+        lines.append(f"🤖 {C_MODEL}{model}{C_RESET} │ 💰 {s_color}{session_final}{C_RESET} │ "
+                     f"{ctx_emoji} {ctx_color}{context or 'N/A'}{C_RESET}")
+        duration_ms = int(cost.get('total_duration_ms') or 0)
+        duration = f"{duration_ms // 60000}m" if duration_ms > 0 else "0m"
+        session_short = str(data.get('session_id', 'unknown'))[:8]
+        lines.append(f"{C_COUNT}{duration}{C_RESET} {C_SESSION}{session_short}{C_RESET}")
+
+    return "\n".join(lines)
+
+def build_segments(data: Dict, cwd: str):
+    """Segmentos cacheables de este render"""
+    segments = []
+    git_dir = find_git_dir(cwd)
+    if git_dir is not None:
+        segments.append(Segment(cache_name('git', cwd), 'git', git_cache_key(git_dir),
+                                GIT_TTL, {'cwd': cwd}))
+
+    session_id = str(data.get('session_id', 'unknown'))
+    transcript = data.get('transcript_path') or ''
+    try:
+        transcript_size = os.stat(transcript).st_size if transcript else 0
+    except OSError:
+        transcript_size = 0
+    segments.append(Segment(cache_name('usage', session_id), 'usage',
+                            f"{session_id}:{transcript_size}", USAGE_TTL,
+                            {'data': data}))
+    return segments
+
+def main():
+    if '--refresh' in sys.argv:
+        refresh_main()
+        return
+
+    deadline = time.monotonic() + RENDER_DEADLINE
+    data = read_input()
+    cwd = os.getcwd()
+    segments = build_segments(data, cwd)
+    results = resolve_segments(segments, deadline, SegmentCache())
+
+    git_value, git_state = None, FRESH
+    usage_value, usage_state = {}, FRESH
+    for segment in segments:
+        value, state = results[segment.name]
+        if segment.kind == 'git':
+            git_value, git_state = value, state
+        else:
+            usage_value, usage_state = value or {}, state
+
+    print(render(data, git_segment(git_value, git_state), usage_value, usage_state))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Claude Usage Aggregator - Costos y uso sin `npx ccusage`
+Lee los transcripts JSONL de forma incremental (offsets guardados por
+archivo) y mantiene totales acumulados por sesión, por día y por bloque
+de 5 horas. El costo de cada consulta no crece con el historial.
+"""
+
+import os
+import json
+import time
+import fcntl
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+STATE_VERSION = 1
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'claude-statusline'
+STATE_FILE = CACHE_DIR / 'usage_state.json'
+PROJECTS_DIR = Path.home() / '.claude' / 'projects'
+
+RETENTION_DAYS = 7         # entradas más antiguas no cuentan ni se guardan
+DISCOVERY_INTERVAL = 300   # segundos entre búsquedas de transcripts nuevos
+BLOCK_SECONDS = 5 * 3600   # bloques de facturación de 5 horas
+MAX_BLOCKS = 40
+MAX_CONTEXT = 200000
+MAX_READ = 8 * 1024 * 1024 # tope de lectura por archivo y consulta
+
+# USD por millón de tokens: input, output, cache write, cache read
+PRICING = {
+    'opus': (15.0, 75.0, 18.75, 1.50),
+    'sonnet': (3.0, 15.0, 3.75, 0.30),
+    'haiku-3-5': (0.80, 4.0, 1.00, 0.08),
+    'haiku': (0.25, 1.25, 0.30, 0.03),
+}
+
+#=============================================================================
+# PRECIOS Y PARSEO
+#=============================================================================
+def model_pricing(model: str):
+    """Tarifa de un modelo por familia (sonnet si no se reconoce)"""
+    model = (model or '').lower()
+    if 'opus' in model:
+        return PRICING['opus']
+    if 'haiku' in model:
+        if '3-5' in model or '3.5' in model or 'haiku-4' in model:
+            return PRICING['haiku-3-5']
+        return PRICING['haiku']
+    return PRICING['sonnet']
+
+def entry_cost(entry: Dict, usage: Dict, model: str) -> float:
+    """Costo de una entrada: costUSD si viene, si no por tarifa"""
+    if isinstance(entry.get('costUSD'), (int, float)):
+        return float(entry['costUSD'])
+    price_in, price_out, price_write, price_read = model_pricing(model)
+    return (usage.get('input_tokens', 0) * price_in
+            + usage.get('output_tokens', 0) * price_out
+            + usage.get('cache_creation_input_tokens', 0) * price_write
+            + usage.get('cache_read_input_tokens', 0) * price_read) / 1_000_000
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """ISO-8601 (con Z) → epoch"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def day_key(ts: float) -> str:
+    return time.strftime('%Y-%m-%d', time.localtime(ts))
+
+#=============================================================================
+# AGREGADOR
+#=============================================================================
+class UsageAggregator:
+    """Estado incremental persistido en STATE_FILE"""
+
+    def __init__(self, state_file: Path = STATE_FILE, projects_dir: Path = PROJECTS_DIR):
+        self.state_file = Path(state_file)
+        self.projects_dir = Path(projects_dir)
+        self.dirty = False
+        self.state = self._load()
+
+    def _empty(self) -> Dict:
+        return {'version': STATE_VERSION, 'files': {}, 'sessions': {}, 'days': {},
+                'blocks': [], 'seen': {}, 'discovered': 0}
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+        return self._empty()
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_name(f".{self.state_file.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, separators=(',', ':'))
+        os.replace(tmp, self.state_file)
+        self.dirty = False
+
+    # -- registro de archivos ------------------------------------------------
+    def track(self, path: str, session_id: Optional[str] = None):
+        """Añadir un transcript a la lista de archivos seguidos"""
+        if not path:
+            return
+        files = self.state['files']
+        if path not in files:
+            files[path] = {'offset': 0, 'inode': None,
+                           'session': session_id or Path(path).stem}
+            self.dirty = True
+
+    def discover(self, now: float):
+        """Buscar transcripts recientes de otras sesiones (amortizado)"""
+        if now - self.state.get('discovered', 0) < DISCOVERY_INTERVAL:
+            return
+        cutoff = now - RETENTION_DAYS * 86400
+        try:
+            project_dirs = list(os.scandir(self.projects_dir))
+        except OSError:
+            project_dirs = []
+        for project in project_dirs:
+            if not project.is_dir():
+                continue
+            try:
+                for entry in os.scandir(project.path):
+                    if entry.name.endswith('.jsonl') and entry.stat().st_mtime >= cutoff:
+                        self.track(entry.path)
+            except OSError:
+                continue
+        self.state['discovered'] = now
+        self.dirty = True
+
+    # -- lectura incremental ---------------------------------------------------
+    def update(self, now: Optional[float] = None):
+        """Leer solo los bytes nuevos de cada transcript seguido"""
+        now = now or time.time()
+        cutoff = now - RETENTION_DAYS * 86400
+        for path, info in list(self.state['files'].items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.state['files'][path]
+                self.dirty = True
+                continue
+            if st.st_mtime < cutoff:
+                # Transcript frío: ya no puede aportar a ningún total vigente
+                del self.state['files'][path]
+                self.dirty = True
+                continue
+            if info.get('inode') not in (None, st.st_ino) or st.st_size < info['offset']:
+                info['offset'] = 0  # Reemplazado o truncado: releer (seen deduplica)
+            info['inode'] = st.st_ino
+            if st.st_size > info['offset']:
+                self._read_tail(path, info, cutoff)
+        self._prune(now)
+
+    def _read_tail(self, path: str, info: Dict, cutoff: float):
+        with open(path, 'rb') as f:
+            f.seek(info['offset'])
+            data = f.read(MAX_READ)
+        start = 0
+        if info.get('skipping'):
+            # Descartando una línea de más de MAX_READ: hasta su salto de línea
+            start = data.find(b'\n') + 1
+            if not start:
+                info['offset'] += len(data)
+                self.dirty = True
+                return
+            info['skipping'] = False
+        end = data.rfind(b'\n')
+        if end < start:
+            if start == 0 and len(data) == MAX_READ:
+                # Una sola línea llena la ventana: saltarla, si no el archivo se atasca
+                info['skipping'] = True
+                info['offset'] += len(data)
+                self.dirty = True
+            elif start:
+                info['offset'] += start
+                self.dirty = True
+            return  # Si no, línea a medio escribir: esperar a la siguiente consulta
+        for line in data[start:end].split(b'\n'):
+            if line.strip():
+                self._ingest(line, info['session'], cutoff)
+        info['offset'] += end + 1
+        self.dirty = True
+
+    def _ingest(self, line: bytes, session_id: str, cutoff: float):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return
+        message = entry.get('message')
+        if not isinstance(message, dict) or not isinstance(message.get('usage'), dict):
+            return
+        ts = parse_timestamp(entry.get('timestamp'))
+        if ts is None or ts < cutoff:
+            return
+
+        # Deduplicar (las sesiones reanudadas repiten mensajes)
+        key = f"{message.get('id')}:{entry.get('requestId')}"
+        if message.get('id') and key in self.state['seen']:
+            return
+        self.state['seen'][key] = ts
+
+        usage = message['usage']
+        cost = entry_cost(entry, usage, message.get('model', ''))
+        session_id = entry.get('sessionId') or session_id
+
+        session = self.state['sessions'].setdefault(session_id, {'cost': 0.0, 'context': 0, 'last': 0})
+        session['cost'] += cost
+        if ts >= session['last']:
+            session['last'] = ts
+            session['context'] = (usage.get('input_tokens', 0)
+                                  + usage.get('cache_creation_input_tokens', 0)
+                                  + usage.get('cache_read_input_tokens', 0))
+
+        day = day_key(ts)
+        self.state['days'][day] = self.state['days'].get(day, 0.0) + cost
+        self._add_to_block(ts, cost)
+
+    def _add_to_block(self, ts: float, cost: float):
+        """Asignar costo al bloque de 5h que contiene ts (o abrir uno nuevo)"""
+        for block in self.state['blocks']:
+            if block['start'] <= ts < block['start'] + BLOCK_SECONDS:
+                block['cost'] += cost
+                block['first'] = min(block['first'], ts)
+                block['last'] = max(block['last'], ts)
+                return
+        start = ts - (ts % 3600)  # inicio truncado a la hora
+        self.state['blocks'].append({'start': start, 'first': ts, 'last': ts, 'cost': cost})
+        self.state['blocks'].sort(key=lambda b: b['start'])
+
+    def _prune(self, now: float):
+        """Descartar lo que ya no entra en la ventana de retención"""
+        cutoff = now - RETENTION_DAYS * 86400
+        seen = self.state['seen']
+        old = [k for k, ts in seen.items() if ts < cutoff]
+        for k in old:
+            del seen[k]
+        cutoff_day = day_key(cutoff)
+        for day in [d for d in self.state['days'] if d < cutoff_day]:
+            del self.state['days'][day]
+        for sid in [s for s, v in self.state['sessions'].items() if v['last'] < cutoff]:
+            del self.state['sessions'][sid]
+        if len(self.state['blocks']) > MAX_BLOCKS:
+            self.state['blocks'] = self.state['blocks'][-MAX_BLOCKS:]
+        if old:
+            self.dirty = True
+
+    # -- consultas -------------------------------------------------------------
+    def active_block(self, now: float) -> Optional[Dict]:
+        for block in reversed(self.state['blocks']):
+            if block['start'] <= now < block['start'] + BLOCK_SECONDS and now - block['last'] < BLOCK_SECONDS:
+                return block
+        return None
+
+    def summary(self, session_id: Optional[str], now: Optional[float] = None) -> Dict:
+        """Métricas para el statusline (mismas claves que el parser de ccusage)"""
+        now = now or time.time()
+        result = {}
+        session = self.state['sessions'].get(session_id or '')
+        if session:
+            result['session_calc'] = f"${session['cost']:.2f}"
+            if session['context']:
+                pct = session['context'] * 100 // MAX_CONTEXT
+                result['context'] = f"{session['context']:,} ({pct}%)"
+
+        result['today'] = f"${self.state['days'].get(day_key(now), 0.0):.2f}"
+
+        block = self.active_block(now)
+        if block:
+            left = int(block['start'] + BLOCK_SECONDS - now)
+            result['block'] = f"${block['cost']:.2f}"
+            result['block_time'] = f"{left // 3600}h {(left % 3600) // 60}m left"
+            elapsed = block['last'] - block['first']
+            if elapsed >= 60:
+                result['burn_rate'] = f"${block['cost'] / (elapsed / 3600):.2f}/hr"
+        return result
+
+#=============================================================================
+# API PARA EL STATUSLINE
+#=============================================================================
+def statusline_usage(data: Dict, state_file: Path = STATE_FILE) -> Dict:
+    """Actualizar el estado con lo nuevo y devolver las métricas de la sesión"""
+    state_file = Path(state_file)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    session_id = data.get('session_id')
+    now = time.time()
+    with open(state_file.with_suffix('.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        aggregator = UsageAggregator(state_file)
+        aggregator.track(data.get('transcript_path') or '', session_id)
+        aggregator.discover(now)
+        aggregator.update(now)
+        aggregator.save()
+    return aggregator.summary(session_id, now)
+
+def main():
+    parser = argparse.ArgumentParser(description="Agregador incremental de uso de Claude Code")
+    parser.add_argument('--transcript', help='Transcript JSONL a seguir')
+    parser.add_argument('--session', help='session_id a resumir')
+    args = parser.parse_args()
+    print(json.dumps(statusline_usage({'transcript_path': args.transcript,
+                                       'session_id': args.session}), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Claude Control - API de control del daemon por socket unix
+El daemon atiende comandos; el CLI pasa a ser un cliente fino
+- Protocolo: una línea JSON de petición {"cmd": ...} y una de respuesta
+- Comandos: sync, status, pause, resume, reload
+- Socket 0600 en el directorio de estado: solo el usuario dueño
+"""
+
+import os
+import json
+import socket
+import logging
+import threading
+import socketserver
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+CLIENT_TIMEOUT = 2         # segundos para comandos inmediatos (status, pause...)
+MAX_REQUEST = 64 * 1024    # bytes por petición
+
+Handler = Callable[[Dict], Dict]
+
+#=============================================================================
+# SERVIDOR
+#=============================================================================
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST)
+        try:
+            request = json.loads(line)
+            handler = self.server.handlers.get(request.get('cmd'))
+            if handler is None:
+                response = {'ok': False, 'error': f"comando desconocido: {request.get('cmd')}"}
+            else:
+                response = handler(request)
+        except ValueError:
+            response = {'ok': False, 'error': 'petición inválida'}
+        except Exception as e:
+            logging.error(f"❌ Error atendiendo comando de control: {e}")
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write((json.dumps(response) + "\n").encode())
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class ControlServer:
+    """Socket de control del daemon (se atiende en un thread aparte)"""
+
+    def __init__(self, socket_path: Path, handlers: Dict[str, Handler]):
+        self.socket_path = Path(socket_path)
+        self.handlers = handlers
+        self.server: Optional[_Server] = None
+
+    def start(self):
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.socket_path.unlink()  # Socket huérfano de un daemon anterior
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o177)
+        try:
+            self.server = _Server(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.server.handlers = self.handlers
+        threading.Thread(target=self.server.serve_forever, name='control',
+                         daemon=True).start()
+        logging.info(f"🎛️  Socket de control en {self.socket_path}")
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+#=============================================================================
+# CLIENTE
+#=============================================================================
+def send_command(socket_path: Path, cmd: str, timeout: float = CLIENT_TIMEOUT,
+                 **args) -> Optional[Dict]:
+    """Enviar un comando al daemon. None si no hay daemon escuchando."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall((json.dumps(dict(args, cmd=cmd)) + "\n").encode())
+            data = b''
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except socket.timeout:
+        return {'ok': False, 'error': f"el daemon no respondió en {timeout:g}s"}
+    except OSError as e:
+        return {'ok': False, 'error': str(e)}
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {'ok': False, 'error': 'respuesta inválida del daemon'}
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Claude Copy - Motor de copia paralelo asistido por el kernel
+Reemplaza shutil.copy2 archivo a archivo y el rmtree + copytree completo
+- Reflink (FICLONE) en btrfs/xfs/ZFS: copia instantánea copy-on-write
+- copy_file_range / sendfile: los datos no pasan por espacio de usuario
+- Diff origen/destino por (size, mtime_ns): solo se tocan las entradas
+  añadidas, cambiadas o borradas
+- Copias en un pool de threads (el kernel hace el trabajo, sin GIL)
+"""
+
+import os
+import errno
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from claude_manifest import iter_files
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin reflink
+    fcntl = None
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+FICLONE = 0x40049409           # ioctl de Linux para reflinks
+COPY_CHUNK = 64 * 1024 * 1024  # bytes por llamada a copy_file_range/sendfile
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+# errno que significan "esta vía no está soportada aquí": probar la siguiente
+UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+               errno.ENOTTY, errno.EBADF, errno.EPERM}
+
+#=============================================================================
+# COPIA DE UN ARCHIVO
+#=============================================================================
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in UNSUPPORTED:
+            return False
+        raise
+
+def _copy_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    """copy_file_range (puede hacer reflink/copia en servidor por sí solo)"""
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK, size - copied))
+            if n == 0:
+                break
+            copied += n
+    except OSError as e:
+        if e.errno in UNSUPPORTED and copied == 0:
+            return False
+        raise
+    return True
+
+def _sendfile(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, 'sendfile'):
+        return False
+    offset = 0
+    try:
+        while offset < size:
+            n = os.sendfile(dst_fd, src_fd, offset, min(COPY_CHUNK, size - offset))
+            if n == 0:
+                break
+            offset += n
+    except OSError as e:
+        if e.errno in UNSUPPORTED and offset == 0:
+            return False
+        raise
+    return True
+
+def copy_file(src: Path, dst: Path) -> int:
+    """Copiar src → dst preservando metadatos (como copy2), de forma atómica.
+
+    Devuelve los bytes copiados. Se escribe en un temporal junto al destino
+    y se renombra: un lector nunca ve un archivo a medias.
+    """
+    src, dst = Path(src), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(src, 'rb') as fsrc:
+            size = os.fstat(fsrc.fileno()).st_size
+            with open(tmp, 'wb') as fdst:
+                src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+                if not (_reflink(src_fd, dst_fd)
+                        or _copy_range(src_fd, dst_fd, size)
+                        or _sendfile(src_fd, dst_fd, size)):
+                    shutil.copyfileobj(fsrc, fdst, COPY_CHUNK)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    return size
+
+#=============================================================================
+# COPIA EN PARALELO
+#=============================================================================
+class CopyStats(NamedTuple):
+    copied: int
+    removed: int
+    bytes: int
+
+def _copy_pair(pair: Tuple[Path, Path]) -> Optional[int]:
+    try:
+        return copy_file(*pair)
+    except FileNotFoundError:
+        return None  # El origen desapareció entre el diff y la copia
+
+def copy_files(pairs: Iterable[Tuple[Path, Path]],
+               workers: int = DEFAULT_WORKERS) -> List[Optional[int]]:
+    """Copiar varios (src, dst) en paralelo.
+
+    Devuelve los bytes de cada par, en orden (None si el origen ya no existe).
+    """
+    pairs = list(pairs)
+    if len(pairs) <= 1 or workers <= 1:
+        return [_copy_pair(pair) for pair in pairs]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_copy_pair, pairs))
+
+def tree_stats(root: Path) -> Dict[str, Tuple[int, int]]:
+    """Ruta relativa -> (size, mtime_ns) de todos los archivos de un árbol"""
+    return {os.path.relpath(path, root): (st.st_size, st.st_mtime_ns)
+            for path, st in iter_files(Path(root))}
+
+def diff_trees(src: Path, dst: Path) -> Tuple[List[str], List[str]]:
+    """Rutas relativas a copiar (nuevas o cambiadas) y a borrar del destino.
+
+    copy_file preserva mtime, así que (size, mtime_ns) iguales = ya copiado.
+    """
+    source = tree_stats(src)
+    target = tree_stats(dst)
+    to_copy = sorted(rel for rel, stat in source.items() if target.get(rel) != stat)
+    to_delete = sorted(rel for rel in target if rel not in source)
+    return to_copy, to_delete
+
+def prune_empty_dirs(root: Path):
+    """Borrar directorios vacíos bajo root (sin borrar root)"""
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if Path(dirpath) != Path(root) and not dirnames and not filenames:
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+def sync_tree(src: Path, dst: Path, delete: bool = True,
+              workers: int = DEFAULT_WORKERS) -> CopyStats:
+    """Dejar dst igual que src tocando solo lo que difiere"""
+    src, dst = Path(src), Path(dst)
+    if dst.is_symlink() or (dst.exists() and not dst.is_dir()):
+        dst.unlink()
+    dst.mkdir(parents=True, exist_ok=True)
+    to_copy, to_delete = diff_trees(src, dst)
+
+    sizes = copy_files([(src / rel, dst / rel) for rel in to_copy], workers)
+    copied = [size for size in sizes if size is not None]
+    removed = 0
+    if delete and to_delete:
+        for rel in to_delete:
+            try:
+                (dst / rel).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        prune_empty_dirs(dst)
+    if copied or removed:
+        logging.debug(f"{src} → {dst}: {len(copied)} copiados, {removed} borrados")
+    return CopyStats(len(copied), removed, sum(copied))
+
+def file_differs(src: Path, dst: Path) -> bool:
+    """¿Hace falta copiar src sobre dst? (comparación por stat)"""
+    try:
+        a, b = src.stat(), dst.stat()
+    except FileNotFoundError:
+        return True
+    return (a.st_size, a.st_mtime_ns) != (b.st_size, b.st_mtime_ns)
@@ -0,0 +1,877 @@
+#!/usr/bin/env python3
+"""
+Claude Engine - Motor de sync único con backends enchufables
+Una sola pasada de detección de cambios por ciclo, repartida a backends
+- Backends: espejo git (claude_config/), rsync/VPS, directorio local
+- Cada backend recuerda el último snapshot que aplicó con éxito: recibe
+  solo su diff y reintenta lo pendiente si falló
+- install.py y claude_sync.py son front-ends finos sobre este motor
+"""
+
+import os
+import re
+import json
+import socket
+import threading
+import hashlib
+import time
+import logging
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from claude_append import AppendTracker, send_tails_local, send_tails_remote
+from claude_copy import copy_files
+from claude_manifest import Manifest, atomic_write_json, iter_files
+from claude_metrics import NULL_METRICS
+from claude_outbox import Outbox
+from claude_schedule import FixedSchedule
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+ENGINE_STATE_VERSION = 1
+ERROR_BACKOFF = 10  # segundos tras una excepción inesperada en el loop
+PROBE_TIMEOUT = 3   # segundos del health probe TCP
+LOCAL_CHECK_INTERVAL = 20  # sin watcher: cada cuánto se mira el estado local
+
+# Líneas de `rsync --stats` → contador de métricas
+RSYNC_OUT_FORMAT = "%i %l %b %n"  # una línea por archivo enviado (ver claude_bandwidth)
+RSYNC_STATS = {
+    'rsync.bytes_sent': re.compile(r'^Total bytes sent: ([\d,.]+)', re.M),
+    'rsync.bytes_received': re.compile(r'^Total bytes received: ([\d,.]+)', re.M),
+    'rsync.files_transferred': re.compile(r'^Number of (?:regular )?files transferred: ([\d,.]+)', re.M),
+}
+
+#=============================================================================
+# SNAPSHOTS Y CHANGE SETS
+#=============================================================================
+Snapshot = Dict[str, Tuple[int, int]]  # ruta absoluta -> (size, mtime_ns)
+
+def scan(roots: Iterable[Path]) -> Snapshot:
+    """Pasada completa: stat de todos los archivos bajo `roots`"""
+    snapshot = {}
+    for root in roots:
+        root = Path(root)
+        try:
+            st = root.stat()
+        except FileNotFoundError:
+            continue
+        if root.is_dir():
+            for path, st in iter_files(root):
+                snapshot[str(path)] = (st.st_size, st.st_mtime_ns)
+        else:
+            snapshot[str(root)] = (st.st_size, st.st_mtime_ns)
+    return snapshot
+
+def rescan(snapshot: Snapshot, changed_paths: Iterable[Path]) -> Snapshot:
+    """Pasada parcial: actualizar solo lo que el watcher reportó"""
+    snapshot = dict(snapshot)
+    for path in changed_paths:
+        key = str(path)
+        prefix = key + os.sep
+        for stale in [k for k in snapshot if k.startswith(prefix)]:
+            del snapshot[stale]
+        try:
+            st = os.stat(key)
+        except (FileNotFoundError, NotADirectoryError):
+            snapshot.pop(key, None)
+            continue
+        if os.path.isdir(key):
+            snapshot.pop(key, None)
+            snapshot.update(scan([path]))
+        else:
+            snapshot[key] = (st.st_size, st.st_mtime_ns)
+    return snapshot
+
+class ChangeSet:
+    """Diferencia entre dos snapshots"""
+
+    def __init__(self, added=None, modified=None, removed=None):
+        self.added: Set[str] = set(added or ())
+        self.modified: Set[str] = set(modified or ())
+        self.removed: Set[str] = set(removed or ())
+
+    @classmethod
+    def between(cls, old: Snapshot, new: Snapshot) -> 'ChangeSet':
+        added = new.keys() - old.keys()
+        removed = old.keys() - new.keys()
+        modified = {p for p in new.keys() & old.keys() if new[p] != old[p]}
+        return cls(added, modified, removed)
+
+    def filter(self, predicate: Callable[[str], bool]) -> 'ChangeSet':
+        return ChangeSet({p for p in self.added if predicate(p)},
+                         {p for p in self.modified if predicate(p)},
+                         {p for p in self.removed if predicate(p)})
+
+    @property
+    def changed(self) -> Set[str]:
+        """Altas + modificaciones"""
+        return self.added | self.modified
+
+    @property
+    def paths(self) -> Set[str]:
+        return self.added | self.modified | self.removed
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.removed)
+
+    def __len__(self):
+        return len(self.added) + len(self.modified) + len(self.removed)
+
+    def __str__(self):
+        return f"+{len(self.added)} ~{len(self.modified)} -{len(self.removed)}"
+
+def is_under(path: str, roots: Iterable[Path]) -> bool:
+    """¿`path` es alguna de las raíces o cuelga de ella?"""
+    for root in roots:
+        root = str(root)
+        if path == root or path.startswith(root + os.sep):
+            return True
+    return False
+
+#=============================================================================
+# BACKENDS
+#=============================================================================
+class Backend:
+    """Destino de sync. Subclases implementan `apply`."""
+
+    name = "backend"
+    metrics = NULL_METRICS
+    error: Optional[str] = None  # motivo del último apply fallido
+
+    def use_metrics(self, metrics):
+        self.metrics = metrics
+
+    def identity(self) -> str:
+        """Identifica el destino: si cambia, el backend parte de cero"""
+        return self.name
+
+    def wants(self, path: str) -> bool:
+        return True
+
+    def apply(self, changes: ChangeSet, snapshot: Snapshot) -> bool:
+        """Aplicar un change set. True si el destino quedó al día."""
+        raise NotImplementedError
+
+    def probe(self) -> bool:
+        """Health check barato del destino (sin transferir nada)"""
+        return True
+
+    def flush(self):
+        """Terminar ya el trabajo diferido (ejecuciones one-shot)"""
+
+    def close(self):
+        pass
+
+class MirrorBackend(Backend):
+    """Espejo archivo a archivo según un mapeo origen → destino.
+
+    Usa el manifest persistente: no re-hashea lo que no cambió de stat y
+    no copia archivos cuyo contenido ya coincide con el destino.
+    """
+
+    def __init__(self, name: str, mapping: List[Tuple[Path, Path]], manifest_file: Path,
+                 delete: bool = False, newer_only: bool = True):
+        self.name = name
+        self.mapping = [(Path(src), Path(dst)) for src, dst in mapping]
+        self.manifest_file = Path(manifest_file)
+        self.delete = delete
+        self.newer_only = newer_only
+        self.copied = 0
+        self.removed = 0
+        self.written: List[Path] = []
+
+    def identity(self) -> str:
+        return f"{self.name}:" + "|".join(f"{s}>{d}" for s, d in self.mapping)
+
+    def wants(self, path: str) -> bool:
+        return is_under(path, (src for src, _ in self.mapping))
+
+    def destination(self, path: str) -> Optional[Path]:
+        for src, dst in self.mapping:
+            if path == str(src):
+                return dst
+            if path.startswith(str(src) + os.sep):
+                return dst / os.path.relpath(path, src)
+        return None
+
+    def needs_copy(self, manifest: Manifest, src: Path, dst: Path) -> Optional[str]:
+        """Hash de src si hay que copiarlo sobre dst (None si el contenido coincide)"""
+        try:
+            src_stat = src.stat()
+        except FileNotFoundError:
+            return None
+        src_hash = manifest.digest(src, src_stat)
+        dst_hash = manifest.digest(dst)
+
+        if dst_hash is not None:
+            if src_hash == dst_hash:
+                return None  # Solo touch: mismo contenido
+            if self.newer_only and src_stat.st_mtime_ns <= dst.stat().st_mtime_ns:
+                return None  # El destino es más nuevo, no pisarlo
+        return src_hash
+
+    def apply(self, changes: ChangeSet, snapshot: Snapshot) -> bool:
+        with self.metrics.timer(f"{self.name}.copy"):
+            self._apply(changes)
+        self.metrics.count(f"{self.name}.files_copied", self.copied)
+        return True
+
+    def _apply(self, changes: ChangeSet):
+        manifest = Manifest(self.manifest_file)
+        self.copied = 0
+        self.removed = 0
+        self.written = []
+        # Decidir en serie (el manifest no es thread-safe), copiar en paralelo
+        pending = []
+        for path in sorted(changes.changed):
+            dst = self.destination(path)
+            if dst is not None:
+                src_hash = self.needs_copy(manifest, Path(path), dst)
+                if src_hash is not None:
+                    pending.append((Path(path), dst, src_hash))
+        sizes = copy_files([(src, dst) for src, dst, _ in pending])
+        for (src, dst, src_hash), size in zip(pending, sizes):
+            if size is None:
+                continue
+            manifest.record(dst, dst.stat(), src_hash)
+            self.metrics.count(f"{self.name}.bytes_copied", size)
+            self.copied += 1
+            self.written.append(dst)
+        for path in sorted(changes.removed):
+            manifest.forget(Path(path))
+            if self.delete:
+                dst = self.destination(path)
+                if dst is not None and dst.is_file():
+                    dst.unlink()
+                    manifest.forget(dst)
+                    self.removed += 1
+                    self.written.append(dst)
+                    self._prune_empty_dirs(dst.parent)
+        manifest.save()
+
+    def _prune_empty_dirs(self, directory: Path):
+        """Borrar directorios vacíos hasta la raíz del destino (como --delete)"""
+        roots = {dst for _, dst in self.mapping}
+        while directory not in roots and any(r in directory.parents for r in roots):
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+    @property
+    def changed_destination(self) -> bool:
+        return bool(self.copied or self.removed)
+
+class LocalDirBackend(MirrorBackend):
+    """Espejo exacto en un directorio local (mismo layout que el VPS)"""
+
+    def __init__(self, claude_dir: Path, claude_json: Path, dest: Path, state_dir: Path):
+        dest = Path(dest)
+        tag = hashlib.sha1(str(dest).encode()).hexdigest()[:8]
+        # Igual que rsync: el contenido de ~/.claude/ a la raíz, .claude.json por nombre
+        mapping = [(claude_dir, dest), (claude_json, dest / Path(claude_json).name)]
+        super().__init__(f"local-{tag}", mapping, Path(state_dir) / f"local_{tag}_manifest.json",
+                         delete=True, newer_only=False)
+
+class GitMirrorBackend(MirrorBackend):
+    """Espejo en claude_config/ cuyas rutas escritas van al GitCommitWriter"""
+
+    def __init__(self, mapping, manifest_file: Path, writer=None):
+        super().__init__("git", mapping, manifest_file, delete=False, newer_only=True)
+        self.writer = writer
+
+    def use_metrics(self, metrics):
+        super().use_metrics(metrics)
+        if self.writer is not None:
+            self.writer.metrics = metrics
+
+    def apply(self, changes: ChangeSet, snapshot: Snapshot) -> bool:
+        if self.writer is None:
+            return super().apply(changes, snapshot)
+        with self.writer.lock:
+            super().apply(changes, snapshot)
+            # Solo se anota: el commit se agrupa por ventana y el push va
+            # en background; un fallo de push no invalida el espejo
+            self.writer.stage(self.written)
+        if self.copied:
+            logging.info(f"📝 {self.copied} archivos reflejados en el repo")
+        return True
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def close(self):
+        self.flush()
+
+class RsyncBackend(Backend):
+    """rsync --delete del set completo a un destino remoto (o local)"""
+
+    name = "rsync"
+
+    def __init__(self, sources: List[Path], target: str, transport=None,
+                 state_dir: Optional[Path] = None, snapshots=None, bandwidth=None):
+        self.sources = [Path(s) for s in sources]
+        self.target = target
+        self.transport = transport
+        self.snapshots = snapshots  # SnapshotManager: versiones en el destino
+        self.bandwidth = bandwidth  # BandwidthLedger: bytes por archivo y categoría
+        # Transcripts que solo crecen: se envía la cola (ver claude_append)
+        self.append = None
+        if state_dir is not None:
+            digest = hashlib.sha256(target.encode()).hexdigest()[:8]
+            self.append = AppendTracker(Path(state_dir) / f"append_{digest}.json")
+
+    def identity(self) -> str:
+        return f"rsync:{self.target}"
+
+    def wants(self, path: str) -> bool:
+        return is_under(path, self.sources)
+
+    def sync_items(self) -> List[str]:
+        """Argumentos origen de rsync (los directorios con / final)"""
+        items = []
+        for source in self.sources:
+            if source.is_dir():
+                items.append(f"{source}/")
+            elif source.exists():
+                items.append(str(source))
+        return items
+
+    def run_rsync(self, items: List[str],
+                  exclude: Iterable[str] = ()) -> Optional[subprocess.CompletedProcess]:
+        """Ejecutar rsync, reutilizando el transporte SSH si lo hay"""
+        # Rutas ya enviadas por cola: fuera de la lista (--delete no las toca)
+        excludes = ['--exclude=/' + re.sub(r'([*?\[\\])', r'\\\1', rel) for rel in sorted(exclude)]
+        if self.transport is None:
+            Path(self.target).mkdir(parents=True, exist_ok=True)
+            cmd = ['rsync', '-az', '--delete', '--stats', f'--out-format={RSYNC_OUT_FORMAT}'] \
+                + excludes + items + [self.target]
+            return subprocess.run(cmd, capture_output=True, text=True)
+
+        from claude_transport import SSH_FAILURE_CODE
+        for attempt in (1, 2):
+            if not self.transport.ensure():
+                return None
+            cmd = (['rsync', '-az', '--delete', '--stats', f'--out-format={RSYNC_OUT_FORMAT}',
+                    '-e', self.transport.ssh_command()] + excludes + items + [self.target])
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != SSH_FAILURE_CODE or attempt == 2:
+                return result
+            logging.warning("⚠️ Conexión SSH caída, reconectando...")
+            self.transport.reset()
+
+    def record_stats(self, output: str):
+        """Bytes y archivos transferidos según `rsync --stats`"""
+        for name, pattern in RSYNC_STATS.items():
+            match = pattern.search(output or '')
+            if match:
+                self.metrics.count(name, int(match.group(1).replace(',', '').replace('.', '')))
+
+    def apply(self, changes: ChangeSet, snapshot: Snapshot) -> bool:
+        if not self.transfer(changes, snapshot):
+            return False
+        if self.snapshots is not None:
+            try:
+                with self.metrics.timer("rsync.snapshot"):
+                    self.snapshots.after_sync()
+            except (OSError, subprocess.SubprocessError) as e:
+                # El sync ya está hecho: el snapshot se reintenta en el próximo ciclo
+                logging.warning(f"⚠️ Snapshot no creado: {e}")
+        return True
+
+    def transfer(self, changes: ChangeSet, snapshot: Snapshot) -> bool:
+        items = self.sync_items()
+        if not items:
+            logging.info("💤 No hay archivos Claude para sincronizar")
+            return False
+
+        logging.info(f"🔄 rsync → {self.target} ({changes})")
+        appended = self.send_tails(changes, snapshot)
+        root = self.append_root()
+        if appended and changes.paths <= {str(root / rel) for rel in appended}:
+            logging.info(f"✅ Solo colas de transcripts, sin rsync → {self.target}")
+            return True
+        try:
+            with self.metrics.timer("rsync"):
+                result = self.run_rsync(items, appended)
+        except OSError as e:
+            self.error = f"rsync: {e}"
+            logging.error(f"❌ Error ejecutando rsync: {e}")
+            return False
+        if result is None:
+            self.error = "destino inalcanzable"
+            logging.error("❌ Destino inalcanzable, sync pospuesto")
+            return False
+        if result.returncode != 0:
+            self.error = f"rsync exit {result.returncode}"
+            logging.error(f"❌ Error en rsync: {result.stderr.strip()}")
+            return False
+        self.record_stats(result.stdout)
+        if self.bandwidth is not None:
+            self.bandwidth.record_rsync(result.stdout)
+            self.bandwidth.save()
+        if self.append is not None:
+            root = self.append_root()
+            tailed = {str(root / rel) for rel in appended}  # Ya anotados en send_tails
+            self.append.record(root, [p for p in changes.changed
+                                      if is_under(p, [root]) and p not in tailed], snapshot)
+            self.append.forget(root, changes.removed)
+            self.append.save()
+        logging.info(f"✅ rsync completado → {self.target}")
+        return True
+
+    def append_root(self) -> Optional[Path]:
+        """Directorio cuyos contenidos van a la raíz del destino (~/.claude)"""
+        return next((s for s in self.sources if s.is_dir()), None)
+
+    def send_tails(self, changes: ChangeSet, snapshot: Snapshot) -> Set[str]:
+        """Enviar solo la cola de los transcripts que crecieron.
+
+        Devuelve las rutas relativas aplicadas (rsync las excluye). Cualquier
+        fallo deja el archivo en el camino normal de rsync.
+        """
+        root = self.append_root()
+        if self.append is None or root is None:
+            return set()
+        tails = self.append.plan(root, [p for p in changes.modified if is_under(p, [root])],
+                                 snapshot)
+        if not tails:
+            return set()
+        try:
+            with self.metrics.timer("rsync.append"):
+                if self.transport is None:
+                    applied = send_tails_local(Path(self.target), tails)
+                elif self.transport.ensure():
+                    base = self.target.split(':', 1)[1]
+                    applied = send_tails_remote(self.transport, base, tails)
+                else:
+                    return set()
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.warning(f"⚠️ Envío por cola fallido, se usa rsync completo: {e}")
+            return set()
+        sent = sum(t.end - t.offset for t in tails if t.rel in applied)
+        self.metrics.count("rsync.append_bytes", sent)
+        if self.bandwidth is not None and applied:
+            self.bandwidth.record((t.rel, t.end - t.offset) for t in tails if t.rel in applied)
+            self.bandwidth.save()
+        for tail in tails:
+            if tail.rel in applied:
+                self.append.record(root, [str(tail.path)], snapshot)
+        self.append.save()
+        logging.info(f"➕ {len(applied)}/{len(tails)} transcripts por cola ({sent} bytes)")
+        return applied
+
+    def probe(self) -> bool:
+        """¿Acepta el host conexiones TCP en el puerto SSH?"""
+        if self.transport is None:
+            return True
+        host = self.transport.host.rsplit('@', 1)[-1]
+        try:
+            socket.create_connection((host, self.transport.port), timeout=PROBE_TIMEOUT).close()
+            return True
+        except OSError:
+            return False
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+#=============================================================================
+# ETAPAS LOCALES
+#=============================================================================
+class Stage:
+    """Mantenimiento local antes de un ciclo (tiering, compactación...)
+
+    Corre como mucho cada `interval` segundos (persistido entre procesos) y
+    devuelve las rutas que tocó para que el ciclo las incluya.
+    """
+
+    name = "stage"
+    interval = 3600
+
+    def run(self) -> Iterable[Path]:
+        raise NotImplementedError
+
+    def describe(self) -> Optional[str]:
+        return None
+
+#=============================================================================
+# MOTOR
+#=============================================================================
+class SyncEngine:
+    """Detecta cambios una vez por ciclo y los reparte a los backends"""
+
+    def __init__(self, roots: Iterable[Path], backends: List[Backend], state_dir: Path,
+                 metrics=None, flight=None, stages=None):
+        self.roots = [Path(r) for r in roots]
+        self.backends = backends
+        self.state_dir = Path(state_dir)
+        self.metrics = metrics or NULL_METRICS
+        self.flight = flight  # SingleFlight: un solo ciclo a la vez entre procesos
+        self.stages: List[Stage] = stages or []
+        for backend in backends:
+            backend.use_metrics(self.metrics)
+        self.current: Optional[Snapshot] = None
+        self.applied: Dict[str, Snapshot] = {}
+        self.outboxes = {b.name: Outbox(self.state_dir / f"outbox_{b.name}.json") for b in backends}
+        self.healthy = True
+        # Estado del loop y del socket de control
+        self.schedule = None
+        self.watcher = None
+        self.reloader: Optional[Callable[[], List[Backend]]] = None
+        self.wakeup = threading.Event()
+        self.cycle_done = threading.Condition()
+        self.paused = False
+        self.reload_requested = False
+        self.full_pass_requested = False
+        self.pending: Optional[Set[Path]] = None  # Cambios detectados esperando a hold()
+        self.sync_requested = 0
+        self.sync_served = 0
+        self.cycles = 0
+        self.last_cycle: Optional[Dict] = None
+
+    # -- estado por backend ----------------------------------------------------
+    def _state_file(self, backend: Backend) -> Path:
+        return self.state_dir / f"engine_{backend.name}.json"
+
+    def _load_applied(self, backend: Backend) -> Snapshot:
+        if backend.name in self.applied:
+            return self.applied[backend.name]
+        snapshot = {}
+        try:
+            with open(self._state_file(backend)) as f:
+                data = json.load(f)
+            if (data.get('version') == ENGINE_STATE_VERSION
+                    and data.get('identity') == backend.identity()):
+                snapshot = {k: tuple(v) for k, v in data['snapshot'].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+        self.applied[backend.name] = snapshot
+        return snapshot
+
+    def _save_applied(self, backend: Backend, snapshot: Snapshot):
+        self.applied[backend.name] = snapshot
+        try:
+            atomic_write_json(self._state_file(backend), {
+                'version': ENGINE_STATE_VERSION,
+                'identity': backend.identity(),
+                'snapshot': snapshot,
+            })
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo guardar estado de {backend.name}: {e}")
+
+    # -- ciclo -----------------------------------------------------------------
+    def detect(self, changed_paths: Optional[Iterable[Path]] = None) -> Snapshot:
+        """Única pasada de detección del ciclo (parcial si hay pistas del watcher)"""
+        if self.current is None or changed_paths is None:
+            self.current = scan(self.roots)
+        else:
+            relevant = [p for p in changed_paths if is_under(str(p), self.roots)
+                        or any(str(r).startswith(str(p) + os.sep) for r in self.roots)]
+            if relevant:
+                self.current = rescan(self.current, relevant)
+        return self.current
+
+    def run_cycle(self, changed_paths: Optional[Iterable[Path]] = None,
+                  force: bool = False, wait: bool = True) -> Dict[str, bool]:
+        """Un ciclo completo: detectar una vez, aplicar en cada backend
+
+        Con `flight`, si otro proceso está sincronizando: `wait` espera el
+        lock; si no, se deja el trigger encolado y se devuelve {}.
+        """
+        if self.flight is None:
+            return self._measured_cycle(changed_paths, force)
+        ran, results = self.flight.run(lambda: self._measured_cycle(changed_paths, force),
+                                       rerun=lambda: self._measured_cycle(None, False),
+                                       blocking=wait)
+        return results if ran else {}
+
+    def _measured_cycle(self, changed_paths, force: bool) -> Dict[str, bool]:
+        self.metrics.start_cycle()
+        start = time.time()
+        with self.metrics.timer("cycle"):
+            results = self._run_cycle(changed_paths, force)
+        self.metrics.end_cycle()
+        self.cycles += 1
+        self.last_cycle = {'time': start, 'duration': round(time.time() - start, 3),
+                           'results': results}
+        return results
+
+    def run_stages(self, force: bool = False) -> Set[Path]:
+        """Ejecutar las etapas que tocan; devuelve las rutas modificadas"""
+        if not self.stages:
+            return set()
+        state_file = self.state_dir / "stages.json"
+        try:
+            with open(state_file) as f:
+                last_runs = json.load(f)
+        except (OSError, ValueError):
+            last_runs = {}
+        touched = set()
+        now = time.time()
+        for stage in self.stages:
+            if not force and now - last_runs.get(stage.name, 0) < stage.interval:
+                continue
+            last_runs[stage.name] = now
+            try:
+                with self.metrics.timer(f"stage.{stage.name}"):
+                    touched.update(Path(p) for p in stage.run() or ())
+            except Exception as e:
+                logging.warning(f"⚠️ Error en etapa {stage.name}: {e}")
+        try:
+            atomic_write_json(state_file, last_runs)
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo guardar estado de etapas: {e}")
+        return touched
+
+    def _run_cycle(self, changed_paths, force: bool) -> Dict[str, bool]:
+        touched = self.run_stages()
+        if touched and changed_paths is not None:
+            changed_paths = set(changed_paths) | touched
+        with self.metrics.timer("scan"):
+            snapshot = self.detect(changed_paths)
+        results = {}
+        for backend in self.backends:
+            base = self._load_applied(backend)
+            wanted = {p: v for p, v in snapshot.items() if backend.wants(p)}
+            changes = ChangeSet.between(base, wanted)
+            if not changes and not force:
+                continue
+            outbox = self.outboxes[backend.name]
+            if not force and not outbox.ready(backend.probe):
+                # Destino caído: acumular en el outbox sin intentar transferir
+                outbox.add(changes.changed, changes.removed)
+                outbox.save()
+                results[backend.name] = False
+                continue
+            self.metrics.count(f"{backend.name}.files_changed", len(changes))
+            self.metrics.count(f"{backend.name}.bytes_changed",
+                               sum(wanted[p][0] for p in changes.changed))
+            backend.error = None
+            try:
+                ok = backend.apply(changes, wanted)
+            except Exception as e:
+                logging.error(f"❌ Error en backend {backend.name}: {e}")
+                backend.error = str(e)
+                ok = False
+            if ok:
+                self._save_applied(backend, wanted)
+                outbox.delivered()
+            else:
+                outbox.add(changes.changed, changes.removed)
+                outbox.failed(backend.error or "apply fallido", backend.probe())
+            results[backend.name] = ok
+
+        self.healthy = all(results.values())
+        if not results:
+            logging.info("💤 Sin cambios, nada que sincronizar")
+        return results
+
+    def run_forever(self, watcher=None, interval: float = 60,
+                    safety_interval: float = 3600, retry_interval: float = 60,
+                    schedule=None):
+        """Loop del daemon: por eventos si hay watcher, si no según `schedule`
+
+        Sin schedule se usa un intervalo fijo (`interval`, o `retry_interval`
+        tras un fallo). Los comandos de control (sync, pause, resume, reload)
+        despiertan el loop y se atienden aquí, nunca en paralelo a un ciclo.
+        """
+        self.schedule = schedule or FixedSchedule(interval, retry_interval)
+        self.watcher = watcher
+        try:
+            self._sleep(self.schedule.initial_delay())
+            self._scheduled_cycle()
+            while True:
+                try:
+                    self._loop_once(safety_interval)
+                except KeyboardInterrupt:
+                    logging.info("🛑 Daemon detenido por usuario")
+                    break
+                except Exception as e:
+                    logging.error(f"❌ Error en daemon: {e}")
+                    self.healthy = False
+                    time.sleep(ERROR_BACKOFF)
+        except KeyboardInterrupt:
+            logging.info("🛑 Daemon detenido por usuario")
+        finally:
+            self.close()
+
+    def _loop_once(self, safety_interval: float):
+        schedule, watcher = self.schedule, self.watcher
+        delay = schedule.delay() if self.healthy else self.retry_delay(schedule)
+        if watcher is None:
+            # Sin watcher el estado local se mira en cada tick
+            base = delay
+            timeout = min(delay, LOCAL_CHECK_INTERVAL)
+        else:
+            base = timeout = safety_interval if self.healthy else delay
+        if self.pending is not None:
+            timeout = min(timeout, schedule.hold())  # Despertar cuando toque empujar
+        if watcher is None:
+            woken = self._sleep(timeout)
+            changes = set()
+        else:
+            changes = watcher.wait(timeout)
+            woken = self.wakeup.is_set()
+            self.wakeup.clear()
+
+        if self.reload_requested:
+            self._reload()
+        if self.sync_requested > self.sync_served:
+            self._control_sync()
+            return
+        if self.paused:
+            return
+
+        if self.full_pass_requested or (not woken and not changes and timeout >= base):
+            self.full_pass_requested = False
+            self.pending = None  # La pasada completa recoge lo pendiente
+            if watcher is not None:
+                logging.info("🔁 Pasada completa sin eventos")
+            self._scheduled_cycle()
+            return
+
+        if changes:
+            logging.info(f"🔍 {len(changes)} cambios detectados")
+            self.pending = (self.pending or set()) | changes
+        elif watcher is None and not woken and self.pending is None and self.local_changes():
+            logging.info("🔍 Cambios locales detectados")
+            self.pending = set()  # Sin pistas: el ciclo re-escanea entero
+
+        # Separación mínima entre syncs (y mínimo del servidor) también con
+        # actividad: lo detectado espera en `pending` hasta que toque
+        if self.pending is not None and schedule.hold() <= 0:
+            pending, self.pending = self.pending, None
+            self._scheduled_cycle(pending or None)
+
+    def _sleep(self, seconds: float) -> bool:
+        """Dormir hasta `seconds` o hasta un wake(); True si nos despertaron"""
+        woken = self.wakeup.wait(seconds)
+        self.wakeup.clear()
+        return woken
+
+    def wake(self):
+        self.wakeup.set()
+        if self.watcher is not None:
+            self.watcher.wake()
+
+    def _scheduled_cycle(self, changed_paths=None, force: bool = False):
+        results = self.run_cycle(changed_paths, force=force)
+        self.schedule.record(changed=bool(results), ok=self.healthy)
+
+    # -- control -----------------------------------------------------------------
+    def _control_sync(self):
+        served = self.sync_requested
+        self.pending = None  # El ciclo forzado re-escanea todo
+        logging.info("🎛️  Sync inmediato pedido por socket de control")
+        try:
+            self._scheduled_cycle(force=True)
+        finally:
+            with self.cycle_done:
+                self.sync_served = served
+                self.cycle_done.notify_all()
+
+    def _reload(self):
+        self.reload_requested = False
+        if self.reloader is None:
+            return
+        logging.info("🔄 Recargando configuración de backends")
+        self.close()
+        self.backends = self.reloader()
+        for backend in self.backends:
+            backend.use_metrics(self.metrics)
+        self.applied = {}
+        self.outboxes = {b.name: Outbox(self.state_dir / f"outbox_{b.name}.json")
+                         for b in self.backends}
+        self.full_pass_requested = True
+
+    def status(self) -> Dict:
+        """Estado en vivo para `--status`"""
+        return {
+            'pid': os.getpid(),
+            'paused': self.paused,
+            'healthy': self.healthy,
+            'cycles': self.cycles,
+            'last_cycle': self.last_cycle,
+            'backends': [b.name for b in self.backends],
+            'outbox': {name: o.describe() for name, o in self.outboxes.items()},
+            'schedule': self.schedule.describe() if self.schedule is not None else None,
+        }
+
+    def control_handlers(self) -> Dict[str, Callable[[Dict], Dict]]:
+        """Comandos para claude_control.ControlServer"""
+        def sync(request):
+            with self.cycle_done:
+                self.sync_requested += 1
+                ticket = self.sync_requested
+            self.wake()
+            if not request.get('wait'):
+                return {'ok': True, 'queued': True}
+            with self.cycle_done:
+                done = self.cycle_done.wait_for(lambda: self.sync_served >= ticket,
+                                                timeout=request.get('wait_timeout', 600))
+            return {'ok': done and self.healthy, 'done': done, 'last_cycle': self.last_cycle}
+
+        def status(request):
+            return dict(self.status(), ok=True)
+
+        def pause(request):
+            self.paused = True
+            logging.info("⏸️  Sync pausado por socket de control")
+            return {'ok': True, 'paused': True}
+
+        def resume(request):
+            if self.paused:
+                self.paused = False
+                self.full_pass_requested = True  # Recoger lo que cambió en pausa
+                logging.info("▶️  Sync reanudado")
+                self.wake()
+            return {'ok': True, 'paused': False}
+
+        def reload(request):
+            self.reload_requested = True
+            self.wake()
+            return {'ok': True, 'reloading': self.reloader is not None}
+
+        return {'sync': sync, 'status': status, 'pause': pause, 'resume': resume,
+                'reload': reload}
+
+    def retry_delay(self, schedule) -> float:
+        """Espera hasta el próximo probe/intento de un backend con pendientes"""
+        delays = [o.delay() for o in self.outboxes.values() if o.pending]
+        return max(1.0, min(delays)) if delays else schedule.delay()
+
+    def local_changes(self) -> bool:
+        """¿Hay cambios locales sin aplicar? Solo stat: no toca ningún remoto"""
+        snapshot = self.detect()
+        for backend in self.backends:
+            outbox = self.outboxes[backend.name]
+            if outbox.pending and outbox.delay() > 0:
+                continue  # Destino caído: lo nuevo espera al reintento del outbox
+            wanted = {p: v for p, v in snapshot.items() if backend.wants(p)}
+            if ChangeSet.between(self._load_applied(backend), wanted):
+                return True
+        return False
+
+    def pending_due(self) -> bool:
+        """¿Algún outbox con pendientes ya puede reintentar?"""
+        return any(o.pending and o.delay() == 0 for o in self.outboxes.values())
+
+    def flush(self):
+        """Forzar commits/pushes diferidos sin cerrar conexiones"""
+        for backend in self.backends:
+            try:
+                backend.flush()
+            except Exception as e:
+                logging.warning(f"⚠️ Error vaciando backend {backend.name}: {e}")
+
+    def close(self):
+        for backend in self.backends:
+            try:
+                backend.close()
+            except Exception as e:
+                logging.warning(f"⚠️ Error cerrando backend {backend.name}: {e}")
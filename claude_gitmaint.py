@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Claude Git Maintenance - Historia compacta y repo pequeño para el espejo git
+Cada ventana con cambios crea un commit `auto-sync` con un blob nuevo del
+.claude.json: el repo y el remoto crecen sin límite
+- Los auto-sync más viejos que SQUASH_AFTER_DAYS se funden en checkpoints
+  diarios (semanales pasados WEEKLY_AFTER_DAYS) con commit-tree
+- Los commits manuales se conservan tal cual (autor, fecha y mensaje)
+- `git maintenance run --auto` cada hora en un thread (fuera del ciclo de
+  sync); reflog y expiración de objetos quedan con los valores de git
+- Tras un squash, force push (vía writer o --force-with-lease)
+- Tendencia de tamaño del repo (muestras diarias) para --status
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from claude_engine import Stage
+from claude_gitwriter import GitError, git, head_commit
+from claude_manifest import atomic_write_json
+from claude_metrics import format_bytes
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+SQUASH_AFTER_DAYS = 7      # auto-syncs más recientes se quedan como están
+WEEKLY_AFTER_DAYS = 60     # más viejos que esto: un checkpoint por semana
+SQUASH_INTERVAL = 86400    # segundos entre reescrituras de la historia
+GC_INTERVAL = 3600         # segundos entre `git maintenance run --auto`
+GC_TIMEOUT = 600
+MAX_SAMPLES = 365          # muestras diarias de tamaño guardadas
+
+AUTO_SUBJECT = re.compile(r'^(auto-sync|checkpoint) ')
+CHECKPOINT_COUNT = re.compile(r'^checkpoint .*\((\d+) auto-sync\)')
+LOG_FORMAT = '%H%x00%T%x00%P%x00%an%x00%ae%x00%ad%x00%cn%x00%ce%x00%cd%x00%B%x1e'
+
+#=============================================================================
+# HISTORIA
+#=============================================================================
+class Commit:
+    def __init__(self, record: str):
+        (self.sha, self.tree, parents, self.author_name, self.author_email, self.author_date,
+         self.committer_name, self.committer_email, self.committer_date,
+         self.message) = record.split('\0', 9)
+        self.parents = parents.split()
+        self.time = int(self.author_date.split()[0])
+
+    @property
+    def subject(self) -> str:
+        return self.message.split('\n', 1)[0]
+
+    @property
+    def squashable(self) -> bool:
+        return len(self.parents) <= 1 and bool(AUTO_SUBJECT.match(self.subject))
+
+    @property
+    def count(self) -> int:
+        """auto-syncs que representa (un checkpoint lleva la cuenta en el asunto)"""
+        match = CHECKPOINT_COUNT.match(self.subject)
+        return int(match.group(1)) if match else 1
+
+    def env(self, committer_date: Optional[str] = None) -> Dict[str, str]:
+        return {'GIT_AUTHOR_NAME': self.author_name, 'GIT_AUTHOR_EMAIL': self.author_email,
+                'GIT_AUTHOR_DATE': self.author_date,
+                'GIT_COMMITTER_NAME': self.committer_name,
+                'GIT_COMMITTER_EMAIL': self.committer_email,
+                'GIT_COMMITTER_DATE': committer_date or self.committer_date}
+
+def first_parent_history(repo_dir: Path) -> List[Commit]:
+    """Commits de HEAD por first-parent, del más viejo al más nuevo"""
+    output = git(repo_dir, 'log', '--first-parent', '--reverse', '--date=raw',
+                 f'--format={LOG_FORMAT}', 'HEAD')
+    return [Commit(record.strip('\n')) for record in output.split('\x1e') if record.strip('\n')]
+
+def bucket(commit: Commit, day_cutoff: float, week_cutoff: float) -> Optional[str]:
+    """Checkpoint al que va un commit (None = se queda como está)"""
+    if not commit.squashable or commit.time >= day_cutoff:
+        return None
+    local = time.localtime(commit.time)
+    if commit.time < week_cutoff:
+        return time.strftime('%G-W%V', local)
+    return time.strftime('%Y-%m-%d', local)
+
+def midnight(timestamp: float) -> float:
+    """Inicio del día local: las cubetas solo se cierran enteras"""
+    local = time.localtime(timestamp)
+    return time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+
+def squash_history(repo_dir: Path, now: Optional[float] = None,
+                   squash_after_days: float = SQUASH_AFTER_DAYS,
+                   weekly_after_days: float = WEEKLY_AFTER_DAYS) -> int:
+    """Fundir auto-syncs viejos en checkpoints. Devuelve cuántos commits se eliminaron.
+
+    Se reutilizan tal cual los commits anteriores al primer grupo a fundir,
+    así que una pasada sobre una historia ya compacta no reescribe nada.
+    """
+    now = now or time.time()
+    day_cutoff = midnight(now - squash_after_days * 86400)
+    week_cutoff = midnight(now - weekly_after_days * 86400)
+    week_cutoff -= time.localtime(week_cutoff).tm_wday * 86400  # Lunes: semanas enteras
+    old_head = head_commit(repo_dir)
+    if old_head is None:
+        return 0
+
+    groups: List[tuple] = []  # (cubeta, [commits])
+    for commit in first_parent_history(repo_dir):
+        key = bucket(commit, day_cutoff, week_cutoff)
+        if key is not None and groups and groups[-1][0] == key:
+            groups[-1][1].append(commit)
+        else:
+            groups.append((key, [commit]))
+
+    parent: Optional[str] = None
+    rewriting = False
+    for key, commits in groups:
+        last = commits[-1]
+        if len(commits) == 1 and not rewriting:
+            parent = last.sha  # Historia intacta hasta aquí
+            continue
+        rewriting = True
+        if len(commits) > 1:
+            total = sum(c.count for c in commits)
+            message = f"checkpoint {key} ({total} auto-sync)\n"
+        else:
+            message = last.message
+        args = ['commit-tree', last.tree]
+        for extra in ([parent] if parent else []) + last.parents[1:]:
+            args += ['-p', extra]
+        parent = git(repo_dir, *args, input=message.encode(), env=last.env())
+
+    removed = sum(len(commits) for _, commits in groups) - len(groups)
+    if not rewriting or not removed:
+        return 0
+    # CAS: si el writer commiteó mientras tanto, no se pisa (se reintenta luego)
+    git(repo_dir, 'update-ref', '-m', 'squash auto-sync', 'HEAD', parent, old_head)
+    return removed
+
+#=============================================================================
+# TAMAÑO
+#=============================================================================
+def repo_size(repo_dir: Path) -> int:
+    """Bytes de objetos (sueltos + packs) según `git count-objects -v`"""
+    info = dict(line.split(': ', 1) for line in
+                git(repo_dir, 'count-objects', '-v').splitlines() if ': ' in line)
+    return (int(info.get('size', 0)) + int(info.get('size-pack', 0))) * 1024
+
+#=============================================================================
+# ETAPA DEL MOTOR
+#=============================================================================
+class GitMaintenanceStage(Stage):
+    """Squash de auto-syncs viejos, git maintenance y muestras de tamaño del repo"""
+
+    name = "gitmaint"
+    interval = GC_INTERVAL
+
+    def __init__(self, repo_dir: Path, state_file: Path, writer=None,
+                 remote: str = 'origin', branch: str = 'main'):
+        self.repo_dir = Path(repo_dir)
+        self.state_file = Path(state_file)
+        self.writer = writer  # GitCommitWriter: su lock serializa commits y reescritura
+        self.remote = writer.remote if writer is not None else remote
+        self.branch = writer.branch if writer is not None else branch
+        self.maintenance: Optional[threading.Thread] = None
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'last_squash': 0, 'samples': []}
+
+    def run(self, force_squash: bool = False, wait: bool = False) -> List[Path]:
+        state = self._load()
+        now = time.time()
+        if force_squash or now - state.get('last_squash', 0) >= SQUASH_INTERVAL:
+            state['last_squash'] = now
+            self.squash()
+        self.maintain(wait)
+        self.sample(state, now)
+        atomic_write_json(self.state_file, state)
+        return []  # Solo toca .git, nada que sincronizar
+
+    def squash(self) -> int:
+        """Reescribir la historia (rápido: solo commit-tree) y empujarla"""
+        lock = self.writer.lock if self.writer is not None else None
+        if lock is not None:
+            lock.acquire()
+        try:
+            removed = squash_history(self.repo_dir)
+        except GitError as e:
+            logging.warning(f"⚠️ Squash de la historia git fallido: {e}")
+            return 0
+        finally:
+            if lock is not None:
+                lock.release()
+        if not removed:
+            return 0
+        # Reflog y expiración de objetos por defecto: stash y reflog siguen
+        # sirviendo para recuperar; gc --auto los podará a su tiempo
+        logging.info(f"🧹 {removed} commits auto-sync fundidos en checkpoints")
+        if self.writer is not None:
+            self.writer.request_push()  # Historia nueva: el writer hace el force push
+        else:
+            self.push()
+        return removed
+
+    def push(self) -> bool:
+        """Force push con lease: no pisa commits del remoto que no hayamos visto"""
+        try:
+            git(self.repo_dir, 'push', '--force-with-lease', self.remote, f'HEAD:{self.branch}',
+                timeout=GC_TIMEOUT)
+        except GitError as e:
+            logging.error(f"❌ Push de la historia compactada fallido: {e}")
+            return False
+        logging.info(f"✅ Historia compactada empujada a {self.remote}/{self.branch}")
+        return True
+
+    def maintain(self, wait: bool = False):
+        """`git maintenance run --auto` en un thread: repack incremental fuera del ciclo"""
+        if self.maintenance is not None and self.maintenance.is_alive():
+            return  # La anterior sigue corriendo
+        self.maintenance = threading.Thread(target=self._maintenance, name='git-maintenance',
+                                            daemon=True)
+        self.maintenance.start()
+        if wait:
+            self.maintenance.join()
+
+    def _maintenance(self):
+        try:
+            git(self.repo_dir, 'maintenance', 'run', '--auto', '--quiet', timeout=GC_TIMEOUT)
+        except GitError as e:
+            logging.warning(f"⚠️ git maintenance fallido: {e}")
+
+    def sample(self, state: Dict, now: float):
+        """Una muestra de tamaño por día"""
+        samples = state.setdefault('samples', [])
+        today = time.strftime('%Y-%m-%d', time.localtime(now))
+        entry = {'day': today, 'bytes': repo_size(self.repo_dir),
+                 'commits': int(git(self.repo_dir, 'rev-list', '--count', 'HEAD'))}
+        if samples and samples[-1]['day'] == today:
+            samples[-1] = entry
+        else:
+            samples.append(entry)
+        del samples[:-MAX_SAMPLES]
+
+    def describe(self) -> Optional[str]:
+        samples = self._load().get('samples', [])
+        if not samples:
+            return None
+        current = samples[-1]
+        trend = []
+        for days in (7, 30, 90):
+            since = time.strftime('%Y-%m-%d', time.localtime(time.time() - days * 86400))
+            older = [s for s in samples if s['day'] <= since]
+            if older:
+                delta = current['bytes'] - older[-1]['bytes']
+                trend.append(f"{days}d {'+' if delta >= 0 else '-'}{format_bytes(abs(delta))}")
+        return (f"repo {format_bytes(current['bytes'])}, {current['commits']} commits"
+                + (f" ({', '.join(trend)})" if trend else ""))
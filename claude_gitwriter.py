@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Claude Git Writer - Commits agrupados a nivel plumbing + push asíncrono
+Reemplaza el `git add .` + commit + force push de cada ciclo
+- Solo se indexan las rutas que reportó la pasada de sync (update-index)
+- Los cambios de una ventana configurable se agrupan en un único commit
+  (write-tree / commit-tree / update-ref)
+- El push corre en un thread propio con reintentos: un remoto lento nunca
+  frena el loop de sync
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from claude_manifest import atomic_write_json
+from claude_metrics import NULL_METRICS
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+COMMIT_WINDOW = 300        # segundos que se acumulan cambios antes del commit
+PUSH_TIMEOUT = 120         # segundos máximos por intento de push
+PUSH_RETRY_BASE = 10       # primer reintento tras un push fallido
+PUSH_RETRY_MAX = 900       # tope del backoff exponencial
+FLUSH_TIMEOUT = 30         # espera del push final al cerrar
+
+#=============================================================================
+# GIT PLUMBING
+#=============================================================================
+class GitError(Exception):
+    """Fallo de un comando git"""
+
+def git(repo_dir: Path, *args: str, input: Optional[bytes] = None,
+        timeout: Optional[float] = None, env: Optional[Dict[str, str]] = None) -> str:
+    """Ejecutar git en el repo y devolver stdout (GitError si falla)"""
+    try:
+        result = subprocess.run(['git', *args], cwd=repo_dir, input=input,
+                                capture_output=True, timeout=timeout,
+                                env=dict(os.environ, **env) if env else None)
+    except (subprocess.TimeoutExpired, OSError) as e:
+        raise GitError(f"git {args[0]}: {e}")
+    if result.returncode != 0:
+        stderr = result.stderr.decode(errors='replace').strip()
+        raise GitError(f"git {args[0]}: {stderr or result.returncode}")
+    return result.stdout.decode(errors='replace').strip()
+
+def head_commit(repo_dir: Path) -> Optional[str]:
+    """SHA de HEAD o None en un repo sin commits"""
+    try:
+        return git(repo_dir, 'rev-parse', '--verify', '-q', 'HEAD^{commit}')
+    except GitError:
+        return None
+
+#=============================================================================
+# WRITER
+#=============================================================================
+class GitCommitWriter:
+    """Acumula rutas, hace un commit por ventana y empuja en background.
+
+    Las rutas pendientes se persisten en `pending_file`: si el daemon muere
+    antes del commit, el siguiente arranque las incluye igualmente.
+    """
+
+    def __init__(self, repo_dir: Path, pending_file: Path, window: float = COMMIT_WINDOW,
+                 remote: str = 'origin', branch: str = 'main'):
+        self.repo_dir = Path(repo_dir)
+        self.pending_file = Path(pending_file)
+        self.window = window
+        self.remote = remote
+        self.branch = branch
+        # Serializa copias del espejo y update-index: nunca se indexa un
+        # archivo a medio copiar
+        self.lock = threading.RLock()
+        self.pending: Set[str] = set()
+        self.first_pending: Optional[float] = None
+        self.push_needed = False
+        self.push_failures = 0
+        self.next_push = 0.0
+        self.wakeup = threading.Condition(self.lock)
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+        self.metrics = NULL_METRICS
+        self._load_pending()
+
+    # -- pendientes persistidos ------------------------------------------------
+    def _load_pending(self):
+        try:
+            with open(self.pending_file) as f:
+                data = json.load(f)
+            self.pending = set(data.get('paths', []))
+            self.push_needed = bool(data.get('push_needed'))
+        except (OSError, ValueError):
+            return
+        if self.pending:
+            self.first_pending = time.time()
+            logging.info(f"📥 {len(self.pending)} rutas pendientes de commit recuperadas")
+
+    def _save_pending(self):
+        try:
+            atomic_write_json(self.pending_file, {'paths': sorted(self.pending),
+                                                  'push_needed': self.push_needed})
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo guardar pendientes de git: {e}")
+
+    # -- API -------------------------------------------------------------------
+    def start(self):
+        """Arrancar el thread de commit/push"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._worker, name='git-writer', daemon=True)
+            self.thread.start()
+
+    def stage(self, paths: Iterable[Path]):
+        """Anotar rutas del repo para el próximo commit (sin tocar git aún)"""
+        added = {os.path.relpath(p, self.repo_dir) for p in paths}
+        if not added:
+            return
+        with self.lock:
+            if not self.pending:
+                self.first_pending = time.time()
+            self.pending |= added
+            self._save_pending()
+            self.wakeup.notify()
+
+    def request_push(self):
+        """Programar un push inmediato (p.ej. tras reescribir la historia)"""
+        with self.lock:
+            self.push_needed = True
+            self.next_push = 0.0
+            self._save_pending()
+            self.wakeup.notify()
+
+    def close(self):
+        """Commit de lo pendiente y último intento de push antes de salir"""
+        if self.thread is None:
+            return
+        with self.lock:
+            self.stopping = True
+            self.wakeup.notify()
+        self.thread.join(FLUSH_TIMEOUT)
+        self.thread = None
+
+    # -- commit ------------------------------------------------------------------
+    def commit_pending(self) -> bool:
+        """Un commit con todas las rutas acumuladas (plumbing, sin `git add .`)"""
+        with self.lock:
+            if not self.pending:
+                return False
+            paths = sorted(self.pending)
+            try:
+                with self.metrics.timer("git.commit"):
+                    committed = self._commit(paths)
+            except GitError as e:
+                logging.error(f"❌ Error en git: {e}")
+                self.first_pending = time.time()  # Reintentar en la próxima ventana
+                return False
+            self.pending.clear()
+            self.first_pending = None
+            if committed:
+                self.push_needed = True
+                self.next_push = 0.0
+            self._save_pending()
+            self.metrics.flush()
+            return committed
+
+    def _commit(self, paths: List[str]) -> bool:
+        # --remove: una ruta borrada del espejo también sale del índice
+        git(self.repo_dir, 'update-index', '--add', '--remove', '-z', '--stdin',
+            input=b''.join(p.encode(errors='surrogateescape') + b'\0' for p in paths))
+        tree = git(self.repo_dir, 'write-tree')
+        parent = head_commit(self.repo_dir)
+        if parent and tree == git(self.repo_dir, 'rev-parse', f'{parent}^{{tree}}'):
+            logging.info("💤 No hay cambios")
+            return False
+
+        message = f"auto-sync {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n{len(paths)} archivos\n"
+        args = ['commit-tree', tree] + (['-p', parent] if parent else [])
+        commit = git(self.repo_dir, *args, input=message.encode())
+        # CAS sobre HEAD: si alguien movió la rama a mano, no se pisa
+        git(self.repo_dir, 'update-ref', '-m', 'auto-sync', 'HEAD', commit, parent or '')
+        logging.info(f"✅ Commit realizado ({len(paths)} archivos, {commit[:8]})")
+        return True
+
+    # -- push --------------------------------------------------------------------
+    def push(self) -> bool:
+        """Force push de la rama (un intento)"""
+        logging.info("🚀 Force push a GitHub...")
+        with self.lock:
+            # Se limpia antes: un commit o request_push() durante el push
+            # vuelve a marcarlo y no se pierde
+            self.push_needed = False
+        try:
+            with self.metrics.timer("git.push"):
+                git(self.repo_dir, 'push', '--force', self.remote, self.branch, timeout=PUSH_TIMEOUT)
+        except GitError as e:
+            with self.lock:
+                self.push_needed = True
+                self.push_failures += 1
+                delay = min(PUSH_RETRY_BASE * 2 ** (self.push_failures - 1), PUSH_RETRY_MAX)
+                self.next_push = time.time() + delay
+            logging.error(f"❌ Push fallido, reintento en {delay}s: {e}")
+            self.metrics.count("git.push_failures", 1)
+            self.metrics.flush()
+            return False
+        with self.lock:
+            self.push_failures = 0
+            self._save_pending()
+        self.metrics.flush()
+        logging.info("✅ Force push exitoso")
+        return True
+
+    # -- thread ------------------------------------------------------------------
+    def _next_deadline(self) -> Optional[float]:
+        deadlines = []
+        if self.pending:
+            deadlines.append(self.first_pending + self.window)
+        if self.push_needed:
+            deadlines.append(self.next_push)
+        return min(deadlines) if deadlines else None
+
+    def _worker(self):
+        while True:
+            with self.lock:
+                deadline = self._next_deadline()
+                now = time.time()
+                if not self.stopping and (deadline is None or deadline > now):
+                    self.wakeup.wait(None if deadline is None else deadline - now)
+                    continue
+                stopping = self.stopping
+                commit_due = self.pending and (stopping or now >= self.first_pending + self.window)
+            # El push corre fuera del lock: el loop de sync sigue copiando
+            if commit_due:
+                self.commit_pending()
+            if self.push_needed and (stopping or time.time() >= self.next_push):
+                self.push()
+            if stopping:
+                return
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Claude Lock - Ejecución single-flight con flock
+Nunca dos transferencias a la vez contra el mismo destino
+- flock sobre un lockfile: el kernel lo libera si el proceso muere
+- Pidfile con liveness real (lock tomado + pid vivo) en lugar de `pgrep -f`
+- Flag de pendiente: quien encuentra el lock ocupado no espera ni se apila,
+  deja su trigger y el proceso en curso hace una pasada más al terminar
+"""
+
+import os
+import fcntl
+import logging
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+#=============================================================================
+# LOCKS
+#=============================================================================
+class FileLock:
+    """flock exclusivo sobre un archivo"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self.fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+    def is_held_elsewhere(self) -> bool:
+        """¿Otro proceso tiene el lock? (sin quedárnoslo)"""
+        if self.fd is not None:
+            return False
+        if not self.acquire(blocking=False):
+            return True
+        self.release()
+        return False
+
+class PidFile(FileLock):
+    """Pidfile protegido por flock mientras vive el proceso dueño"""
+
+    def acquire(self, blocking: bool = False) -> bool:
+        if not super().acquire(blocking):
+            return False
+        os.ftruncate(self.fd, 0)
+        os.write(self.fd, f"{os.getpid()}\n".encode())
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+        super().release()
+
+    def owner(self) -> Optional[int]:
+        """pid del proceso vivo que tiene el pidfile (None si no hay)
+
+        Solo lectura: consultar no crea, no reescribe ni borra el pidfile.
+        """
+        if self.fd is not None:
+            return None  # Lo tenemos nosotros
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                pass  # Lock tomado: el pid escrito es el del dueño
+            else:
+                return None  # Pidfile huérfano de un proceso muerto
+            pid = int(os.read(fd, 64).decode().strip())
+            os.kill(pid, 0)
+            return pid
+        except (OSError, ValueError):
+            return None
+        finally:
+            os.close(fd)
+
+#=============================================================================
+# SINGLE-FLIGHT
+#=============================================================================
+class SingleFlight:
+    """Una sola ejecución a la vez; los triggers concurrentes se fusionan"""
+
+    def __init__(self, state_dir: Path, name: str = "sync"):
+        self.lock = FileLock(Path(state_dir) / f"{name}.lock")
+        self.pending_file = Path(state_dir) / f"{name}.pending"
+
+    def mark_pending(self):
+        self.pending_file.parent.mkdir(parents=True, exist_ok=True)
+        self.pending_file.touch()
+
+    def take_pending(self) -> bool:
+        try:
+            self.pending_file.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def run(self, func: Callable, rerun: Optional[Callable] = None,
+            blocking: bool = False) -> Tuple[bool, object]:
+        """Ejecutar func con el lock tomado.
+
+        Sin `blocking`, si otro proceso está sincronizando se deja el flag de
+        pendiente y se devuelve (False, None). Con el lock, tras func se
+        atienden los triggers que llegaron mientras tanto con `rerun`.
+        """
+        ran, result = False, None
+        while True:
+            if not self.lock.acquire(blocking):
+                if ran:
+                    return True, result  # El otro proceso atiende el pendiente
+                self.mark_pending()
+                logging.info("⏳ Sync en curso en otro proceso: trigger encolado")
+                return False, None
+            try:
+                self.take_pending()  # Lo anterior a este run ya queda cubierto
+                result = (rerun or func)() if ran else func()
+                ran = True
+                while self.take_pending():
+                    logging.info("🔁 Triggers recibidos durante el sync: una pasada más")
+                    result = (rerun or func)()
+            finally:
+                self.lock.release()
+            # Un trigger entre el último take y el release no se pierde
+            if not self.pending_file.exists():
+                return True, result
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Claude Logging - Pipeline de logs asíncrono, rotado y opcionalmente JSONL
+Los daemons escriben varias líneas por minuto durante meses
+- QueueHandler: el hilo del sync solo encola, el I/O va en un thread aparte
+- Rotación por tamaño y por día; los segmentos viejos se comprimen con gzip
+- Rotación segura entre procesos (cron + daemon sobre el mismo archivo)
+- Formato JSONL compacto opcional (CLAUDE_SYNC_LOG_FORMAT=jsonl)
+- Sin líneas duplicadas cuando stderr ya apunta al propio log (cron >> log)
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+from pathlib import Path
+from typing import Optional
+
+from claude_lock import FileLock
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_JSON = os.environ.get('CLAUDE_SYNC_LOG_FORMAT', 'text').lower() == 'jsonl'
+LOG_MAX_BYTES = int(float(os.environ.get('CLAUDE_SYNC_LOG_MAX_MB', 5)) * 1024 * 1024)
+LOG_BACKUPS = int(os.environ.get('CLAUDE_SYNC_LOG_BACKUPS', 10))  # segmentos .gz guardados
+
+# Atributos estándar de LogRecord (el resto son `extra=` y van al JSON)
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+#=============================================================================
+# FORMATO
+#=============================================================================
+class JsonLineFormatter(logging.Formatter):
+    """Un evento por línea: {"ts", "lvl", "msg", ...extra}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {'ts': round(record.created, 3), 'lvl': record.levelname,
+                 'msg': record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                event[key] = value
+        if record.exc_info:
+            event['exc'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, separators=(',', ':'), default=str)
+
+#=============================================================================
+# ROTACIÓN
+#=============================================================================
+def _gzip_rotator(source: str, dest: str):
+    """Comprimir el segmento rotado (corre en el thread del listener)"""
+    tmp = f"{dest}.tmp"
+    os.replace(source, tmp)  # Libera el nombre al instante para el resto de procesos
+    with open(tmp, 'rb') as fsrc, gzip.open(dest, 'wb') as fdst:
+        shutil.copyfileobj(fsrc, fdst)
+    os.remove(tmp)
+
+def _day(timestamp: float):
+    return time.localtime(timestamp)[:3]
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotación por tamaño o cambio de día, con gzip y lock entre procesos.
+
+    Varios procesos pueden escribir el mismo log: la rotación se hace bajo
+    flock y se re-comprueba en disco (otro pudo rotar ya), y cada proceso
+    reabre el archivo si su inode ya no es el actual.
+    """
+
+    def __init__(self, filename: Path, max_bytes: int = LOG_MAX_BYTES,
+                 backups: int = LOG_BACKUPS):
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups,
+                         encoding='utf-8', delay=True)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = _gzip_rotator
+        self.rotate_lock = FileLock(filename.with_name(f".{filename.name}.lock"))
+        self.segment_day = self._disk_day()
+        self.next_len = 0  # Longitud del registro que disparó la rotación
+
+    def _disk_day(self):
+        try:
+            return _day(os.stat(self.baseFilename).st_mtime)
+        except OSError:
+            return None
+
+    def _reopen_if_moved(self):
+        if self.stream is None:
+            return
+        try:
+            moved = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except OSError:
+            moved = True
+        if moved:
+            self.stream.close()
+            self.stream = None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        self._reopen_if_moved()
+        self.next_len = len(self.format(record)) + 1
+        if self.segment_day is None:
+            self.segment_day = _day(record.created)
+        elif _day(record.created) != self.segment_day:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.rotate_lock.acquire()
+        try:
+            # Re-comprobar en disco: otro proceso pudo rotar mientras esperábamos
+            today = _day(time.time())
+            try:
+                size = os.path.getsize(self.baseFilename)
+            except OSError:
+                size = 0
+            day = self._disk_day()
+            if size + self.next_len >= self.maxBytes or day not in (None, today):
+                super().doRollover()
+            self.segment_day = today
+        finally:
+            self.rotate_lock.release()
+
+#=============================================================================
+# CONFIGURACIÓN
+#=============================================================================
+def _writes_to(stream, path: Path) -> bool:
+    """¿`stream` es el propio archivo de log? (cron/nohup con >> log 2>&1)"""
+    try:
+        a, b = os.fstat(stream.fileno()), os.stat(path)
+    except (OSError, ValueError, AttributeError):
+        return False
+    return (a.st_dev, a.st_ino) == (b.st_dev, b.st_ino)
+
+def setup_logging(log_file: Optional[Path] = None, level: int = logging.INFO,
+                  console: bool = True) -> Optional[logging.handlers.QueueListener]:
+    """Configurar el logging raíz.
+
+    Sin `log_file` (uso interactivo) el logging es síncrono a stderr. Con
+    `log_file` los registros pasan por una cola y un QueueListener hace la
+    escritura, la rotación y la compresión fuera del hilo que sincroniza.
+    """
+    formatter = JsonLineFormatter() if LOG_JSON else logging.Formatter(LOG_FORMAT)
+    if log_file is None:
+        logging.basicConfig(level=level, format=LOG_FORMAT)
+        return None
+
+    log_file = Path(log_file)
+    handlers = [CompressedRotatingFileHandler(log_file)]
+    if console and not _writes_to(sys.stderr, log_file):
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers,
+                                              respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)  # Vaciar la cola al salir
+    return listener
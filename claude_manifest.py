@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Claude Manifest - Índice persistente de archivos sincronizados
+Guarda path, size, mtime_ns y hash de contenido de cada archivo
+- Solo se re-hashea lo que cambió de stat desde la última pasada
+- Permite saltar copias cuyo contenido ya coincide con el destino
+"""
+
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+#=============================================================================
+# UTILIDADES
+#=============================================================================
+def hash_file(path: Path) -> str:
+    """sha256 del contenido de un archivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def atomic_write_json(path: Path, data, indent=None):
+    """Escribir JSON de forma atómica (tmp + rename)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=indent, separators=None if indent else (',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def iter_files(root: Path):
+    """Recorrer recursivamente un árbol con os.scandir (devuelve path, stat)"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(Path(entry.path))
+                        elif entry.is_file():
+                            yield Path(entry.path), entry.stat()
+                    except OSError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+
+#=============================================================================
+# MANIFEST
+#=============================================================================
+class Manifest:
+    """Caché persistente path -> (size, mtime_ns, sha256)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, List] = {}
+        self.touched = set()
+        self.dirty = False
+        self.hashed = 0
+        self.load()
+
+    def load(self):
+        """Cargar manifest del disco (vacío si no existe o está corrupto)"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Manifest ilegible, se reconstruye: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Guardar manifest solo si hubo cambios"""
+        if not self.dirty:
+            return
+        atomic_write_json(self.path, {'version': MANIFEST_VERSION, 'entries': self.entries})
+        self.dirty = False
+
+    def digest(self, path: Path, st: Optional[os.stat_result] = None) -> Optional[str]:
+        """Hash de un archivo, recalculado solo si su stat cambió"""
+        key = str(path)
+        self.touched.add(key)
+        if st is None:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                self.forget(path)
+                return None
+
+        entry = self.entries.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+
+        try:
+            value = hash_file(path)
+        except FileNotFoundError:
+            self.forget(path)
+            return None
+        self.hashed += 1
+        self.record(path, st, value)
+        return value
+
+    def record(self, path: Path, st: os.stat_result, value: str):
+        """Registrar un hash ya conocido (p.ej. tras copiar un archivo)"""
+        key = str(path)
+        self.touched.add(key)
+        entry = [st.st_size, st.st_mtime_ns, value]
+        if self.entries.get(key) != entry:
+            self.entries[key] = entry
+            self.dirty = True
+
+    def forget(self, path: Path):
+        """Eliminar una entrada"""
+        if self.entries.pop(str(path), None) is not None:
+            self.dirty = True
+
+    def prune(self, roots: Iterable[Path]):
+        """Olvidar entradas bajo `roots` que no se vieron en esta pasada"""
+        prefixes = [str(root) for root in roots]
+        stale = [key for key in self.entries
+                 if key not in self.touched
+                 and any(key == p or key.startswith(p + os.sep) for p in prefixes)]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self.dirty = True
+        self.touched.clear()
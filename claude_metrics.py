@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Claude Metrics - Tiempos por etapa y contadores de los daemons de sync
+Cada daemon escribe su propio archivo de stats en el directorio de estado
+- JSON legible por máquina (lo usa `claude_sync.py --status`)
+- Textfile de Prometheus (node_exporter --collector.textfile)
+- Percentiles p50/p95 sobre una ventana móvil de muestras por etapa
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from claude_manifest import atomic_write_json
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+METRICS_VERSION = 1
+ROLLING_WINDOW = 200      # muestras por etapa para los percentiles
+QUANTILES = (0.5, 0.95)
+PROM_PREFIX = "claude_sync"
+
+#=============================================================================
+# UTILIDADES
+#=============================================================================
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """Percentil por rango más cercano (None sin muestras)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+def format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if value < 1:
+        return f"{value * 1000:.0f}ms"
+    return f"{value:.2f}s"
+
+def format_bytes(value: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024 or unit == 'GB':
+            return f"{value:.0f}{unit}" if unit == 'B' else f"{value:.1f}{unit}"
+        value /= 1024
+
+def prom_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+#=============================================================================
+# MÉTRICAS
+#=============================================================================
+class Metrics:
+    """Muestras de tiempo por etapa + contadores, persistidos por daemon.
+
+    `observe`/`count` solo acumulan en memoria (thread-safe); `flush`
+    escribe los archivos. El motor hace flush al final de cada ciclo y el
+    writer de git tras cada commit/push.
+    """
+
+    def __init__(self, daemon: str, state_dir: Path, prom_dir: Optional[Path] = None):
+        self.daemon = daemon
+        self.json_file = Path(state_dir) / f"metrics_{daemon}.json"
+        prom_dir = prom_dir or os.environ.get('CLAUDE_SYNC_PROM_DIR') or state_dir
+        self.prom_file = Path(prom_dir) / f"{PROM_PREFIX}_{daemon}.prom"
+        self.lock = threading.Lock()
+        self.samples: Dict[str, deque] = {}
+        self.totals: Dict[str, float] = {}
+        self.last: Dict[str, float] = {}
+        self.cycles = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.json_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != METRICS_VERSION:
+            return
+        for stage, info in data.get('stages', {}).items():
+            self.samples[stage] = deque(info.get('samples', []), maxlen=ROLLING_WINDOW)
+        self.totals = data.get('totals', {})
+        self.last = data.get('last', {})
+        self.cycles = data.get('cycles', 0)
+
+    # -- registro ----------------------------------------------------------------
+    def observe(self, stage: str, seconds: float):
+        """Anotar la duración de una etapa"""
+        with self.lock:
+            self.samples.setdefault(stage, deque(maxlen=ROLLING_WINDOW)).append(round(seconds, 6))
+
+    def count(self, name: str, value: float):
+        """Sumar a un contador (total acumulado + valor del último ciclo)"""
+        with self.lock:
+            self.totals[name] = self.totals.get(name, 0) + value
+            self.last[name] = self.last.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Medir un bloque: `with metrics.timer('scan'): ...`"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - start)
+
+    def start_cycle(self):
+        """Reiniciar los valores "último ciclo" de los contadores"""
+        with self.lock:
+            self.last = {}
+
+    def end_cycle(self):
+        with self.lock:
+            self.cycles += 1
+        self.flush()
+
+    # -- salida ------------------------------------------------------------------
+    def stats(self) -> Dict:
+        """Resumen por etapa con percentiles"""
+        stages = {}
+        for stage, samples in self.samples.items():
+            values = list(samples)
+            stages[stage] = {
+                'count': len(values),
+                'p50': percentile(values, 0.5),
+                'p95': percentile(values, 0.95),
+                'last': values[-1] if values else None,
+                'samples': values,
+            }
+        return {'version': METRICS_VERSION, 'daemon': self.daemon, 'updated': time.time(),
+                'cycles': self.cycles, 'stages': stages,
+                'totals': dict(self.totals), 'last': dict(self.last)}
+
+    def prometheus(self, stats: Dict) -> str:
+        """Formato de exposición de texto de Prometheus"""
+        daemon = prom_label(self.daemon)
+        lines = [f"# HELP {PROM_PREFIX}_stage_seconds Duración por etapa (ventana móvil)",
+                 f"# TYPE {PROM_PREFIX}_stage_seconds summary"]
+        for stage, info in sorted(stats['stages'].items()):
+            labels = f'daemon="{daemon}",stage="{prom_label(stage)}"'
+            for q in QUANTILES:
+                value = percentile(info['samples'], q)
+                if value is not None:
+                    lines.append(f'{PROM_PREFIX}_stage_seconds{{{labels},quantile="{q}"}} {value}')
+            lines.append(f"{PROM_PREFIX}_stage_seconds_sum{{{labels}}} {sum(info['samples'])}")
+            lines.append(f"{PROM_PREFIX}_stage_seconds_count{{{labels}}} {info['count']}")
+
+        lines += [f"# HELP {PROM_PREFIX}_total Contadores acumulados (bytes, archivos)",
+                  f"# TYPE {PROM_PREFIX}_total counter"]
+        for name, value in sorted(stats['totals'].items()):
+            lines.append(f'{PROM_PREFIX}_total{{daemon="{daemon}",name="{prom_label(name)}"}} {value}')
+
+        lines += [f"# TYPE {PROM_PREFIX}_cycles_total counter",
+                  f'{PROM_PREFIX}_cycles_total{{daemon="{daemon}"}} {stats["cycles"]}',
+                  f"# TYPE {PROM_PREFIX}_last_update_timestamp_seconds gauge",
+                  f'{PROM_PREFIX}_last_update_timestamp_seconds{{daemon="{daemon}"}} {stats["updated"]:.0f}']
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Escribir JSON + textfile de Prometheus (atómicos)"""
+        with self.lock:
+            stats = self.stats()
+        try:
+            atomic_write_json(self.json_file, stats)
+            self.prom_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.prom_file.with_name(f".{self.prom_file.name}.{os.getpid()}.tmp")
+            tmp.write_text(self.prometheus(stats))
+            os.replace(tmp, self.prom_file)
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudieron escribir métricas: {e}")
+
+class NullMetrics:
+    """Sustituto sin efecto cuando no se piden métricas"""
+
+    def observe(self, stage, seconds):
+        pass
+
+    def count(self, name, value):
+        pass
+
+    @contextmanager
+    def timer(self, stage):
+        yield
+
+    def start_cycle(self):
+        pass
+
+    def end_cycle(self):
+        pass
+
+    def flush(self):
+        pass
+
+NULL_METRICS = NullMetrics()
+
+#=============================================================================
+# LECTURA PARA --status
+#=============================================================================
+def status_lines(state_dir: Path) -> List[str]:
+    """Líneas con p50/p95 por etapa de cada daemon con métricas"""
+    lines = []
+    for json_file in sorted(Path(state_dir).glob("metrics_*.json")):
+        try:
+            with open(json_file) as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            continue
+        age = time.time() - stats.get('updated', 0)
+        lines.append(f"⏱️  Métricas {stats.get('daemon')} "
+                     f"({stats.get('cycles', 0)} ciclos, actualizado hace {age:.0f}s):")
+        for stage, info in sorted(stats.get('stages', {}).items()):
+            lines.append(f"   {stage:<20} p50 {format_seconds(info.get('p50')):>8}  "
+                         f"p95 {format_seconds(info.get('p95')):>8}  (n={info.get('count', 0)})")
+        last = stats.get('last', {})
+        if last:
+            parts = [f"{k}={format_bytes(v) if 'bytes' in k else f'{v:g}'}"
+                     for k, v in sorted(last.items())]
+            lines.append(f"   último ciclo: {', '.join(parts)}")
+    return lines
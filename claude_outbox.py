@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Claude Outbox - Journal persistente de cambios pendientes por backend
+Cuando un destino (el VPS) no responde, los cambios se acumulan aquí
+- Backoff exponencial entre intentos de transferencia
+- Health probe barato (TCP) mientras el destino es inalcanzable: al volver
+  la conexión se hace UNA transferencia de catch-up, sin tormenta de reintentos
+- Sobrevive a reinicios: un portátil offline horas no pierde nada
+"""
+
+import json
+import time
+import random
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from claude_manifest import atomic_write_json
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+OUTBOX_VERSION = 1
+RETRY_BASE = 15            # segundos hasta el primer reintento
+RETRY_MAX = 900            # tope del backoff entre transferencias
+PROBE_INTERVAL = 30        # segundos entre probes mientras no hay conexión
+MAX_JOURNAL = 10000        # rutas guardadas; más allá solo se cuenta
+
+#=============================================================================
+# OUTBOX
+#=============================================================================
+class Outbox:
+    """Cambios pendientes de un backend + estado de reintentos.
+
+    El journal guarda la última operación por ruta ('put' o 'del'). La
+    fuente de verdad sigue siendo el diff contra el último snapshot
+    aplicado: el journal sirve para saber qué y desde cuándo está pendiente.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.state = self._load()
+
+    def _empty(self) -> Dict:
+        return {'version': OUTBOX_VERSION, 'journal': {}, 'overflow': 0, 'since': None,
+                'failures': 0, 'next_attempt': 0, 'reachable': True, 'next_probe': 0,
+                'last_error': None}
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            if state.get('version') == OUTBOX_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+        return self._empty()
+
+    def save(self):
+        try:
+            atomic_write_json(self.path, self.state)
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo guardar el outbox {self.path.name}: {e}")
+
+    # -- consultas ---------------------------------------------------------------
+    @property
+    def pending(self) -> bool:
+        return self.state['since'] is not None
+
+    def __len__(self):
+        return len(self.state['journal']) + self.state['overflow']
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Segundos hasta el próximo probe o intento"""
+        if not self.pending:
+            return 0.0
+        now = now or time.time()
+        due = self.state['next_attempt'] if self.state['reachable'] else self.state['next_probe']
+        return max(0.0, due - now)
+
+    def ready(self, probe, now: Optional[float] = None) -> bool:
+        """¿Toca intentar la transferencia? (`probe` se llama solo si hace falta)"""
+        if not self.pending:
+            return True
+        now = now or time.time()
+        if self.state['reachable']:
+            return now >= self.state['next_attempt']
+        if now < self.state['next_probe']:
+            return False
+        reachable = probe()
+        self.state['next_probe'] = now + PROBE_INTERVAL
+        if reachable:
+            # Volvió la conexión: catch-up inmediato, sin esperar el backoff
+            logging.info(f"📶 Destino alcanzable de nuevo, catch-up de {len(self)} cambios")
+            self.state['reachable'] = True
+            self.state['next_attempt'] = now
+        self.save()
+        return reachable
+
+    # -- registro ----------------------------------------------------------------
+    def add(self, put: Iterable[str], delete: Iterable[str]):
+        """Anotar un change set que no se pudo aplicar.
+
+        El motor pasa siempre el diff completo contra el último snapshot
+        aplicado, así que `overflow` se recalcula en cada llamada: rutas
+        distintas que no caben en el journal, no reintentos acumulados.
+        """
+        journal = self.state['journal']
+        dropped = set()
+        for op, paths in (('put', put), ('del', delete)):
+            for path in paths:
+                if path in journal or len(journal) < MAX_JOURNAL:
+                    journal[path] = op
+                else:
+                    dropped.add(path)
+        self.state['overflow'] = len(dropped)
+        if self.state['since'] is None:
+            self.state['since'] = time.time()
+
+    def failed(self, error: str, reachable: bool):
+        """Programar el siguiente intento con backoff exponencial + jitter"""
+        now = time.time()
+        state = self.state
+        state['failures'] += 1
+        state['last_error'] = error
+        state['reachable'] = reachable
+        backoff = min(RETRY_BASE * 2 ** (state['failures'] - 1), RETRY_MAX)
+        state['next_attempt'] = now + backoff * random.uniform(0.8, 1.2)
+        state['next_probe'] = now + PROBE_INTERVAL
+        self.save()
+        if reachable:
+            logging.warning(f"📮 {len(self)} cambios en outbox, reintento en {backoff:.0f}s")
+        else:
+            logging.warning(f"📮 {len(self)} cambios en outbox, destino inalcanzable "
+                            f"(probe cada {PROBE_INTERVAL}s)")
+
+    def delivered(self):
+        """Transferencia OK: vaciar el journal"""
+        if not self.pending:
+            return
+        waited = time.time() - self.state['since']
+        if self.state['failures']:
+            logging.info(f"✅ Catch-up completado: {len(self)} cambios pendientes desde hace "
+                         f"{waited / 60:.0f} min, en una transferencia")
+        self.state = self._empty()
+        self.save()
+
+    def describe(self) -> str:
+        if not self.pending:
+            return "vacío"
+        state = self.state
+        status = "alcanzable" if state['reachable'] else "inalcanzable"
+        return (f"{len(self)} cambios pendientes desde hace {(time.time() - state['since']) / 60:.0f} min, "
+                f"{state['failures']} fallos, destino {status}, próximo intento en {self.delay():.0f}s"
+                + (f" ({state['last_error']})" if state['last_error'] else ""))
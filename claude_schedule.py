@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Claude Schedule - Planificador adaptativo para la flota
+Evita que todas las máquinas golpeen el VPS en el mismo segundo
+- Desfase fijo por máquina derivado de MACHINE_ID (+ jitter por ciclo)
+- Intervalo corto mientras ~/.claude cambia, backoff exponencial en reposo
+- Backoff exponencial también ante fallos
+- Intervalo mínimo sugerido por el servidor (.sync-policy.json en el VPS)
+- Estado persistido: el modo cron decide en cada tick si toca contactar el VPS
+- Los cambios detectados también esperan: como mínimo MIN_INTERVAL (o el
+  mínimo del servidor, + jitter) desde el último sync antes de empujarse
+"""
+
+import json
+import time
+import random
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from claude_manifest import atomic_write_json
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+MIN_INTERVAL = 20          # segundos entre syncs mientras hay actividad
+MAX_INTERVAL = 1800        # tope del backoff en reposo o con errores
+ACTIVE_WINDOW = 300        # un cambio hace "activa" la máquina durante este tiempo
+JITTER_FRACTION = 0.1      # ±10% aleatorio en cada intervalo
+POLICY_TTL = 3600          # segundos entre lecturas de la política del servidor
+CRON_SPREAD = 50           # el desfase del modo cron cae dentro del minuto
+
+#=============================================================================
+# UTILIDADES
+#=============================================================================
+def machine_offset(machine_id: str, period: float) -> float:
+    """Desfase estable en [0, period) para esta máquina"""
+    digest = hashlib.sha256(machine_id.encode()).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32 * period
+
+#=============================================================================
+# PLANIFICADORES
+#=============================================================================
+class FixedSchedule:
+    """Intervalo fijo (el comportamiento clásico: cada `interval` segundos)"""
+
+    def __init__(self, interval: float = 60, retry_interval: float = 60):
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.next_due = 0.0
+
+    def initial_delay(self) -> float:
+        return 0
+
+    def delay(self) -> float:
+        return max(0.0, self.next_due - time.time())
+
+    def hold(self) -> float:
+        return 0
+
+    def record(self, changed: bool, ok: bool):
+        self.next_due = time.time() + (self.interval if ok else self.retry_interval)
+
+    def describe(self) -> str:
+        return f"intervalo fijo {self.interval:g}s (reintento {self.retry_interval:g}s)"
+
+class AdaptiveSchedule:
+    """Intervalo según actividad, errores y política del servidor.
+
+    `policy` es un callable opcional que devuelve el intervalo mínimo que
+    pide el servidor (o None); se consulta como mucho cada POLICY_TTL.
+    """
+
+    def __init__(self, machine_id: str, state_file: Path, base: float = 60,
+                 min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 policy: Optional[Callable[[], Optional[float]]] = None):
+        self.machine_id = machine_id
+        self.state_file = Path(state_file)
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.policy = policy
+        self.offset = machine_offset(machine_id, base)
+        self.state = self._load()
+
+    def _load(self) -> Dict:
+        state = {'next_due': 0, 'hold_until': 0, 'last_run': 0, 'last_change': 0, 'idle_runs': 0,
+                 'failures': 0, 'server_min': 0, 'policy_checked': 0}
+        try:
+            with open(self.state_file) as f:
+                state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return state
+
+    def save(self):
+        try:
+            atomic_write_json(self.state_file, self.state, indent=2)
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo guardar el estado del planificador: {e}")
+
+    # -- intervalos ----------------------------------------------------------------
+    def interval(self, now: Optional[float] = None) -> float:
+        """Intervalo actual antes de jitter"""
+        now = now or time.time()
+        state = self.state
+        if state['failures']:
+            value = self.base * 2 ** min(state['failures'], 10)
+        elif now - state['last_change'] < ACTIVE_WINDOW:
+            value = self.min_interval
+        else:
+            value = self.base * 2 ** min(state['idle_runs'], 10)
+        value = min(value, self.max_interval)
+        return max(value, state['server_min'])
+
+    def initial_delay(self) -> float:
+        """Desfase de esta máquina antes del primer sync"""
+        return self.offset
+
+    def delay(self) -> float:
+        return max(0.0, self.state['next_due'] - time.time())
+
+    def due(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.state['next_due']
+
+    def hold(self) -> float:
+        """Espera antes de empujar cambios detectados (mínimo + mínimo del servidor + jitter)"""
+        return max(0.0, self.state['hold_until'] - time.time())
+
+    # -- registro --------------------------------------------------------------------
+    def record(self, changed: bool, ok: bool):
+        """Anotar el resultado de un ciclo y planificar el siguiente"""
+        now = time.time()
+        state = self.state
+        state['last_run'] = now
+        if changed:
+            state['last_change'] = now
+            state['idle_runs'] = 0
+        else:
+            state['idle_runs'] += 1
+        state['failures'] = 0 if ok else state['failures'] + 1
+        self.refresh_policy(now)
+
+        interval = self.interval(now)
+        jitter = random.uniform(-JITTER_FRACTION, JITTER_FRACTION) * interval
+        # El jitter nunca baja del mínimo del servidor
+        state['next_due'] = now + max(interval + jitter, state['server_min'])
+        gap = max(self.min_interval, state['server_min'])
+        state['hold_until'] = now + gap * (1 + random.uniform(0, JITTER_FRACTION))
+        self.save()
+
+    def refresh_policy(self, now: float):
+        """Leer el intervalo mínimo sugerido por el servidor (cacheado)"""
+        if self.policy is None or now - self.state['policy_checked'] < POLICY_TTL:
+            return
+        self.state['policy_checked'] = now
+        try:
+            value = self.policy()
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo leer la política del servidor: {e}")
+            return
+        value = float(value or 0)
+        if value != self.state['server_min']:
+            logging.info(f"📜 Intervalo mínimo del servidor: {value:g}s")
+            self.state['server_min'] = value
+
+    def describe(self) -> str:
+        state = self.state
+        return (f"intervalo {self.interval():.0f}s, próximo en {self.delay():.0f}s, "
+                f"reposo {state['idle_runs']} ciclos, fallos {state['failures']}, "
+                f"mínimo servidor {state['server_min']:g}s, desfase {self.offset:.1f}s")
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Claude Search - Búsqueda en el historial de toda la flota
+El VPS guarda un directorio por MACHINE_ID (claude-configs/<MACHINE>/) con su
+.claude.json y sus transcripts; buscar ahí era un grep de todo en cada máquina
+- Índice SQLite FTS5 local (sin FTS5: búsqueda por subcadena en la misma tabla)
+- Incremental: solo se reprocesa lo que cambió de tamaño o mtime; los
+  transcripts y el archivo de historial se leen desde el último offset
+- Historial de .claude.json, historial archivado, transcripts calientes y
+  transcripts del archivo frío
+- Filtros por máquina, proyecto y fecha
+- Funciona sobre cualquier copia local del árbol: python3 claude_search.py --help
+"""
+
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from claude_append import prefix_digest
+from claude_compact import ARCHIVE_NAME
+from claude_tiering import COLD_DIR, ColdStore
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+INDEX_VERSION = 1
+USER_HOME = Path.home()
+DEFAULT_ROOT = USER_HOME / "claude-configs"            # árbol de la flota en el VPS
+INDEX_FILE = USER_HOME / ".claude_sync_state" / "search.db"
+MAX_TEXT = 20000                   # caracteres indexados por entrada
+SNIPPET_TOKENS = 16
+READ_CHUNK = 8 * 1024 * 1024       # bytes leídos de golpe de un transcript
+MAX_LINE = 64 * 1024 * 1024        # líneas más largas (tool results enormes) se saltan
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, machine TEXT NOT NULL, size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL, offset INTEGER NOT NULL DEFAULT 0, digest TEXT);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY, file TEXT NOT NULL, machine TEXT NOT NULL, project TEXT,
+    session TEXT, kind TEXT NOT NULL, ts REAL, text TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_file ON entries(file);
+CREATE INDEX IF NOT EXISTS entries_machine_ts ON entries(machine, ts);
+'''
+
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    text, content='entries', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+'''
+
+#=============================================================================
+# EXTRACCIÓN
+#=============================================================================
+class Entry(NamedTuple):
+    project: Optional[str]
+    session: Optional[str]
+    kind: str          # history / user / assistant / summary
+    ts: Optional[float]
+    text: str
+
+def parse_timestamp(value) -> Optional[float]:
+    """ISO-8601 (con Z) → epoch"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def message_text(record: dict) -> str:
+    """Texto legible de una línea de transcript (sin tool_use ni resultados)"""
+    if record.get('type') == 'summary':
+        return str(record.get('summary', ''))
+    message = record.get('message')
+    if not isinstance(message, dict):
+        return ''
+    content = message.get('content')
+    if isinstance(content, str):
+        return content
+    parts = [block.get('text', '') for block in content or []
+             if isinstance(block, dict) and block.get('type') == 'text']
+    return '\n'.join(p for p in parts if isinstance(p, str))
+
+def transcript_entries(lines: Iterable[bytes], project_dir: str, session: str) -> Iterator[Entry]:
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        text = message_text(record).strip()
+        if not text:
+            continue
+        yield Entry(record.get('cwd') or project_dir, record.get('sessionId') or session,
+                    record.get('type', 'message'), parse_timestamp(record.get('timestamp')),
+                    text[:MAX_TEXT])
+
+def archive_entries(lines: Iterable[bytes]) -> Iterator[Entry]:
+    """Historial compactado (claude_compact): {'project', 'entry': {'display', ...}}"""
+    for line in lines:
+        try:
+            record = json.loads(line)
+            text = str(record['entry'].get('display', '')).strip()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+        if text:
+            yield Entry(record.get('project'), None, 'history', None, text[:MAX_TEXT])
+
+def history_entries(data: dict) -> Iterator[Entry]:
+    """projects.<ruta>.history de un .claude.json (sin fecha)"""
+    for project, settings in (data.get('projects') or {}).items():
+        history = settings.get('history') if isinstance(settings, dict) else None
+        for item in history if isinstance(history, list) else []:
+            text = str(item.get('display', '')).strip() if isinstance(item, dict) else ''
+            if text:
+                yield Entry(project, None, 'history', None, text[:MAX_TEXT])
+
+#=============================================================================
+# ÍNDICE
+#=============================================================================
+class IndexStats:
+    def __init__(self):
+        self.files = 0       # archivos (re)procesados
+        self.entries = 0     # entradas nuevas
+        self.removed = 0     # archivos que ya no existen
+        self.started = time.time()
+
+    def __str__(self):
+        return (f"+{self.entries} entradas de {self.files} archivos, "
+                f"{self.removed} archivos retirados ({time.time() - self.started:.1f}s)")
+
+class SearchIndex:
+    """Índice de un árbol <root>/<MACHINE>/{.claude.json,projects/,cold/,...}.
+
+    Por archivo se guarda tamaño, mtime, offset leído y sha256 completo del
+    prefijo: si el prefijo sigue igual, solo se indexa lo añadido.
+    """
+
+    def __init__(self, db_path: Path = INDEX_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.db_path))
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite sin FTS5: búsqueda por subcadena
+            self.fts = False
+
+    def close(self):
+        self.db.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _drop(self, rel: str):
+        self.db.execute("DELETE FROM entries WHERE file = ?", (rel,))
+        self.db.execute("DELETE FROM files WHERE path = ?", (rel,))
+
+    def _reset(self):
+        with self.db:
+            self.db.execute("DELETE FROM entries")
+            self.db.execute("DELETE FROM files")
+
+    def _insert(self, rel: str, machine: str, entries: Iterable[Entry]) -> int:
+        rows = [(rel, machine) + tuple(entry) for entry in entries]
+        self.db.executemany("INSERT INTO entries (file, machine, project, session, kind, ts, text) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _record(self, rel: str, machine: str, size: int, mtime_ns: int,
+                offset: int = 0, digest: Optional[str] = None):
+        self.db.execute("INSERT OR REPLACE INTO files (path, machine, size, mtime_ns, offset, digest) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", (rel, machine, size, mtime_ns, offset, digest))
+
+    # -- ingestión -----------------------------------------------------------------
+    def update(self, root: Path) -> IndexStats:
+        """Indexar lo nuevo de `root` y retirar lo que ya no está"""
+        root = Path(root).expanduser().absolute()
+        if not root.is_dir():
+            raise FileNotFoundError(f"{root} no existe")
+        if self._meta('root') not in (None, str(root)) or self._meta('version') != str(INDEX_VERSION):
+            self._reset()  # Otro árbol u otro formato: empezar de cero
+        with self.db:
+            self._set_meta('root', str(root))
+            self._set_meta('version', str(INDEX_VERSION))
+
+        stats = IndexStats()
+        known = {row[0]: row[1:] for row in
+                 self.db.execute("SELECT path, size, mtime_ns, offset, digest FROM files")}
+        seen = set()
+        for machine_dir in sorted(root.iterdir()):
+            if machine_dir.name.startswith('.') or not machine_dir.is_dir():
+                continue  # .snapshots y archivos sueltos del VPS
+            for rel, ingest in self._sources(root, machine_dir):
+                seen.add(rel)
+                try:
+                    with self.db:
+                        added = ingest(rel, machine_dir.name, known.get(rel))
+                except (OSError, ValueError, RuntimeError) as e:
+                    logging.warning(f"⚠️ No se pudo indexar {rel}: {e}")
+                    continue
+                if added is not None:
+                    stats.files += 1
+                    stats.entries += added
+        with self.db:
+            for rel in set(known) - seen:
+                self._drop(rel)
+                stats.removed += 1
+        return stats
+
+    def _sources(self, root: Path, machine_dir: Path):
+        """(ruta relativa, función de ingestión) de cada fuente de una máquina.
+
+        El push manda el *contenido* de ~/.claude/ a <MACHINE>/: projects/,
+        cold/ y el historial archivado cuelgan del directorio de la máquina.
+        """
+        claude_json = machine_dir / ".claude.json"
+        if claude_json.is_file():
+            yield claude_json.relative_to(root).as_posix(), \
+                lambda rel, machine, row: self._ingest_claude_json(claude_json, rel, machine, row)
+        archive = machine_dir / ARCHIVE_NAME
+        if archive.is_file():
+            yield archive.relative_to(root).as_posix(), \
+                lambda rel, machine, row: self._ingest_lines(archive, rel, machine, row,
+                                                             archive_entries)
+        projects = machine_dir / "projects"
+        if projects.is_dir():
+            for path in sorted(projects.rglob("*.jsonl")):
+                parse = (lambda lines, p=path:
+                         transcript_entries(lines, p.parent.name, p.stem))
+                yield path.relative_to(root).as_posix(), \
+                    lambda rel, machine, row, p=path, f=parse: self._ingest_lines(p, rel, machine, row, f)
+        if (machine_dir / COLD_DIR / "index.json").is_file():
+            store = ColdStore(machine_dir)
+            for cold_rel, info in sorted(store.entries.items()):
+                if cold_rel.startswith('projects/') and cold_rel.endswith('.jsonl'):
+                    yield f"{machine_dir.relative_to(root).as_posix()}/{cold_rel}#cold", \
+                        lambda rel, machine, row, c=cold_rel, i=info: \
+                        self._ingest_cold(store, c, i, rel, machine, row)
+
+    def _ingest_claude_json(self, path: Path, rel: str, machine: str, row) -> Optional[int]:
+        st = path.stat()
+        if row and (row[0], row[1]) == (st.st_size, st.st_mtime_ns):
+            return None
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self._drop(rel)
+        added = self._insert(rel, machine, history_entries(data))
+        self._record(rel, machine, st.st_size, st.st_mtime_ns)
+        return added
+
+    def _ingest_lines(self, path: Path, rel: str, machine: str, row, parse) -> Optional[int]:
+        """Archivos append-only: desde el offset anterior si el prefijo no cambió"""
+        st = path.stat()
+        if row and (row[0], row[1]) == (st.st_size, st.st_mtime_ns):
+            return None
+        offset = 0
+        if row and row[2] and st.st_size >= row[2] and prefix_digest(path, row[2]) == row[3]:
+            offset = row[2]
+        else:
+            self._drop(rel)  # Nuevo, truncado o reescrito: desde el principio
+        added = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            pending = b''
+            start = offset      # posición en el archivo de pending[0]
+            skipping = False    # descartando una línea de más de MAX_LINE
+            while True:
+                data = f.read(READ_CHUNK)
+                if not data:
+                    break  # Lo que queda en pending está a medio escribir: próxima pasada
+                pending += data
+                if skipping:
+                    first = pending.find(b'\n')
+                    if first < 0:
+                        start += len(pending)
+                        pending = b''
+                        continue
+                    start += first + 1
+                    pending = pending[first + 1:]
+                    offset = start
+                    skipping = False
+                end = pending.rfind(b'\n')
+                if end >= 0:
+                    added += self._insert(rel, machine, parse(pending[:end].split(b'\n')))
+                    start += end + 1
+                    pending = pending[end + 1:]
+                    offset = start
+                elif len(pending) > MAX_LINE:
+                    logging.warning(f"⚠️ {rel}: línea de más de {MAX_LINE // 2 ** 20}MB "
+                                    f"en el byte {start}, no se indexa")
+                    skipping = True
+                    start += len(pending)
+                    pending = b''
+        self._record(rel, machine, st.st_size, st.st_mtime_ns, offset,
+                     prefix_digest(path, offset) if offset else None)
+        return added
+
+    def _ingest_cold(self, store: ColdStore, cold_rel: str, info: dict,
+                     rel: str, machine: str, row) -> Optional[int]:
+        if row and row[3] == info['sha256']:
+            return None
+        self._drop(rel)
+        path = Path(cold_rel)
+        data = store.read(cold_rel)
+        added = self._insert(rel, machine,
+                             transcript_entries(data.split(b'\n'), path.parent.name, path.stem))
+        self._record(rel, machine, info['size'], info['mtime_ns'], info['size'], info['sha256'])
+        return added
+
+    # -- consulta ------------------------------------------------------------------
+    def search(self, text: str = "", machine: Optional[str] = None, project: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               kind: Optional[str] = None, limit: int = 20, recent: bool = False,
+               raw: bool = False) -> List[Tuple]:
+        """(machine, project, session, kind, ts, fragmento) de las entradas que coinciden"""
+        where, params = [], []
+        for column, op, value in (('machine', '=', machine), ('kind', '=', kind),
+                                  ('ts', '>=', since), ('ts', '<', until)):
+            if value is not None:
+                where.append(f"e.{column} {op} ?")
+                params.append(value)
+        if project:
+            where.append("instr(e.project, ?) > 0")
+            params.append(project)
+
+        terms = text.split()
+        if terms and self.fts:
+            query = text if raw else ' '.join('"' + t.replace('"', '""') + '"' for t in terms)
+            sql = ("SELECT e.machine, e.project, e.session, e.kind, e.ts, "
+                   f"snippet(entries_fts, 0, '»', '«', '…', {SNIPPET_TOKENS}) "
+                   "FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+                   "WHERE entries_fts MATCH ?" + ''.join(f" AND {w}" for w in where))
+            params.insert(0, query)
+            order = "e.ts DESC" if recent else "rank"
+        else:
+            for term in terms:
+                where.append("instr(lower(e.text), ?) > 0")
+                params.append(term.lower())
+            sql = ("SELECT e.machine, e.project, e.session, e.kind, e.ts, e.text FROM entries e"
+                   + (" WHERE " + " AND ".join(where) if where else ""))
+            order = "e.ts DESC"
+        rows = self.db.execute(f"{sql} ORDER BY {order} LIMIT ?", params + [limit]).fetchall()
+        if terms and self.fts:
+            return rows
+        return [row[:5] + (excerpt(row[5], terms),) for row in rows]
+
+    def describe(self) -> str:
+        files, entries, machines = self.db.execute(
+            "SELECT (SELECT count(*) FROM files), count(*), count(DISTINCT machine) "
+            "FROM entries").fetchone()
+        return (f"{entries} entradas de {files} archivos, {machines} máquinas "
+                f"({'FTS5' if self.fts else 'sin FTS5'}, {self.db_path})")
+
+def excerpt(text: str, terms: List[str], width: int = 160) -> str:
+    """Fragmento alrededor del primer término (búsqueda sin FTS5)"""
+    flat = ' '.join(text.split())
+    pos = flat.lower().find(terms[0].lower()) if terms else 0
+    start = max(0, pos - width // 3)
+    return ('…' if start else '') + flat[start:start + width] + ('…' if start + width < len(flat) else '')
+
+def parse_when(value: str) -> float:
+    """'7d', '12h', '30m' (hace tanto) o fecha ISO '2025-08-01[T10:00]' → epoch"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([mhdw])', value.strip())
+    if match:
+        seconds = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}[match.group(2)]
+        return time.time() - float(match.group(1)) * seconds
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha no válida: {value}")
+
+#=============================================================================
+# MAIN
+#=============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Buscar en el historial de todas las máquinas")
+    parser.add_argument('text', nargs='*', help='Texto a buscar (vacío: lo más reciente)')
+    parser.add_argument('--root', type=Path, default=DEFAULT_ROOT,
+                        help=f'Árbol de la flota, un directorio por máquina (default {DEFAULT_ROOT})')
+    parser.add_argument('--db', type=Path, default=INDEX_FILE,
+                        help=f'Archivo del índice (default {INDEX_FILE})')
+    parser.add_argument('--machine', help='Solo esta máquina (MACHINE_ID)')
+    parser.add_argument('--project', help='Filtrar por proyecto (subcadena de la ruta)')
+    parser.add_argument('--since', type=parse_when, help="Desde: '7d', '12h' o '2025-08-01'")
+    parser.add_argument('--until', type=parse_when, help='Hasta (mismo formato)')
+    parser.add_argument('--kind', choices=['history', 'user', 'assistant', 'summary'],
+                        help='Tipo de entrada')
+    parser.add_argument('--limit', type=int, default=20, help='Máximo de resultados')
+    parser.add_argument('--recent', action='store_true',
+                        help='Ordenar por fecha en lugar de por relevancia')
+    parser.add_argument('--raw', action='store_true',
+                        help='Pasar el texto tal cual a FTS5 (OR, NEAR, prefijo*)')
+    parser.add_argument('--no-update', action='store_true',
+                        help='Buscar sin actualizar antes el índice')
+    parser.add_argument('--update-only', action='store_true',
+                        help='Solo actualizar el índice')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    index = SearchIndex(args.db)
+    try:
+        if not args.no_update:
+            try:
+                stats = index.update(args.root)
+            except FileNotFoundError as e:
+                print(f"❌ {e} (usar --root)")
+                sys.exit(1)
+            print(f"📚 Índice: {stats}")
+        if args.update_only:
+            print(f"📚 {index.describe()}")
+            return
+        try:
+            hits = index.search(' '.join(args.text), args.machine, args.project, args.since,
+                                args.until, args.kind, args.limit, args.recent, args.raw)
+        except sqlite3.OperationalError as e:
+            print(f"❌ Consulta FTS5 no válida: {e}")
+            sys.exit(1)
+        for machine, project, session, kind, ts, fragment in hits:
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(ts)) if ts else 'sin fecha'
+            print(f"🖥️  {machine} · 📁 {project or '?'} · 🕒 {when} · {kind}"
+                  + (f" · {session[:8]}" if session else ""))
+            print(f"   {' '.join(fragment.split())}")
+        print(f"🔍 {len(hits)} resultados")
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
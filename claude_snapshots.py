@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Claude Snapshots - Snapshots versionados en el VPS con hardlinks
+El espejo por máquina usa --delete: un borrado local llega a la única copia
+- Tras un sync correcto (como mucho cada SNAPSHOT_INTERVAL) se congela el
+  espejo con `cp -al` en claude-configs/.snapshots/<MACHINE>/<fecha>/
+- rsync nunca escribe in-place (y el envío por cola rompe hardlinks), así
+  que cada snapshot solo ocupa lo que cambió
+- Retención configurable: horarios/diarios/semanales (CLAUDE_SYNC_SNAPSHOTS)
+- Listado y restauración de cualquier snapshot
+"""
+
+import time
+import shlex
+import calendar
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Set
+
+from claude_append import remote_base_command
+from claude_copy import sync_tree
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+SNAPSHOT_DIR = ".snapshots"
+SNAPSHOT_INTERVAL = 3600           # segundos mínimos entre snapshots
+STAMP_FORMAT = "%Y%m%dT%H%M%SZ"    # UTC, ordena lexicográficamente
+SNAPSHOT_TIMEOUT = 600             # segundos para cp -al / rm -rf remotos
+DEFAULT_RETENTION = "hourly=24,daily=14,weekly=8"
+
+# Cubeta de cada nivel de retención: se guarda el snapshot más nuevo de cada una
+BUCKETS = {'hourly': "%Y%m%d%H", 'daily': "%Y%m%d", 'weekly': "%G%V", 'monthly': "%Y%m"}
+
+SNAPSHOT_SCRIPT = r'''
+set -e
+cd {base}
+test -d {name}
+mkdir -p {dir}
+cp -al {name} {dir}/.partial-{stamp}
+mv {dir}/.partial-{stamp} {dir}/{stamp}
+'''
+
+#=============================================================================
+# RETENCIÓN
+#=============================================================================
+def parse_retention(spec: str) -> Dict[str, int]:
+    """'hourly=24,daily=14' -> {'hourly': 24, 'daily': 14} ('off' = sin snapshots)"""
+    policy = {}
+    if spec.strip().lower() in ('', 'off', '0', 'no'):
+        return policy
+    for item in spec.split(','):
+        unit, _, count = item.strip().partition('=')
+        if unit not in BUCKETS:
+            raise ValueError(f"Nivel de retención desconocido: {unit}")
+        policy[unit] = int(count)
+    return policy
+
+def stamp_time(stamp: str) -> float:
+    return calendar.timegm(time.strptime(stamp, STAMP_FORMAT))
+
+def select_keep(stamps: List[str], policy: Dict[str, int]) -> Set[str]:
+    """Snapshots a conservar: el más nuevo de cada una de las últimas N cubetas por nivel"""
+    ordered = sorted(stamps, reverse=True)
+    keep = set(ordered[:1])  # El último siempre
+    for unit, count in policy.items():
+        seen = set()
+        for stamp in ordered:
+            if len(seen) >= count:
+                break
+            bucket = time.strftime(BUCKETS[unit], time.gmtime(stamp_time(stamp)))
+            if bucket not in seen:
+                seen.add(bucket)
+                keep.add(stamp)
+    return keep
+
+#=============================================================================
+# SNAPSHOTS
+#=============================================================================
+class SnapshotManager:
+    """Snapshots de `<base>/<name>` en `<base>/.snapshots/<name>/`.
+
+    Con transport los comandos van por el master SSH al VPS; sin él, el
+    destino es local (rsync:/ruta) y se ejecutan aquí.
+    """
+
+    def __init__(self, base: str, name: str, state_file: Path, transport=None,
+                 retention: str = DEFAULT_RETENTION, interval: float = SNAPSHOT_INTERVAL):
+        self.base = base
+        self.name = name
+        self.state_file = Path(state_file)
+        self.transport = transport
+        self.policy = parse_retention(retention)
+        self.interval = interval
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policy)
+
+    def snapshot_dir(self) -> str:
+        return f"{SNAPSHOT_DIR}/{self.name}"
+
+    def _run(self, script: str) -> subprocess.CompletedProcess:
+        if self.transport is None:
+            return subprocess.run(['sh', '-c', script], capture_output=True,
+                                  timeout=SNAPSHOT_TIMEOUT)
+        if not self.transport.ensure():
+            raise OSError("destino inalcanzable")
+        return self.transport.run(script, timeout=SNAPSHOT_TIMEOUT)
+
+    def _cd(self) -> str:
+        return remote_base_command(self.base) if self.transport else shlex.quote(self.base)
+
+    def _last(self) -> float:
+        try:
+            return float(self.state_file.read_text())
+        except (OSError, ValueError):
+            return 0.0
+
+    # -- operaciones ---------------------------------------------------------------
+    def after_sync(self):
+        """Snapshot + poda si toca (llamado tras un sync correcto)"""
+        if not self.enabled or time.time() - self._last() < self.interval:
+            return
+        stamp = self.take()
+        pruned = self.prune()
+        logging.info(f"📸 Snapshot {stamp} en {self.snapshot_dir()}"
+                     + (f", {len(pruned)} podados" if pruned else ""))
+
+    def take(self) -> str:
+        stamp = time.strftime(STAMP_FORMAT, time.gmtime())
+        result = self._run(SNAPSHOT_SCRIPT.format(
+            base=self._cd(), name=shlex.quote(self.name),
+            dir=shlex.quote(self.snapshot_dir()), stamp=stamp))
+        if result.returncode != 0:
+            raise OSError(f"snapshot fallido: {result.stderr.decode(errors='replace').strip()}")
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        self.state_file.write_text(str(time.time()))
+        return stamp
+
+    def list(self) -> List[str]:
+        result = self._run(f"cd {self._cd()} && ls -1 {shlex.quote(self.snapshot_dir())} 2>/dev/null || true")
+        stamps = []
+        for line in result.stdout.decode(errors='replace').split():
+            try:
+                stamp_time(line)
+                stamps.append(line)
+            except ValueError:
+                continue  # .partial-* de un snapshot interrumpido
+        return sorted(stamps)
+
+    def prune(self) -> List[str]:
+        stamps = self.list()
+        doomed = sorted(set(stamps) - select_keep(stamps, self.policy))
+        # Fuera también los restos .partial-* de snapshots interrumpidos
+        targets = ''.join(f" {shlex.quote(s)}" for s in doomed)
+        result = self._run(f"cd {self._cd()}/{shlex.quote(self.snapshot_dir())} && "
+                           f"rm -rf --{targets} .partial-*")
+        if result.returncode != 0:
+            logging.warning(f"⚠️ Poda de snapshots fallida: "
+                            f"{result.stderr.decode(errors='replace').strip()}")
+            return []
+        return doomed
+
+    def pull(self, stamp: str, dest: Path) -> bool:
+        """Traer un snapshot completo a `dest` (rsync)"""
+        stamp_time(stamp)  # Valida el nombre antes de usarlo en una ruta
+        dest = Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        source = f"{self.base}/{self.snapshot_dir()}/{stamp}/"
+        if self.transport is None:
+            sync_tree(Path(source), dest, delete=False)
+            return True
+        if not self.transport.ensure():
+            return False
+        cmd = ['rsync', '-az', '-e', self.transport.ssh_command(),
+               f"{self.transport.host}:{source}", f"{dest}/"]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logging.error(f"❌ Error trayendo snapshot {stamp}: {result.stderr.strip()}")
+            return False
+        return True
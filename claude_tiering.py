@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Claude Tiering - Archivo frío comprimido para transcripts inactivos
+Los transcripts de ~/.claude/projects/ crecen sin fin y casi nunca se releen
+- Opt-in (CLAUDE_SYNC_TIER_DAYS=N): transcripts sin tocar más de N días
+  pasan comprimidos (zstd si está instalado, si no gzip) a ~/.claude/cold/
+- El original solo se borra después de releer el pack y comprobar que
+  devuelve los mismos bytes (sha256). Una vez borrado, `claude --resume`
+  ya no lo ve hasta descongelarlo (claude_sync.py --thaw)
+- Un pack append-only por proyecto y mes: pocos archivos en la lista de
+  rsync y los packs viejos no cambian
+- Índice (cold/index.json) para leerlos o descongelarlos de forma transparente
+- Los transcripts activos siguen por el camino normal de deltas
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from claude_engine import Stage
+from claude_manifest import atomic_write_json
+from claude_metrics import format_bytes
+
+try:
+    import zstandard
+except ImportError:  # Sin zstandard: gzip de la stdlib
+    zstandard = None
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+INDEX_VERSION = 1
+COLD_DIR = "cold"                  # dentro de ~/.claude, viaja con el sync
+TIER_IDLE_DAYS = float(os.environ.get('CLAUDE_SYNC_TIER_DAYS', 0))  # 0 = desactivado
+TIER_INTERVAL = 3600               # segundos entre pasadas de la etapa
+TRANSCRIPT_GLOB = "*.jsonl"        # bajo projects/
+CODEC = 'zstd' if zstandard is not None else 'gzip'
+
+#=============================================================================
+# COMPRESIÓN
+#=============================================================================
+def compress(data: bytes, codec: str = CODEC) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+def decompress(blob: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("transcript comprimido con zstd: instalar `zstandard`")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+#=============================================================================
+# ARCHIVO FRÍO
+#=============================================================================
+class ColdStore:
+    """Packs comprimidos + índice bajo ~/.claude/cold/.
+
+    Índice: ruta relativa a ~/.claude -> {pack, offset, length, codec, size,
+    mtime_ns, sha256}. Un pack es una concatenación de blobs comprimidos.
+    """
+
+    def __init__(self, claude_dir: Path):
+        self.claude_dir = Path(claude_dir)
+        self.root = self.claude_dir / COLD_DIR
+        self.index_file = self.root / "index.json"
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_file) as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                return data['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def save(self):
+        atomic_write_json(self.index_file, {'version': INDEX_VERSION, 'entries': self.entries})
+
+    def rel(self, path: Path) -> str:
+        return Path(path).relative_to(self.claude_dir).as_posix()
+
+    def pack_for(self, rel: str, now: float) -> str:
+        """Pack del proyecto y mes actual (ruta relativa a cold/)"""
+        return (Path(rel).parent / f"{time.strftime('%Y-%m', time.localtime(now))}.pack").as_posix()
+
+    # -- congelar ------------------------------------------------------------------
+    def freeze(self, paths: Iterable[Path]) -> List[Path]:
+        """Comprimir transcripts al archivo frío y borrar los originales.
+
+        El índice se guarda antes de borrar nada, y cada original solo se
+        borra si su entrada se relee desde el pack idéntica byte a byte. Un
+        original que cambió mientras se comprimía se queda donde está.
+        Devuelve las rutas tocadas.
+        """
+        now = time.time()
+        frozen = []
+        for path in paths:
+            try:
+                st = path.stat()
+                data = path.read_bytes()
+            except OSError:
+                continue
+            if len(data) != st.st_size:
+                continue  # Se está escribiendo
+            rel = self.rel(path)
+            codec = CODEC
+            blob = compress(data, codec)
+            pack_rel = self.pack_for(rel, now)
+            pack = self.root / pack_rel
+            pack.parent.mkdir(parents=True, exist_ok=True)
+            with open(pack, 'ab') as f:
+                offset = f.tell()
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[rel] = {'pack': pack_rel, 'offset': offset, 'length': len(blob),
+                                 'codec': codec, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                                 'sha256': hashlib.sha256(data).hexdigest()}
+            frozen.append((path, st, pack, data))
+        if not frozen:
+            return []
+        self.save()
+
+        touched = {self.index_file}
+        for path, st, pack, data in frozen:
+            touched.add(pack)
+            rel = self.rel(path)
+            try:
+                verified = self.read(rel) == data
+            except Exception as e:
+                logging.warning(f"⚠️ {rel}: relectura del archivo frío fallida: {e}")
+                verified = False
+            if not verified:
+                # El descongelado no devolvería el original: no se borra
+                logging.warning(f"⚠️ {rel}: el pack no devuelve el original, se conserva")
+                del self.entries[rel]
+                continue
+            try:
+                current = path.stat()
+            except FileNotFoundError:
+                continue
+            if (current.st_size, current.st_mtime_ns) != (st.st_size, st.st_mtime_ns):
+                # Sesión reanudada durante el freeze: sigue caliente
+                del self.entries[rel]
+                continue
+            path.unlink()
+            touched.add(path)
+        self.save()
+        return sorted(touched)
+
+    # -- leer / descongelar ------------------------------------------------------
+    def read(self, rel: str) -> bytes:
+        entry = self.entries[rel]
+        with open(self.root / entry['pack'], 'rb') as f:
+            f.seek(entry['offset'])
+            blob = f.read(entry['length'])
+        data = decompress(blob, entry['codec'])
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise ValueError(f"{rel}: checksum del archivo frío no coincide")
+        return data
+
+    def thaw(self, rel: str) -> Path:
+        """Restaurar un transcript en su sitio.
+
+        Queda con mtime actual: si no, la siguiente pasada lo volvería a congelar.
+        """
+        target = self.claude_dir / rel
+        if target.exists():
+            raise FileExistsError(f"{target} ya existe (¿sesión reanudada?)")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.thaw")
+        tmp.write_bytes(self.read(rel))
+        os.replace(tmp, target)
+        del self.entries[rel]
+        self.save()
+        return target
+
+    def find(self, query: str) -> List[str]:
+        """Entradas cuya ruta contiene `query` (id de sesión o proyecto)"""
+        return sorted(rel for rel in self.entries if query in rel)
+
+    def describe(self) -> str:
+        if not self.entries:
+            return "vacío"
+        size = sum(e['size'] for e in self.entries.values())
+        stored = sum(e['length'] for e in self.entries.values())
+        return (f"{len(self.entries)} transcripts, {format_bytes(size)} → "
+                f"{format_bytes(stored)} comprimidos")
+
+#=============================================================================
+# ETAPA DEL MOTOR
+#=============================================================================
+class TieringStage(Stage):
+    """Congelar transcripts inactivos antes del sync"""
+
+    name = "tiering"
+    interval = TIER_INTERVAL
+
+    def __init__(self, claude_dir: Path, idle_days: float = TIER_IDLE_DAYS):
+        self.claude_dir = Path(claude_dir)
+        self.idle_days = idle_days
+
+    def candidates(self, now: Optional[float] = None) -> List[Path]:
+        cutoff = (now or time.time()) - self.idle_days * 86400
+        projects = self.claude_dir / "projects"
+        if not projects.is_dir():
+            return []
+        idle = []
+        for path in projects.rglob(TRANSCRIPT_GLOB):
+            try:
+                if path.is_file() and path.stat().st_mtime < cutoff:
+                    idle.append(path)
+            except OSError:
+                continue
+        return sorted(idle)
+
+    def run(self) -> List[Path]:
+        if self.idle_days <= 0:
+            return []  # Desactivado: nunca congelar todo
+        idle = self.candidates()
+        if not idle:
+            return []
+        store = ColdStore(self.claude_dir)
+        touched = store.freeze(idle)
+        frozen = sum(1 for p in idle if not p.exists())
+        if frozen:
+            logging.info(f"🧊 {frozen} transcripts inactivos (> {self.idle_days:g} días) "
+                         f"al archivo frío: {store.describe()}")
+        return touched
+
+    def describe(self) -> str:
+        return ColdStore(self.claude_dir).describe()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Claude Transport - Conexión SSH persistente para el path rsync
+Una sola clave materializada en disco y un socket ControlMaster reutilizado
+- La clave se escribe una vez con permisos 0600 (no un tempfile por sync)
+- ControlMaster/ControlPersist: el handshake se paga una vez, no por rsync
+- Health check con `ssh -O check` y reconexión automática
+- Host key: StrictHostKeyChecking=accept-new contra un known_hosts propio
+  (ssh/known_hosts en el directorio de estado). Antes era `no` + /dev/null;
+  si el VPS cambia de clave, borrar ese archivo tras comprobarla
+"""
+
+import os
+import shlex
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+CONTROL_PERSIST = 600     # segundos que el master sobrevive sin clientes
+CONNECT_TIMEOUT = 10      # segundos para establecer la conexión
+CHECK_TIMEOUT = 5         # segundos para `ssh -O check`
+SSH_FAILURE_CODE = 255    # código de salida de ssh ante error de conexión
+
+#=============================================================================
+# TRANSPORTE SSH
+#=============================================================================
+class SSHTransport:
+    """Conexión SSH multiplexada hacia un host"""
+
+    def __init__(self, host: str, private_key: str, state_dir: Path,
+                 persist: int = CONTROL_PERSIST, connect_timeout: int = CONNECT_TIMEOUT,
+                 port: int = 22):
+        self.host = host
+        self.port = port
+        self.private_key = private_key
+        self.ssh_dir = Path(state_dir) / "ssh"
+        self.key_path = self.ssh_dir / "claude_sync_key"
+        self.known_hosts = self.ssh_dir / "known_hosts"
+        # %C = hash de (host, user, port): mantiene la ruta del socket corta
+        self.control_path = self.ssh_dir / "cm-%C"
+        self.persist = persist
+        self.connect_timeout = connect_timeout
+
+    def materialize_key(self):
+        """Escribir la clave privada una sola vez con los permisos correctos"""
+        self.ssh_dir.mkdir(parents=True, exist_ok=True)
+        os.chmod(self.ssh_dir, 0o700)
+
+        content = self.private_key.rstrip('\n') + '\n'
+        try:
+            if self.key_path.read_text() == content:
+                return
+        except OSError:
+            pass
+
+        tmp = self.key_path.with_name(f".{self.key_path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp, self.key_path)
+        logging.info(f"🔑 Clave SSH materializada en {self.key_path}")
+
+    def options(self, master: str = 'no') -> List[str]:
+        """Opciones ssh comunes (clave, multiplexing y timeouts)
+
+        ssh se queda con el primer valor de cada opción: ControlMaster va
+        solo aquí. `yes` solo en connect(); el resto usa el master si existe
+        y si no conecta directo. Con `auto` un cliente sin master se
+        convertiría en él y, con ControlPersist, quedaría en background
+        reteniendo los pipes de quien lo lanzó.
+        """
+        return [
+            '-i', str(self.key_path),
+            '-o', 'IdentitiesOnly=yes',
+            '-o', 'BatchMode=yes',
+            '-o', 'StrictHostKeyChecking=accept-new',
+            '-o', f'UserKnownHostsFile={self.known_hosts}',
+            '-o', f'ControlMaster={master}',
+            '-o', f'ControlPath={self.control_path}',
+            '-o', f'ControlPersist={self.persist}',
+            '-o', f'ConnectTimeout={self.connect_timeout}',
+            '-p', str(self.port),
+            '-o', 'ServerAliveInterval=15',
+            '-o', 'ServerAliveCountMax=3',
+        ]
+
+    def ssh_command(self) -> str:
+        """Comando ssh para `rsync -e`"""
+        return shlex.join(['ssh'] + self.options())
+
+    def _control(self, operation: str, timeout: int = CHECK_TIMEOUT) -> bool:
+        """Ejecutar `ssh -O <operation>` contra el master"""
+        cmd = ['ssh'] + self.options() + ['-O', operation, self.host]
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+            return result.returncode == 0
+        except (subprocess.TimeoutExpired, OSError):
+            return False
+
+    def is_alive(self) -> bool:
+        """¿Hay un master vivo para este host?"""
+        return self._control('check')
+
+    def connect(self) -> bool:
+        """Levantar el master en background"""
+        self.materialize_key()
+        cmd = ['ssh'] + self.options(master='yes') + ['-f', '-N', self.host]
+        # El master que ssh deja en background hereda stdout/stderr: con
+        # pipes, run() esperaría su EOF hasta el timeout. stderr va a un archivo
+        try:
+            with tempfile.TemporaryFile() as stderr:
+                result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                        stderr=stderr, timeout=self.connect_timeout + 5)
+                stderr.seek(0)
+                error = stderr.read().decode(errors='replace').strip()
+        except (subprocess.TimeoutExpired, OSError) as e:
+            logging.error(f"❌ No se pudo abrir conexión SSH: {e}")
+            return False
+        if result.returncode != 0:
+            logging.error(f"❌ No se pudo abrir conexión SSH: {error}")
+            return False
+        logging.info(f"🔌 Conexión SSH persistente abierta con {self.host}")
+        return True
+
+    def ensure(self) -> bool:
+        """Garantizar un master sano, reconectando si hace falta"""
+        self.materialize_key()
+        if self.is_alive():
+            return True
+        return self.connect()
+
+    def reset(self):
+        """Tirar el master (p.ej. tras un fallo de red) para reconectar limpio"""
+        if not self._control('exit'):
+            # Socket huérfano de un master muerto: borrarlo a mano
+            for sock in self.ssh_dir.glob('cm-*'):
+                try:
+                    sock.unlink()
+                except OSError:
+                    pass
+
+    def run(self, remote_command: str, input: Optional[bytes] = None,
+            timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """Ejecutar un comando remoto sobre el master"""
+        cmd = ['ssh'] + self.options() + [self.host, remote_command]
+        return subprocess.run(cmd, input=input, capture_output=True, timeout=timeout)
+
+    def close(self):
+        """Cerrar el master (al parar el daemon)"""
+        if self.is_alive():
+            self._control('exit')
+            logging.info("🔌 Conexión SSH persistente cerrada")
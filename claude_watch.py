@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Claude Watch - Detección de cambios por eventos
+Vigila ~/.claude/ y ~/.claude.json y agrupa ráfagas de escrituras en lotes
+- inotify nativo vía ctypes (sin dependencias externas)
+- Debounce configurable: un lote por ráfaga, no un sync por escritura
+- Fallback a polling por stat donde inotify no está disponible
+"""
+
+import os
+import time
+import errno
+import select
+import threading
+import struct
+import ctypes
+import ctypes.util
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+#=============================================================================
+# CONSTANTES GLOBALES
+#=============================================================================
+DEFAULT_DEBOUNCE = 0.5   # segundos de silencio que cierran un lote
+MAX_BATCH_FACTOR = 10    # un lote nunca espera más de debounce * factor
+POLL_INTERVAL = 2.0      # segundos entre snapshots en modo polling
+
+# Máscaras inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+#=============================================================================
+# WATCHER INOTIFY
+#=============================================================================
+def _load_libc():
+    """Cargar libc con soporte inotify (None si no existe)"""
+    name = ctypes.util.find_library('c')
+    if not name:
+        return None
+    try:
+        libc = ctypes.CDLL(name, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_add_watch.restype = ctypes.c_int
+    return libc
+
+class InotifyWatcher:
+    """Watcher por eventos del kernel.
+
+    Cada target se vigila a través de su directorio padre (filtrando por
+    nombre), así los reemplazos atómicos por rename que hace el CLI sobre
+    ~/.claude.json no rompen el watch. Los targets que son directorios se
+    vigilan además de forma recursiva.
+    """
+
+    def __init__(self, targets: Iterable[Path], debounce: float = DEFAULT_DEBOUNCE):
+        self.targets = [Path(t) for t in targets]
+        self.debounce = debounce
+        self.libc = _load_libc()
+        if self.libc is None:
+            raise OSError(errno.ENOSYS, "inotify no disponible")
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        # Self-pipe para que otro thread pueda interrumpir wait() (wake)
+        self.wake_r, self.wake_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+
+        self.wd_paths: Dict[int, Path] = {}
+        self.path_wds: Dict[Path, int] = {}
+        # Directorio padre -> nombres de targets que nos interesan
+        self.parent_filters: Dict[Path, Set[str]] = {}
+        self.recursive_roots: Set[Path] = set()
+
+        for target in self.targets:
+            parent = target.parent
+            self.parent_filters.setdefault(parent, set()).add(target.name)
+            self._add_watch(parent)
+            if target.is_dir():
+                self._add_tree(target)
+
+    def _add_watch(self, path: Path) -> Optional[int]:
+        """Registrar un watch sobre un directorio"""
+        if path in self.path_wds:
+            return self.path_wds[path]
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(path)), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return None
+            raise OSError(err, f"inotify_add_watch {path}: {os.strerror(err)}")
+        self.wd_paths[wd] = path
+        self.path_wds[path] = wd
+        return wd
+
+    def _add_tree(self, root: Path):
+        """Vigilar un árbol de directorios completo"""
+        self.recursive_roots.add(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            self._add_watch(Path(dirpath))
+
+    def _in_recursive_root(self, path: Path) -> bool:
+        return any(path == root or root in path.parents for root in self.recursive_roots)
+
+    def _read_events(self) -> List[Tuple[int, int, str]]:
+        """Leer todos los eventos pendientes del descriptor"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+                offset += length
+                events.append((wd, mask, name))
+        return events
+
+    def _process(self, events, changed: Set[Path]):
+        """Traducir eventos a rutas cambiadas y mantener los watches"""
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Cola desbordada: no sabemos qué cambió, reportar los targets
+                logging.warning("⚠️ Cola inotify desbordada, forzando rescan completo")
+                changed.update(self.targets)
+                continue
+
+            directory = self.wd_paths.get(wd)
+            if directory is None:
+                continue
+
+            if mask & IN_IGNORED:
+                self.wd_paths.pop(wd, None)
+                self.path_wds.pop(directory, None)
+                continue
+
+            path = directory / name if name else directory
+            watched_parent = self.parent_filters.get(directory)
+            in_tree = self._in_recursive_root(directory)
+
+            if not in_tree and watched_parent is not None and name not in watched_parent:
+                continue
+
+            # Directorio nuevo (o target recreado): vigilarlo recursivamente
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                if in_tree or path in self.targets:
+                    try:
+                        self._add_tree(path)
+                    except OSError as e:
+                        logging.warning(f"⚠️ No se pudo vigilar {path}: {e}")
+
+            changed.add(path)
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Esperar un lote de cambios.
+
+        Bloquea hasta el primer evento (o hasta `timeout`), y después sigue
+        acumulando mientras lleguen eventos con menos de `debounce` segundos
+        de separación. Devuelve un set vacío si vence el timeout.
+        """
+        changed: Set[Path] = set()
+        readable, _, _ = select.select([self.fd, self.wake_r], [], [], timeout)
+        if self.wake_r in readable:
+            self._drain_wake()
+            return changed  # wake(): el llamador decide qué hacer
+        if not readable:
+            return changed
+
+        deadline = time.monotonic() + self.debounce * MAX_BATCH_FACTOR
+        self._process(self._read_events(), changed)
+        while True:
+            remaining = min(self.debounce, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([self.fd, self.wake_r], [], [], remaining)
+            if self.wake_r in readable:
+                self._drain_wake()
+                break  # Se entrega el lote acumulado hasta ahora
+            if not readable:
+                break
+            self._process(self._read_events(), changed)
+        return changed
+
+    def wake(self):
+        """Interrumpir un wait() en curso (seguro desde otro thread)"""
+        try:
+            os.write(self.wake_w, b'x')
+        except BlockingIOError:
+            pass  # Ya hay un wake pendiente
+
+    def _drain_wake(self):
+        try:
+            while os.read(self.wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        """Liberar el descriptor inotify"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            os.close(self.wake_r)
+            os.close(self.wake_w)
+            self.fd = -1
+
+#=============================================================================
+# WATCHER POLLING (FALLBACK)
+#=============================================================================
+def _stat_snapshot(targets: Iterable[Path]) -> Dict[Path, Tuple[int, int]]:
+    """Mapa ruta -> (size, mtime_ns) de todos los targets"""
+    snapshot = {}
+    for target in targets:
+        try:
+            st = target.stat()
+        except OSError:
+            continue
+        snapshot[target] = (st.st_size, st.st_mtime_ns)
+        if target.is_dir():
+            for dirpath, dirnames, filenames in os.walk(target):
+                for name in dirnames + filenames:
+                    path = Path(dirpath) / name
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_size, st.st_mtime_ns)
+    return snapshot
+
+class PollingWatcher:
+    """Watcher por comparación de snapshots stat (sin soporte del kernel)"""
+
+    def __init__(self, targets: Iterable[Path], debounce: float = DEFAULT_DEBOUNCE,
+                 interval: float = POLL_INTERVAL):
+        self.targets = [Path(t) for t in targets]
+        self.debounce = debounce
+        self.interval = interval
+        self.snapshot = _stat_snapshot(self.targets)
+        self.woken = threading.Event()
+
+    def _diff(self) -> Set[Path]:
+        current = _stat_snapshot(self.targets)
+        changed = {p for p in current.keys() | self.snapshot.keys()
+                   if current.get(p) != self.snapshot.get(p)}
+        self.snapshot = current
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Esperar un lote de cambios (misma semántica que InotifyWatcher)"""
+        start = time.monotonic()
+        while True:
+            changed = self._diff()
+            if changed:
+                break
+            if timeout is not None and time.monotonic() - start >= timeout:
+                return set()
+            sleep_for = self.interval
+            if timeout is not None:
+                sleep_for = min(sleep_for, max(0.0, timeout - (time.monotonic() - start)))
+            if self.woken.wait(sleep_for):
+                self.woken.clear()
+                return set()
+
+        # Debounce: seguir mientras sigan llegando cambios
+        deadline = time.monotonic() + self.debounce * MAX_BATCH_FACTOR
+        while time.monotonic() < deadline:
+            time.sleep(self.debounce)
+            more = self._diff()
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def wake(self):
+        """Interrumpir un wait() en curso (seguro desde otro thread)"""
+        self.woken.set()
+
+    def close(self):
+        pass
+
+#=============================================================================
+# FACTORY
+#=============================================================================
+def create_watcher(targets: Iterable[Path], debounce: float = DEFAULT_DEBOUNCE,
+                   force_polling: bool = False):
+    """Crear el mejor watcher disponible: inotify, o polling como fallback"""
+    targets = list(targets)
+    if not force_polling:
+        try:
+            watcher = InotifyWatcher(targets, debounce=debounce)
+            logging.info(f"👀 Watcher inotify activo ({len(watcher.wd_paths)} directorios)")
+            return watcher
+        except OSError as e:
+            logging.warning(f"⚠️ inotify no disponible ({e}), usando polling cada {POLL_INTERVAL}s")
+    return PollingWatcher(targets, debounce=debounce)
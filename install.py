@@ -15,13 +15,22 @@ import logging
 from pathlib import Path
 from typing import Dict, Optional
 
+from claude_copy import copy_file, file_differs, sync_tree
+from claude_engine import GitMirrorBackend, SyncEngine
+from claude_gitwriter import GitCommitWriter
+from claude_gitmaint import GitMaintenanceStage
+from claude_logging import setup_logging as configure_logging
+
 #=============================================================================
 # CONSTANTES GLOBALES
 #=============================================================================
 SCRIPT_VERSION = "4.0"
-SYNC_INTERVAL = 60  # segundos
+# Segundos que se agrupan cambios en un solo commit (+ push)
+COMMIT_WINDOW = float(os.environ.get('CLAUDE_SYNC_COMMIT_WINDOW', 300))
 SERVICE_NAME = "claude-sync.service"
-LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+# Un único daemon (claude_sync.py) con los dos destinos: un solo scan,
+# watcher y lock para el espejo git y el VPS
+DAEMON_BACKENDS = os.environ.get('CLAUDE_SYNC_BACKENDS', "rsync,git")
 
 # Rutas dinámicas
 SCRIPT_DIR = Path(__file__).parent.absolute()
@@ -29,6 +38,7 @@ REPO_DIR = SCRIPT_DIR
 CONFIG_DIR = REPO_DIR / "claude_config"
 LOGS_DIR = REPO_DIR / "logs"
 SERVICE_FILE = Path("/etc/systemd/system") / SERVICE_NAME
+SYNC_SCRIPT = SCRIPT_DIR / "claude_sync.py"
 
 # Detectar usuario y home real (cuando se ejecuta con sudo)
 SUDO_USER = os.environ.get('SUDO_USER')
@@ -39,15 +49,23 @@ if SUDO_USER:
 else:
     USER_HOME = Path.home()
     CURRENT_USER = os.getenv('USER', 'unknown')
+# Unidad que instala claude_sync.py por su cuenta: se sustituye por la nuestra
+USER_SERVICE_NAME = f"claude-sync-{CURRENT_USER}.service"
 
 CLAUDE_DIR = USER_HOME / ".claude"
 CLAUDE_JSON = USER_HOME / ".claude.json"
+STATE_DIR = USER_HOME / ".claude_sync_state"
+MANIFEST_FILE = STATE_DIR / "install_manifest.json"
+GIT_PENDING_FILE = STATE_DIR / "git_pending.json"
+GIT_MAINT_FILE = STATE_DIR / "gitmaint.json"
 
 # Archivos de configuración
 CONFIG_FILES = {
     "settings.json": "settings.json",
     "CLAUDE.md": "CLAUDE.md", 
-    "CLAUDE_CODE_REFERENCE.md": "CLAUDE_CODE_REFERENCE.md"
+    "CLAUDE_CODE_REFERENCE.md": "CLAUDE_CODE_REFERENCE.md",
+    "statusline.py": "statusline.py",
+    "usage_aggregator.py": "usage_aggregator.py"
 }
 
 CONFIG_DIRS = ["commands", "agents"]
@@ -58,19 +76,7 @@ CONFIG_DIRS = ["commands", "agents"]
 def setup_logging(daemon_mode=False):
     """Configurar logging según el modo"""
     LOGS_DIR.mkdir(exist_ok=True)
-    
-    if daemon_mode:
-        log_file = LOGS_DIR / "sync.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format=LOG_FORMAT,
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
-    else:
-        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    configure_logging(LOGS_DIR / "sync.log" if daemon_mode else None)
 
 #=============================================================================
 # VALIDACIONES
@@ -112,9 +118,12 @@ def restore_configuration():
         dst = CLAUDE_DIR / claude_file
         
         if src.exists():
-            print(f"📄 Copiando {config_file}...")
-            shutil.copy2(src, dst)
-            print(f"✅ {config_file} copiado")
+            if file_differs(src, dst):
+                print(f"📄 Copiando {config_file}...")
+                copy_file(src, dst)
+                print(f"✅ {config_file} copiado")
+            else:
+                print(f"✅ {config_file} al día")
         else:
             print(f"⚠️ {config_file} no encontrado")
     
@@ -124,11 +133,10 @@ def restore_configuration():
         dst_dir = CLAUDE_DIR / dir_name
         
         if src_dir.exists():
-            print(f"📁 Copiando {dir_name}/")
-            if dst_dir.exists():
-                shutil.rmtree(dst_dir)
-            shutil.copytree(src_dir, dst_dir)
-            print(f"✅ {dir_name}/ copiado")
+            # Diff + copia paralela: solo se toca lo añadido/cambiado/borrado
+            print(f"📁 Sincronizando {dir_name}/")
+            stats = sync_tree(src_dir, dst_dir, delete=True)
+            print(f"✅ {dir_name}/ al día ({stats.copied} copiados, {stats.removed} borrados)")
     
     # Procesar .claude.json con merge inteligente
     process_claude_json()
@@ -143,41 +151,50 @@ def process_claude_json():
         return
         
     print("📋 Procesando .claude.json...")
-    
+    merge_claude_json(config_json)
+
+def merge_claude_json(source, target=CLAUDE_JSON):
+    """Fusionar un .claude.json traído (git o VPS) en `target`
+
+    Si `target` existe solo se toman los mcpServers (backup único antes);
+    si no, se copia completo con permisos 0600.
+    """
     try:
         # Validar JSON
-        with open(config_json) as f:
+        with open(source) as f:
             config_data = json.load(f)
         
-        if CLAUDE_JSON.exists():
+        if target.exists():
             # Backup único
-            backup_file = CLAUDE_JSON.with_suffix('.json.backup')
+            backup_file = target.with_suffix('.json.backup')
             if not backup_file.exists():
-                shutil.copy2(CLAUDE_JSON, backup_file)
+                shutil.copy2(target, backup_file)
                 print("✅ Backup creado")
             
             # Merge mcpServers
-            with open(CLAUDE_JSON) as f:
+            with open(target) as f:
                 user_data = json.load(f)
             
             if 'mcpServers' in config_data:
                 user_data['mcpServers'] = config_data['mcpServers']
                 
-                with open(CLAUDE_JSON, 'w') as f:
+                with open(target, 'w') as f:
                     json.dump(user_data, f, indent=2)
                 print("✅ MCP servers fusionados")
             else:
                 print("⚠️ No hay mcpServers en config")
         else:
             # Copiar completo
-            shutil.copy2(config_json, CLAUDE_JSON)
-            CLAUDE_JSON.chmod(0o600)
+            shutil.copy2(source, target)
+            target.chmod(0o600)
             print("✅ .claude.json copiado")
+        return True
             
     except json.JSONDecodeError:
         print("❌ .claude.json inválido")
     except Exception as e:
         print(f"❌ Error procesando JSON: {e}")
+    return False
 
 #=============================================================================
 # PASO 2: INSTALAR SERVICIO SYSTEMD
@@ -195,6 +212,11 @@ def install_systemd_service():
             subprocess.run(['sudo', 'systemctl', 'stop', SERVICE_NAME], check=True)
     except subprocess.CalledProcessError:
         pass
+
+    # El servicio propio de claude_sync.py sería un segundo daemon
+    if (Path("/etc/systemd/system") / USER_SERVICE_NAME).exists():
+        print(f"🛑 Desactivando {USER_SERVICE_NAME} (lo sustituye {SERVICE_NAME})...")
+        subprocess.run(['sudo', 'systemctl', 'disable', '--now', USER_SERVICE_NAME])
     
     # Crear archivo de servicio
     print("📝 Creando archivo systemd...")
@@ -208,7 +230,7 @@ Type=simple
 User={CURRENT_USER}
 Group={CURRENT_USER}
 WorkingDirectory={REPO_DIR}
-ExecStart={sys.executable} {SCRIPT_DIR / 'install.py'} --daemon
+ExecStart={' '.join(daemon_command())}
 Restart=always
 RestartSec=10
 TimeoutStopSec=30
@@ -221,7 +243,7 @@ SyslogIdentifier=claude-sync
 # Security
 NoNewPrivileges=true
 ProtectSystem=strict
-ReadWritePaths={REPO_DIR} {CLAUDE_DIR} {CLAUDE_JSON}
+ReadWritePaths={REPO_DIR} {USER_HOME}
 ProtectHome=read-only
 
 [Install]
@@ -257,104 +279,51 @@ WantedBy=multi-user.target
 #=============================================================================
 # PASO 3: MODO DAEMON (SYNC AUTOMÁTICO)
 #=============================================================================
-def sync_files():
-    """Sincronizar archivos ~/.claude/ → claude_config/"""
-    changes_detected = False
-    
-    # Copiar archivos principales
-    for claude_file, config_file in CONFIG_FILES.items():
-        src = CLAUDE_DIR / claude_file
-        dst = CONFIG_DIR / config_file
-        
-        if src.exists():
-            if not dst.exists() or src.stat().st_mtime > dst.stat().st_mtime:
-                shutil.copy2(src, dst)
-                changes_detected = True
-    
-    # Copiar .claude.json
-    if CLAUDE_JSON.exists():
-        dst = CONFIG_DIR / ".claude.json"
-        if not dst.exists() or CLAUDE_JSON.stat().st_mtime > dst.stat().st_mtime:
-            shutil.copy2(CLAUDE_JSON, dst)
-            changes_detected = True
-    
-    # Copiar directorios
-    for dir_name in CONFIG_DIRS:
-        src_dir = CLAUDE_DIR / dir_name
-        dst_dir = CONFIG_DIR / dir_name
-        
-        if src_dir.exists():
-            if not dst_dir.exists():
-                shutil.copytree(src_dir, dst_dir)
-                changes_detected = True
-            else:
-                # Comparar y actualizar si es necesario
-                for item in src_dir.rglob('*'):
-                    if item.is_file():
-                        rel_path = item.relative_to(src_dir)
-                        dst_item = dst_dir / rel_path
-                        
-                        if not dst_item.exists() or item.stat().st_mtime > dst_item.stat().st_mtime:
-                            dst_item.parent.mkdir(parents=True, exist_ok=True)
-                            shutil.copy2(item, dst_item)
-                            changes_detected = True
-    
-    return changes_detected
+def build_git_backend(writer=None):
+    """Backend espejo ~/.claude/ → claude_config/ (commits vía `writer`)"""
+    mapping = [(CLAUDE_DIR / src, CONFIG_DIR / dst) for src, dst in CONFIG_FILES.items()]
+    mapping += [(CLAUDE_DIR / name, CONFIG_DIR / name) for name in CONFIG_DIRS]
+    mapping.append((CLAUDE_JSON, CONFIG_DIR / ".claude.json"))
+    return GitMirrorBackend(mapping, MANIFEST_FILE, writer=writer)
 
-def git_commit_and_push():
-    """Hacer commit y push si hay cambios"""
-    try:
-        # Verificar si hay cambios
-        result = subprocess.run(['git', 'diff-index', '--quiet', 'HEAD', '--'], 
-                              cwd=REPO_DIR, capture_output=True)
-        
-        if result.returncode != 0:  # Hay cambios
-            logging.info("📝 Cambios locales detectados, haciendo commit...")
-            
-            subprocess.run(['git', 'add', '.'], cwd=REPO_DIR, check=True)
-            
-            commit_msg = f"auto-sync {time.strftime('%Y-%m-%d %H:%M:%S')}"
-            subprocess.run(['git', 'commit', '-m', commit_msg], cwd=REPO_DIR, check=True)
-            logging.info("✅ Commit realizado")
-            
-            # Force push
-            logging.info("🚀 Force push a GitHub...")
-            subprocess.run(['git', 'push', '--force', 'origin', 'main'], 
-                         cwd=REPO_DIR, check=True)
-            logging.info("✅ Force push exitoso")
-            return True
-        else:
-            logging.info("💤 No hay cambios")
-            return False
-            
-    except subprocess.CalledProcessError as e:
-        logging.error(f"❌ Error en git: {e}")
-        return False
-
-def daemon_mode():
-    """Modo daemon - sync automático cada minuto"""
-    print(f"🔄 MODO DAEMON: Iniciando sync automático cada {SYNC_INTERVAL} segundos...")
-    setup_logging(daemon_mode=True)
-    
-    while True:
-        try:
-            logging.info("🔍 Verificando cambios...")
-            
-            if sync_files():
-                logging.info("📝 Archivos sincronizados")
-                git_commit_and_push()
-            else:
-                logging.info("💤 No hay cambios en archivos")
-            
-            logging.info(f"⏱️ Esperando {SYNC_INTERVAL} segundos hasta próximo sync...")
-            time.sleep(SYNC_INTERVAL)
-            
-        except KeyboardInterrupt:
-            logging.info("🛑 Daemon detenido por usuario")
-            break
-        except Exception as e:
-            logging.error(f"❌ Error en daemon: {e}")
-            time.sleep(10)  # Esperar antes de reintentar
+def build_commit_writer():
+    """Writer que agrupa commits por COMMIT_WINDOW y empuja en background"""
+    writer = GitCommitWriter(REPO_DIR, GIT_PENDING_FILE, window=COMMIT_WINDOW)
+    writer.start()
+    return writer
+
+def build_git_maintenance(writer=None):
+    """Squash de auto-syncs viejos + git maintenance del repo (bajo el lock del writer)"""
+    return GitMaintenanceStage(REPO_DIR, GIT_MAINT_FILE, writer)
+
+def sync_files(changed_paths=None):
+    """Sincronizar archivos ~/.claude/ → claude_config/ (sin commit)
+
+    Devuelve True si se copió algo. Usa el manifest persistente: no se
+    re-hashea lo que no cambió de stat ni se copia contenido idéntico.
+    """
+    backend = build_git_backend()
+    engine = SyncEngine(watch_targets(), [backend], STATE_DIR)
+    engine.run_cycle(changed_paths)
+    return backend.changed_destination
+
+def watch_targets():
+    """Rutas de ~/.claude/ que se reflejan en claude_config/"""
+    targets = [CLAUDE_DIR / name for name in CONFIG_FILES]
+    targets += [CLAUDE_DIR / name for name in CONFIG_DIRS]
+    targets.append(CLAUDE_JSON)
+    return targets
+
+def daemon_command(watch=True):
+    """Daemon único: claude_sync.py con espejo git + VPS (y GitMaintenanceStage)"""
+    cmd = [sys.executable, str(SYNC_SCRIPT), '--daemon-loop', '--backends', DAEMON_BACKENDS]
+    return cmd if watch else cmd + ['--no-watch']
+
+def daemon_mode(watch=True):
+    """Modo daemon - delega en el daemon de claude_sync.py (units antiguas con --daemon)"""
+    cmd = daemon_command(watch)
+    print(f"🔄 MODO DAEMON: {' '.join(cmd[1:])}")
+    os.execv(sys.executable, cmd)
 
 #=============================================================================
 # RESUMEN FINAL
@@ -366,13 +335,16 @@ def print_summary():
     print("📊 Estado del sistema:")
     print(f"• Configuración: {CLAUDE_DIR} restaurada ✅")
     print("• Servicio: claude-sync.service activo ✅")
-    print(f"• Frecuencia: Sync cada {SYNC_INTERVAL} segundos ✅")
+    print(f"• Daemon: claude_sync.py --backends {DAEMON_BACKENDS} (un scan para todos) ✅")
+    print(f"• Frecuencia: Sync por eventos, commit agrupado cada {COMMIT_WINDOW:g}s ✅")
     print("• Método: Force push (sin conflictos) ✅")
     print()
     print("📋 Comandos útiles:")
     print(f"• Estado: sudo systemctl status {SERVICE_NAME}")
     print(f"• Logs: sudo journalctl -u {SERVICE_NAME} -f")
-    print(f"• Logs detallados: tail -f {LOGS_DIR / 'sync.log'}")
+    print(f"• Logs detallados: tail -f {USER_HOME / '.claude_sync.log'}")
+    print(f"• Estado: python3 {SYNC_SCRIPT} --status")
+    print("• Compactar historia git: python3 install.py --git-maintenance")
     print("• Actualizar: python3 install.py")
     print(f"• Parar: sudo systemctl stop {SERVICE_NAME}")
     print()
@@ -392,7 +364,14 @@ def main():
     
     # Modo daemon
     if len(sys.argv) > 1 and sys.argv[1] == '--daemon':
-        daemon_mode()
+        daemon_mode(watch='--no-watch' not in sys.argv)
+        return
+
+    # Mantenimiento git a mano (squash + push + maintenance ya, sin esperar al daemon)
+    if len(sys.argv) > 1 and sys.argv[1] == '--git-maintenance':
+        stage = build_git_maintenance()
+        stage.run(force_squash=True, wait=True)
+        print(f"🧹 Git: {stage.describe()}")
         return
     
     # Instalación completa
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Tests de claude_compact: archivado sin pérdidas ni duplicados"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claude_compact
+from claude_compact import compact_claude_json, iter_archive
+
+def entry(text):
+    return {'display': text, 'pastedContents': {}}
+
+class CompactTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.claude_json = Path(self.tmp.name) / ".claude.json"
+        self.archive = Path(self.tmp.name) / "history-archive.jsonl"
+        patcher = mock.patch.object(claude_compact, 'claude_running', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, history):
+        self.claude_json.write_text(json.dumps({'projects': {'/repo': {'history': history}}}))
+
+    def archived(self):
+        return [record['entry']['display'] for record in iter_archive(self.archive)]
+
+    def test_repeated_prompts_are_all_archived(self):
+        self.write([entry('nuevo'), entry('continue'), entry('continue')])
+        self.assertTrue(compact_claude_json(self.claude_json, self.archive, keep=1))
+        self.write([entry('otro'), entry('continue')])
+        self.assertTrue(compact_claude_json(self.claude_json, self.archive, keep=1))
+        self.assertEqual(self.archived(), ['continue', 'continue', 'continue'])
+
+    def test_cli_write_during_pass_truncates_archive(self):
+        self.write([entry('viejo-1')])
+        compact_claude_json(self.claude_json, self.archive, keep=0)
+        size = self.archive.stat().st_size
+        self.write([entry('a'), entry('b')])
+        original = self.claude_json.read_bytes()
+
+        real_chmod = os.chmod
+        def cli_writes(path, mode):
+            # El CLI reescribe ~/.claude.json entre el stat y el rename
+            self.claude_json.write_bytes(original + b"\n")
+            real_chmod(path, mode)
+
+        with mock.patch.object(claude_compact.os, 'chmod', side_effect=cli_writes):
+            result = compact_claude_json(self.claude_json, self.archive, keep=1)
+        self.assertFalse(result)
+        self.assertIn("modificó", result.skipped)
+        self.assertEqual(self.archive.stat().st_size, size)
+        self.assertEqual(self.claude_json.read_bytes(), original + b"\n")
+        self.assertEqual(list(Path(self.tmp.name).glob(".*.compact.*")), [])
+
+        # El reintento archiva 'b' una sola vez
+        self.assertTrue(compact_claude_json(self.claude_json, self.archive, keep=1))
+        self.assertEqual(self.archived(), ['viejo-1', 'b'])
+
+    def test_rewrite_error_truncates_archive(self):
+        self.write([entry('a'), entry('b')])
+        with mock.patch.object(claude_compact.os, 'replace', side_effect=OSError("disco lleno")):
+            with self.assertRaises(OSError):
+                compact_claude_json(self.claude_json, self.archive, keep=1)
+        self.assertEqual(self.archive.stat().st_size, 0)
+        self.assertEqual(len(json.loads(self.claude_json.read_text())['projects']['/repo']['history']), 2)
+
+    def test_skipped_while_cli_running(self):
+        self.write([entry('a'), entry('b')])
+        before = self.claude_json.read_bytes()
+        with mock.patch.object(claude_compact, 'claude_running', return_value=True):
+            result = compact_claude_json(self.claude_json, self.archive, keep=1)
+        self.assertEqual(result.skipped, "hay un CLI claude abierto")
+        self.assertEqual(self.claude_json.read_bytes(), before)
+        self.assertFalse(self.archive.exists())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Tests de claude_tiering: lo congelado se recupera byte a byte"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claude_tiering
+from claude_tiering import ColdStore
+
+class FreezeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.claude_dir = Path(self.tmp.name)
+        self.project = self.claude_dir / "projects" / "-home-user-repo"
+        self.project.mkdir(parents=True)
+        # Contenido no trivial: UTF-8, líneas largas y bytes arbitrarios
+        self.content = b"".join(
+            f'{{"n": {i}, "text": "línea {i} ' .encode() + os.urandom(64).hex().encode() + b'"}\n'
+            for i in range(2000))
+        self.transcript = self.project / "session-1.jsonl"
+        self.transcript.write_bytes(self.content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_freeze_then_read_back(self):
+        store = ColdStore(self.claude_dir)
+        store.freeze([self.transcript])
+        self.assertFalse(self.transcript.exists())
+
+        rel = "projects/-home-user-repo/session-1.jsonl"
+        self.assertEqual(ColdStore(self.claude_dir).read(rel), self.content)
+
+        thawed = ColdStore(self.claude_dir).thaw(rel)
+        self.assertEqual(thawed.read_bytes(), self.content)
+        self.assertEqual(ColdStore(self.claude_dir).entries, {})
+
+    def test_original_kept_when_read_back_differs(self):
+        store = ColdStore(self.claude_dir)
+        with mock.patch.object(claude_tiering, 'decompress', return_value=b"otra cosa"):
+            store.freeze([self.transcript])
+        self.assertEqual(self.transcript.read_bytes(), self.content)
+        self.assertEqual(ColdStore(self.claude_dir).entries, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tests de claude_watch: wake() debe cortar un wait() en curso"""
+
+import sys
+import time
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from claude_watch import InotifyWatcher, PollingWatcher
+
+class WakeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.target = Path(self.tmp.name) / "settings.json"
+        self.target.write_text("{}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_wakes(self, watcher):
+        try:
+            timer = threading.Timer(0.1, watcher.wake)
+            timer.start()
+            start = time.monotonic()
+            changed = watcher.wait(60)
+            elapsed = time.monotonic() - start
+            timer.join()
+            self.assertEqual(changed, set())
+            self.assertLess(elapsed, 1.0)
+            # El wake se consume: el siguiente wait vuelve a esperar eventos
+            start = time.monotonic()
+            watcher.wait(0.2)
+            self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        finally:
+            watcher.close()
+
+    def test_inotify_wake(self):
+        try:
+            watcher = InotifyWatcher([self.target], debounce=0.05)
+        except OSError as e:
+            self.skipTest(f"inotify no disponible: {e}")
+        self.assert_wakes(watcher)
+
+    def test_polling_wake(self):
+        self.assert_wakes(PollingWatcher([self.target], debounce=0.05))
+
+    def test_inotify_events_still_delivered(self):
+        try:
+            watcher = InotifyWatcher([self.target], debounce=0.05)
+        except OSError as e:
+            self.skipTest(f"inotify no disponible: {e}")
+        try:
+            threading.Timer(0.1, lambda: self.target.write_text('{"a": 1}')).start()
+            self.assertIn(self.target, watcher.wait(5))
+        finally:
+            watcher.close()
+
+if __name__ == "__main__":
+    unittest.main()